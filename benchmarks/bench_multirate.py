@@ -0,0 +1,61 @@
+"""
+Benchmark for the multirate engine against the vectorized engine on a graded mesh.
+
+The mesh is uniformly refined, which keeps its grading, and the oil distribution is run until the end time
+with the vectorized engine at the largest stable time step of the smallest cells, and with the multirate
+engine at a time step of `--steps` steps, which steps every cell at its own stable rate. The number of
+cell updates, the time of each run, excluding reading the mesh, and the oil in the fish area at the end
+are reported.
+
+Typical usage example:
+
+    python benchmarks/bench_multirate.py --refine 4 --end 0.5 --steps 50
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_preview import fish_cells, load  # noqa: E402
+from benchmarks.bench_reorder import refined_mesh  # noqa: E402
+from src.Simulation.diagnostics import cfl_numbers  # noqa: E402
+from src.Simulation.engines import make_engine  # noqa: E402
+
+
+def run(mesh, engine_name: str, end_time: float, steps: int) -> tuple[int, float, float]:
+    """
+    Runs an engine until the end time, returns the number of cell updates, the time and the fish oil.
+    """
+    start = time.perf_counter()
+    engine = make_engine(engine_name, mesh, end_time / steps)
+    oil = mesh.oil_amounts()
+    for _ in range(steps):
+        engine.step(oil)
+    seconds = time.perf_counter() - start
+    updates = getattr(engine, "updates", np.count_nonzero(mesh.geometry.active)) * steps
+    return updates, seconds, float(oil[fish_cells(mesh)].sum())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the multirate engine.")
+    parser.add_argument("--mesh", default="meshes/bay.msh", help="mesh to refine")
+    parser.add_argument("--refine", default=4, type=int, help="number of uniform refinements")
+    parser.add_argument("--end", default=0.5, type=float, help="end time of the runs")
+    parser.add_argument("--steps", default=50, type=int, help="steps of the multirate run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "refined.msh")
+        refined_mesh(args.mesh, args.refine, filename)
+        mesh = load(filename)
+
+    print(f"{len(mesh.cells)} cells")
+    steps = int(np.ceil(cfl_numbers(mesh.geometry, args.end).max()))
+    for name, engine_steps in (("vectorized", steps), ("multirate", args.steps)):
+        updates, seconds, oil = run(mesh, name, args.end, engine_steps)
+        print(f"{name:>10s} {engine_steps:6d} steps {updates:12d} cell updates {seconds:8.2f} s fish oil {oil:.4g}")
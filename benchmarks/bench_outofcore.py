@@ -0,0 +1,112 @@
+"""
+Benchmark for the peak memory and step time of out-of-core simulations.
+
+The bay mesh is uniformly refined and converted into a mesh store once. The same number of steps is then
+run in a fresh process with the vectorized engine on a `Mesh` and with the out-of-core engine on the store,
+and the peak resident memory of each process is reported.
+
+Typical usage example:
+
+    python benchmarks/bench_outofcore.py --refine 5 --steps 10 --budget 32
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_reorder import refined_mesh  # noqa: E402
+
+
+def in_core(mesh_path: str, steps: int) -> float:
+    """
+    Runs the vectorized engine on a `Mesh`, returns the average time of a step in seconds.
+    """
+    import src.Simulation.cells as cls
+    import src.Simulation.mesh as msh
+    from src.Simulation.engines import make_engine
+
+    factory = msh.CellFactory()
+    factory.register(1, cls.Vertex)
+    factory.register(2, cls.Line)
+    factory.register(3, cls.Triangle)
+    mesh = msh.Mesh(mesh_path, factory, "rcm")
+    mesh.initial_oil_distribution(np.array([0.35, 0.45]))
+    oil = mesh.oil_amounts()
+    engine = make_engine("vectorized", mesh, 1e-5)
+    start = time.perf_counter()
+    for _ in range(steps):
+        engine.step(oil)
+    return (time.perf_counter() - start) / steps
+
+
+def out_of_core(store_folder: str, steps: int, budget: int) -> float:
+    """
+    Runs the out-of-core engine on a mesh store, returns the average time of a step in seconds.
+    """
+    from src.Simulation.outofcore import MeshStore, OutOfCoreEngine
+
+    engine = OutOfCoreEngine(MeshStore(store_folder), 1e-5, os.path.join(store_folder, "state"), budget)
+    engine.initialize(np.array([0.35, 0.45]))
+    start = time.perf_counter()
+    for _ in range(steps):
+        engine.step()
+    return (time.perf_counter() - start) / steps
+
+
+def peak_memory() -> int:
+    """
+    Returns the peak resident memory of this process in kB. Unlike `resource.getrusage`, it does not include
+    the memory of the parent process before it started this one.
+    """
+    with open("/proc/self/status", "r") as file:
+        for line in file:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    return 0
+
+
+def measure(mode: str, path: str, steps: int, budget: int) -> None:
+    """
+    Runs one mode in a fresh process and prints its step time and peak resident memory.
+    """
+    output = subprocess.run(
+        [sys.executable, __file__, "--run", mode, "--path", path, "--steps", str(steps), "--budget", str(budget)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+    print(f"{mode:12s} {float(output[0]) * 1e3:8.1f} ms/step {float(output[1]) / 1024:8.1f} MB peak RSS")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark out-of-core simulations.")
+    parser.add_argument("--mesh", default="meshes/bay.msh", help="mesh to refine")
+    parser.add_argument("--refine", default=5, type=int, help="number of uniform refinements")
+    parser.add_argument("--steps", default=10, type=int, help="steps per measurement")
+    parser.add_argument("--budget", default=32, type=int, help="memory budget of the out-of-core engine in MB")
+    parser.add_argument("--run", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--path", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        if args.run == "in-core":
+            step = in_core(args.path, args.steps)
+        else:
+            step = out_of_core(args.path, args.steps, args.budget << 20)
+        print(step, peak_memory())
+        sys.exit()
+
+    from src.Simulation.outofcore import convert_mesh
+
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "refined.msh")
+        refined_mesh(args.mesh, args.refine, filename)
+        store_folder = convert_mesh(filename, os.path.join(folder, "store"))
+        measure("in-core", filename, args.steps, args.budget)
+        measure("out-of-core", store_folder, args.steps, args.budget)
@@ -0,0 +1,68 @@
+"""
+Benchmark for the particle engine against the vectorized engine on a large mesh.
+
+The bay mesh is uniformly refined, and the oil distribution is run until the end time with the vectorized
+engine at the largest stable time step of the fine cells, and with the particle engine for several numbers
+of particles. The particles are not limited by the CFL condition, so they take `--particle-steps` steps. The
+time per step, the time of each run, excluding reading the mesh, and the oil in the fish area at the end are
+reported.
+
+Typical usage example:
+
+    python benchmarks/bench_particles.py --refine 4 --end 0.5 --particles 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_preview import fish_cells, load  # noqa: E402
+from benchmarks.bench_reorder import refined_mesh  # noqa: E402
+from src.Simulation.diagnostics import cfl_numbers  # noqa: E402
+from src.Simulation.engines import make_engine  # noqa: E402
+
+
+def run(mesh, engine_name: str, end_time: float, steps: int, **options) -> tuple[float, float, float]:
+    """
+    Runs an engine until the end time, returns the time per step, the total time and the fish oil.
+    """
+    start = time.perf_counter()
+    engine = make_engine(engine_name, mesh, end_time / steps, **options)
+    oil = mesh.oil_amounts()
+    engine.step(oil)
+    first_step = time.perf_counter()
+    for _ in range(steps - 1):
+        engine.step(oil)
+    end = time.perf_counter()
+    return (end - first_step) / max(steps - 1, 1), end - start, float(oil[fish_cells(mesh)].sum())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the particle engine.")
+    parser.add_argument("--mesh", default="meshes/bay.msh", help="mesh to refine")
+    parser.add_argument("--refine", default=4, type=int, help="number of uniform refinements")
+    parser.add_argument("--end", default=0.5, type=float, help="end time of the runs")
+    parser.add_argument("--particles", default=[10_000, 100_000], type=int, nargs="+", help="numbers of particles")
+    parser.add_argument("--particle-steps", default=100, type=int, help="steps of the particle runs")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "refined.msh")
+        refined_mesh(args.mesh, args.refine, filename)
+        mesh = load(filename)
+
+    print(f"{len(mesh.cells)} cells")
+    steps = int(np.ceil(cfl_numbers(mesh.geometry, args.end).max()))
+    per_step, seconds, oil = run(mesh, "vectorized", args.end, steps)
+    print(f"{'vectorized':>18s} {per_step * 1e3:8.2f} ms/step {seconds:8.2f} s {steps:6d} steps fish oil {oil:.4g}")
+    for num_particles in args.particles:
+        per_step, seconds, oil = run(mesh, "particles", args.end, args.particle_steps, num_particles=num_particles)
+        print(
+            f"{f'{num_particles} particles':>18s} {per_step * 1e3:8.2f} ms/step {seconds:8.2f} s "
+            f"{args.particle_steps:6d} steps fish oil {oil:.4g}"
+        )
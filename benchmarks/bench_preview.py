@@ -0,0 +1,93 @@
+"""
+Benchmark for coarse previews against full resolution runs.
+
+The bay mesh is uniformly refined, and the oil distribution is run until the end time with the vectorized
+engine at the largest stable time step of the fine cells, and previewed on aggregates of several sizes. The
+time of each run, excluding reading the mesh, its number of steps and the oil in the fish area at the end
+are reported.
+
+Typical usage example:
+
+    python benchmarks/bench_preview.py --refine 3 --end 0.5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.Simulation.cells as cls  # noqa: E402
+import src.Simulation.mesh as msh  # noqa: E402
+from benchmarks.bench_reorder import refined_mesh  # noqa: E402
+from src.Simulation.coarsening import CoarseMesh  # noqa: E402
+from src.Simulation.diagnostics import cfl_numbers  # noqa: E402
+from src.Simulation.engines import make_engine  # noqa: E402
+
+START_POINT = np.array([0.35, 0.45])
+FISH_AREA = (np.array([0.0, 0.45]), np.array([0.0, 0.2]))
+
+
+def load(mesh_path: str) -> msh.Mesh:
+    factory = msh.CellFactory()
+    factory.register(1, cls.Vertex)
+    factory.register(2, cls.Line)
+    factory.register(3, cls.Triangle)
+    mesh = msh.Mesh(mesh_path, factory, "rcm")
+    mesh.initial_oil_distribution(START_POINT)
+    return mesh
+
+
+def fish_cells(mesh: msh.Mesh) -> np.ndarray:
+    return np.array([cell.index for cell in mesh.cells_within_area(*FISH_AREA)], dtype=np.int64)
+
+
+def full(mesh: msh.Mesh, end_time: float) -> tuple[float, int, float]:
+    """
+    Runs the vectorized engine at the largest stable time step, returns the time, steps and fish oil.
+    """
+    start = time.perf_counter()
+    steps = int(np.ceil(cfl_numbers(mesh.geometry, end_time).max()))
+    engine = make_engine("vectorized", mesh, end_time / steps)
+    oil = mesh.oil_amounts()
+    for _ in range(steps):
+        engine.step(oil)
+    return time.perf_counter() - start, steps, float(oil[fish_cells(mesh)].sum())
+
+
+def preview(mesh: msh.Mesh, end_time: float, factor: float) -> tuple[float, int, float]:
+    """
+    Runs the preview on aggregates of about `factor` cells, returns the time, steps and fish oil.
+    """
+    start = time.perf_counter()
+    coarse = CoarseMesh(mesh.geometry, factor)
+    steps = coarse.steps(end_time)
+    step_operator = (end_time / steps) * coarse.operator
+    oil = coarse.restrict(mesh.oil_amounts())
+    for _ in range(steps):
+        oil += step_operator @ oil
+    return time.perf_counter() - start, steps, float(np.dot(coarse.cell_counts(fish_cells(mesh)), oil))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark coarse previews.")
+    parser.add_argument("--mesh", default="meshes/bay.msh", help="mesh to refine")
+    parser.add_argument("--refine", default=3, type=int, help="number of uniform refinements")
+    parser.add_argument("--end", default=0.5, type=float, help="end time of the runs")
+    parser.add_argument("--factors", default=[16, 64, 256], type=float, nargs="+", help="aggregate sizes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "refined.msh")
+        refined_mesh(args.mesh, args.refine, filename)
+        mesh = load(filename)
+
+    print(f"{len(mesh.cells)} cells")
+    seconds, steps, oil = full(mesh, args.end)
+    print(f"{'full':>12s} {seconds:8.2f} s {steps:6d} steps fish oil {oil:.4g}")
+    for factor in args.factors:
+        seconds, steps, oil = preview(mesh, args.end, factor)
+        print(f"{f'factor {factor:g}':>12s} {seconds:8.2f} s {steps:6d} steps fish oil {oil:.4g}")
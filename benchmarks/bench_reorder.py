@@ -0,0 +1,88 @@
+"""
+Benchmark for the step time of the vectorized engine with different cell orderings.
+
+The bay mesh is uniformly refined a number of times to get a mesh large enough for cache effects to matter,
+and the vectorized engine is stepped on it with the cells in the order they are written and in every cache
+friendly ordering. The same mesh with its cells shuffled is reported on a separate line, as the worst case
+of a mesh generator that leaves no locality at all.
+
+Typical usage example:
+
+    python benchmarks/bench_reorder.py --refine 4 --steps 50 --precision float32
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import meshio
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.Simulation.geometry as geo  # noqa: E402
+import src.Simulation.mesh as msh  # noqa: E402
+import src.Simulation.ordering as ordering  # noqa: E402
+from src.Simulation.engines import PRECISIONS, make_engine  # noqa: E402
+
+
+def refined_mesh(mesh_path: str, levels: int, filename: str, shuffle: bool = False) -> None:
+    """
+    Writes the mesh refined `levels` times to a file, in the order the refinement creates the cells, or with
+    the cells shuffled within each block.
+    """
+    mesh = meshio.read(mesh_path)
+    points = mesh.points
+    blocks = [np.asarray(block.data) for block in mesh.cells]
+    for _ in range(levels):
+        points, blocks = geo.refine(points, blocks)
+    if shuffle:
+        generator = np.random.default_rng(0)
+        blocks = [block[generator.permutation(len(block))] for block in blocks]
+    types = {1: "vertex", 2: "line", 3: "triangle"}
+    meshio.write(
+        filename,
+        meshio.Mesh(points, [(types[block.shape[1]], block) for block in blocks]),
+        file_format="gmsh22",
+        binary=True,
+    )
+
+
+def step_time(mesh_path: str, reorder: str, steps: int, precision: str = "float64") -> float:
+    """
+    Returns the average time in seconds of one step of the vectorized engine.
+    """
+    mesh = msh.Mesh(mesh_path, msh.default_factory(), reorder)
+    dtype = PRECISIONS[precision]
+    engine = make_engine("vectorized", mesh, 1e-5, dtype)
+    oil = np.exp(-np.sum((mesh.geometry.midpoints - [0.35, 0.45]) ** 2, axis=1) / 0.01).astype(dtype)
+    engine.step(oil)
+    start = time.perf_counter()
+    for _ in range(steps):
+        engine.step(oil)
+    return (time.perf_counter() - start) / steps
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cell orderings.")
+    parser.add_argument("--mesh", default="meshes/bay.msh", help="mesh to refine")
+    parser.add_argument("--refine", default=4, type=int, help="number of uniform refinements")
+    parser.add_argument("--steps", default=50, type=int, help="steps per measurement")
+    parser.add_argument("--precision", default="float64", choices=list(PRECISIONS), help="precision of the oil")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "refined.msh")
+        refined_mesh(args.mesh, args.refine, filename)
+        print(f"{meshio.read(filename).cells[-1].data.shape[0]} triangles")
+        baseline = step_time(filename, None, args.steps, args.precision)
+        print(f"{'file order':<12} {baseline * 1000:8.2f} ms/step")
+        for name in ordering.ORDERINGS:
+            seconds = step_time(filename, name, args.steps, args.precision)
+            print(f"{name:<12} {seconds * 1000:8.2f} ms/step  ({baseline / seconds:.2f}x)")
+
+        shuffled = os.path.join(folder, "shuffled.msh")
+        refined_mesh(args.mesh, args.refine, shuffled, shuffle=True)
+        seconds = step_time(shuffled, None, args.steps, args.precision)
+        print(f"{'shuffled':<12} {seconds * 1000:8.2f} ms/step  ({baseline / seconds:.2f}x, cells shuffled)")
@@ -0,0 +1,54 @@
+"""
+Benchmark for the startup time of the command line interface and the solver import.
+
+Each case is run in a fresh interpreter several times and the best time is reported. With
+`--max-seconds`, the benchmark exits with an error if any case is slower, so it can be used to keep
+startup time from regressing.
+
+Typical usage example:
+
+    python benchmarks/bench_startup.py --repeat 5 --max-seconds 1.0
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {
+    "main.py --help": [sys.executable, "main.py", "--help"],
+    "import solver": [sys.executable, "-c", "import src.Simulation.solver"],
+    "interpreter": [sys.executable, "-c", "pass"],
+}
+
+
+def best_time(command: list[str], repeat: int) -> float:
+    """
+    Returns the fastest wall time in seconds of running a command `repeat` times.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark startup time.")
+    parser.add_argument("--repeat", default=5, type=int, help="runs per case")
+    parser.add_argument("--max-seconds", default=None, type=float, help="fail if a case is slower")
+    args = parser.parse_args()
+
+    slow = []
+    for name, command in CASES.items():
+        seconds = best_time(command, args.repeat)
+        print(f"{name:<20} {seconds * 1000:8.1f} ms")
+        if args.max_seconds and seconds > args.max_seconds:
+            slow.append(name)
+
+    if slow:
+        sys.exit(f"Startup slower than {args.max_seconds} s: {', '.join(slow)}")
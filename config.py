@@ -24,17 +24,80 @@ def parseInput():
 
     parser.add_argument("--fast", action="store_true", help="run fast")
 
+    parser.add_argument(
+        "--raster",
+        action="store_true",
+        help="render frames from a precomputed pixel to cell lookup",
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue from the newest checkpoint of the experiment",
+    )
+
+    parser.add_argument(
+        "--adjoint",
+        action="store_true",
+        help="compute the sensitivity of the fish area to the initial oil of every cell",
+    )
+
+    parser.add_argument(
+        "--preview",
+        action="store_true",
+        help="run a quick coarse preview on agglomerated cells",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always simulate, without reading or storing cached results",
+    )
+
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="only compute, without rendering images or a video",
+    )
+
     args = parser.parse_args()
     return args
 
 
-def readConfig(name):
+def _reject_ignored_options(config, mode, resume):
+    """
+    Rejects the options a mode that runs its own simulation loop ignores: other engines and precisions,
+    output times, particles, exposure maps, XDMF export, checkpoints, metrics, an existing restart file and
+    `--resume`.
+    """
+    settings = config["settings"]
+    IO = config["IO"]
+    if settings.get("engine", "vectorized") != "vectorized" or settings.get("precision", "float64") != "float64":
+        raise ValueError(f'{mode} requires engine = "vectorized" and precision = "float64".')
+    unsupported = [key for key in ("outputTimes", "particles", "exposureThreshold") if key in settings]
+    unsupported += [key for key in ("xdmf", "checkpointSteps", "checkpointSeconds", "metricsFile") if IO.get(key)]
+    if unsupported:
+        raise ValueError(f"{', '.join(unsupported)} is not supported with {mode}.")
+    restartFile = IO.get("restartFile")
+    if restartFile and os.path.exists(restartFile):
+        raise ValueError(f"restartFile in IO section is not supported with {mode}.")
+    if resume:
+        raise ValueError(f"--resume is not supported with {mode}.")
+
+
+def readConfig(name, preview=False, resume=False, headless=False):
     if not os.path.exists(name):
         raise FileNotFoundError(f"The config file {name} does not exist.")
 
     with open(name, "r") as file:
         config = toml.load(file)
 
+    validateConfig(config, preview, resume, headless)
+    print(f"Successfully read config file {name}")
+    return config
+
+
+def validateConfig(config, preview=False, resume=False, headless=False):
     geometry = config["geometry"]
     fish_area = geometry.get("fish_area")
     start_point = geometry.get("initial_oil_area")
@@ -44,11 +107,22 @@ def readConfig(name):
     steps = settings.get("nSteps")
     t_start = settings.get("t_start")
     t_end = settings.get("t_end")
+    negativeTolerance = settings.get("negativeTolerance", 1e-8)
+    precision = settings.get("precision", "float64")
+    outputTimes = settings.get("outputTimes")
+    memoryBudget = settings.get("memoryBudget", 256)
+    exposureThreshold = settings.get("exposureThreshold")
+    previewFactor = settings.get("previewFactor", 16)
+    particles = settings.get("particles")
 
     IO = config["IO"]
     writeFrequency = IO.get("writeFrequency")
     restartFile = IO.get("restartFile")
     logName = IO.get("logName")
+    checkpointSteps = IO.get("checkpointSteps")
+    checkpointSeconds = IO.get("checkpointSeconds")
+    checkpointKeep = IO.get("checkpointKeep", 3)
+    metricsInterval = IO.get("metricsInterval", 5)
 
     if not filepath or not os.path.exists(filepath):
         raise FileNotFoundError(f"The mesh file {filepath} does not exist.")
@@ -59,7 +133,7 @@ def readConfig(name):
     if not start_point:
         raise ValueError("Missing initial_oil_area in geometry section.")
 
-    if not steps or steps <= 0:
+    if not outputTimes and (not steps or steps <= 0):
         raise ValueError("Missing nSteps in settings section.")
 
     if restartFile and t_start is None:
@@ -68,6 +142,94 @@ def readConfig(name):
     if t_end is None or t_end <= t_start:
         raise ValueError("Missing t_end in or t_end <= t_start in settings section.")
 
+    if negativeTolerance < 0:
+        raise ValueError("negativeTolerance in settings section can not be negative.")
+
+    if outputTimes is not None and (
+        not outputTimes or min(outputTimes) < (t_start or 0) or max(outputTimes) > t_end
+    ):
+        raise ValueError("outputTimes in settings section must lie between t_start and t_end.")
+
+    if outputTimes and (config.get("sources") or config.get("weathering")):
+        raise ValueError("outputTimes in settings section is not supported with sources or weathering.")
+
+    if outputTimes and settings.get("engine", "vectorized") != "vectorized":
+        raise ValueError('outputTimes in settings section requires engine = "vectorized".')
+
+    for source in config.get("sources", []):
+        location = source.get("location")
+        if not location or len(location) != 2:
+            raise ValueError("Every source needs a location [x, y].")
+        if not source.get("radius") or source["radius"] <= 0:
+            raise ValueError("Every source needs a positive radius.")
+        if "rate" not in source and "rates" not in source:
+            raise ValueError("Every source needs a rate or rates.")
+        if source.get("rate", 0) < 0 or any(rate < 0 for _, rate in source.get("rates", [])):
+            raise ValueError("The rates of a source can not be negative.")
+
+    if exposureThreshold is not None and exposureThreshold < 0:
+        raise ValueError("exposureThreshold in settings section can not be negative.")
+
+    if previewFactor < 1:
+        raise ValueError("previewFactor in settings section must be at least 1.")
+
+    if particles is not None and (not isinstance(particles, int) or particles < 1):
+        raise ValueError("particles in settings section must be a positive integer.")
+
+    if particles is not None and settings.get("engine") != "particles":
+        raise ValueError('particles in settings section requires engine = "particles".')
+
+    if memoryBudget <= 0:
+        raise ValueError("memoryBudget in settings section must be positive.")
+
+    if settings.get("outOfCore") and config.get("sources"):
+        raise ValueError("sources are not supported with outOfCore in settings section.")
+
+    weathering = config.get("weathering", {})
+    for key, rate in weathering.items():
+        if key not in ("evaporation", "decay", "beaching"):
+            raise ValueError(f"Unknown weathering process {key}, choose evaporation, decay or beaching.")
+        if rate < 0:
+            raise ValueError(f"The {key} rate in weathering section can not be negative.")
+
+    if settings.get("outOfCore") and weathering:
+        raise ValueError("weathering is not supported with outOfCore in settings section.")
+    if settings.get("outOfCore"):
+        _reject_ignored_options(config, "outOfCore", resume)
+    if settings.get("outOfCore") and writeFrequency and not headless:
+        raise ValueError("outOfCore in settings section renders no frames, remove writeFrequency or run --headless.")
+
+    nesting = config.get("nesting", {})
+    for key in nesting:
+        if key not in ("area", "levels", "subcycles"):
+            raise ValueError(f"Unknown nesting key {key}, choose area, levels or subcycles.")
+    if nesting.get("levels", 2) < 0:
+        raise ValueError("levels in nesting section can not be negative.")
+    if nesting.get("subcycles", 1) < 1:
+        raise ValueError("subcycles in nesting section must be at least 1.")
+    if nesting and (settings.get("outOfCore") or config.get("sources") or weathering):
+        raise ValueError("nesting is not supported with outOfCore, sources or weathering.")
+    if nesting:
+        _reject_ignored_options(config, "nesting", resume)
+
+    if preview and (config.get("sources") or weathering):
+        raise ValueError("sources and weathering are not supported with --preview.")
+
+    if precision not in ("float64", "float32"):
+        raise ValueError("precision in settings section must be float64 or float32.")
+
+    if checkpointSteps is not None and checkpointSteps <= 0:
+        raise ValueError("checkpointSteps in IO section must be positive.")
+
+    if checkpointSeconds is not None and checkpointSeconds <= 0:
+        raise ValueError("checkpointSeconds in IO section must be positive.")
+
+    if checkpointKeep < 1:
+        raise ValueError("checkpointKeep in IO section must be at least 1.")
+
+    if metricsInterval <= 0:
+        raise ValueError("metricsInterval in IO section must be positive.")
+
     if not writeFrequency:
         writeFrequency = None
 
@@ -80,7 +242,6 @@ def readConfig(name):
     if not logName:
         logName = "logfile.log"
 
-    print(f"Successfully read config file {name}")
     return config
 
 
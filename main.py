@@ -9,13 +9,13 @@ Key Steps:
 1. Create an output directory (`images`) if it doesn't already exist.
 2. Parse command-line arguments and load simulation settings from the configuration file.
 3. Extract key parameters such as the number of steps, time range, mesh filepath, and initial conditions.
-4. Register different cell types (Vertex, Line, Triangle) using a `CellFactory`.
+4. Register different cell types (Vertex, Line, Triangle, Quadrilateral, Polygon) using a `CellFactory`.
 5. Pass all configurations and the `CellFactory` to the solver to run the simulation and generate results.
 
 Modules Used:
 - `src.Simulation.solver`: Handles the core simulation logic.
 - `src.Simulation.mesh`: Manages mesh and cell-related functionalities.
-- `src.Simulation.cells`: Defines different cell types like Vertex, Line, and Triangle.
+- `src.Simulation.cells`: Defines different cell types like Vertex, Line, Triangle, Quadrilateral and Polygon.
 - `config`: Contains functions for reading and parsing configuration files.
 
 Args:
@@ -27,36 +27,126 @@ Args:
     - `start_point` (list or array): Coordinates of the initial oil area.
     - `factory` (CellFactory): Factory for creating cell objects based on mesh data.
 
+Checkpoints:
+- Setting `checkpointSteps` and/or `checkpointSeconds` in the `[IO]` section writes periodic checkpoints to
+  `results/<name>_results/checkpoints`, keeping the newest `checkpointKeep` (default 3).
+- Running with `--resume` continues from the newest valid checkpoint of the experiment, which must have been written
+  by a run with the same mesh, restart file and settings. A run starting from the beginning removes older checkpoints.
+
+Headless mode:
+- Running with `--headless` only computes the oil distribution, without rendering images or a video. The
+  plotting and video dependencies are then never imported.
+
+Raster rendering:
+- Running with `--raster` rasterizes the mesh once into an image of cell indices, and renders every frame
+  by a lookup of the oil amounts through it, instead of drawing every cell again.
+
+Adjoint mode:
+- Running with `--adjoint` computes, in one backward run, how much of the oil starting in every cell
+  reaches the fish area by `t_end`, instead of simulating the `initial_oil_area`, including the
+  `[weathering]` of the forward run. The sensitivity map is written to
+  `results/<name>_results/<name>_sensitivity.txt`.
+
+Output times:
+- Setting `outputTimes = [...]` in the `[settings]` section evaluates the oil distribution directly at those
+  times with the action of the matrix exponential, without time steps, from the `restartFile` if given.
+  `nSteps` is then not needed. Sources, weathering and engines other than `vectorized` are not supported.
+
+Preview mode:
+- Running with `--preview` runs the same transport on aggregates of about `previewFactor` cells (default 16),
+  with a larger stable time step, and prolongs the result back onto the mesh. Frames are written to
+  `results/<name>_results/preview` unless headless; it starts from the restart file if given, but no
+  restart file is written and the cache is not used. Sources and weathering are not supported.
+
+Out-of-core mode:
+- Setting `outOfCore = true` in the `[settings]` section converts the mesh once into a folder of arrays,
+  `results/stores/<mesh name>` or the `meshStore` of the `[IO]` section, and steps the oil distribution from
+  memory-mapped files within `memoryBudget` MB (default 256). Only the oil in the fish area is computed.
+  It runs the vectorized engine in float64 without frames, so configs that add `writeFrequency` without
+  `--headless`, a restart file, sources, weathering, output times, particles, exposure maps, XDMF export,
+  checkpoints or metrics are rejected, as is `--resume`.
+
+Result cache:
+- Completed runs are stored in `results/cache`, keyed by the normalized config, the contents of the mesh
+  and restart file and the solver version. Running an identical scenario again returns the stored oil in
+  the fish area over time, final oil distribution and diagnostics immediately. Only headless runs without
+  XDMF exports, exposure maps, weathering, metrics or checkpoints use the cache. `--no-cache` always
+  simulates.
+
+Exposure maps:
+- Setting `exposureThreshold` in the `[settings]` section keeps the first time the oil exceeds it, the peak
+  oil amount and the time-integrated dose of every cell. They are written to
+  `results/<name>_results/<name>_exposure.npz` and rendered as maps unless headless.
+
+Weathering:
+- A `[weathering]` table with `evaporation`, `decay` and `beaching` rates removes oil every step, see
+  `src.Simulation.weathering`. The oil mass beached on the coastline is written to
+  `results/<name>_results/<name>_beached.txt`.
+
+Telemetry:
+- Setting `metricsFile` in the `[IO]` section writes the steps completed, cell updates per second, ETA, oil
+  mass, oil in the fish area and rendering time to that file in the Prometheus text format, at most every
+  `metricsInterval` seconds (default 5), see `src.Simulation.telemetry`.
+
+Nesting:
+- A `[nesting]` table refines the triangles in its `area` (the fish area by default) `levels` times (default
+  2) and steps them `subcycles` times per step (default 2^levels), coupled to the rest of the mesh through
+  the fluxes over their interface, see `src.Simulation.nesting`. It runs the vectorized engine in float64;
+  configs that add a restart file, output times, particles, exposure maps, XDMF export, checkpoints or metrics
+  are rejected, as is `--resume`.
+
+Particles:
+- Setting `engine = "particles"` in the `[settings]` section tracks `particles` parcels of oil (default
+  100000) through the current instead of moving oil between cells, and bins them onto the cells, see
+  `src.Simulation.particles`. The cost of a step grows with the number of particles, not cells.
+
+Multirate:
+- Setting `engine = "multirate"` in the `[settings]` section steps every cell at the time step dt / 2^k it
+  is stable with, so `nSteps` is not limited by the smallest cells, see `src.Simulation.engines`.
+
+Sources:
+- Every `[[sources]]` table adds oil continuously from a `location` with a `radius` and a `rate`, or a
+  schedule of `rates` as [time, rate] pairs, see `src.Simulation.sources`.
+
+XDMF export:
+- Setting `xdmf = true` in the `[IO]` section exports the oil distribution every `writeFrequency` steps to
+  `results/<name>_results/<name>.h5` and `<name>.xdmf`, which can be opened in ParaView. Combined with
+  `--headless`, production runs skip rendering entirely and are analyzed afterwards.
+
 Output:
 - Generates simulation images in the `images` directory.
 - Executes the main function `find_and_plot` from the solver, which handles the core simulation and visualization tasks.
 """
 
-import src.Simulation.solver as solve
-import src.Simulation.mesh as msh
-import src.Simulation.cells as cls
-import numpy as np
 from config import readConfig, parseInput, process_all_configs
 from logger import setup_logger
 import os
 
 if __name__ == "__main__":
 
+    # Arguments are parsed before the solver is imported, so --help and invalid arguments return immediately
     args = parseInput()
 
-    if args.fast:
+    import numpy as np
+    import src.Simulation.solver as solve
+    import src.Simulation.mesh as msh
+    from src.Simulation.cache import ResultCache, cacheable
+
+    if args.raster:
+        fast = 2
+    elif args.fast:
         fast = 1
     else:
         fast = 0
 
-    def run(toml_file=None, fast=0):
-        config = readConfig(toml_file)
+    def run(toml_file=None, fast=0, resume=False, headless=False, adjoint=False, preview=False, use_cache=True):
+        config = readConfig(toml_file, preview, resume, headless)
         
         if toml_file is None:
             toml_file = args.config
 
         setting = config["settings"]
-        intervals = setting["nSteps"]
+        intervals = setting.get("nSteps")
         start_time = setting.get("t_start")
         end_time = setting["t_end"]
         geometry = config["geometry"]
@@ -67,6 +157,19 @@ if __name__ == "__main__":
         write_frequency = IO.get("writeFrequency")
         logName = IO.get("logName")
         restartFile = IO.get("restartFile")
+        checkpoint_steps = IO.get("checkpointSteps")
+        checkpoint_seconds = IO.get("checkpointSeconds")
+        checkpoint_keep = IO.get("checkpointKeep", 3)
+        xdmf = IO.get("xdmf", False)
+        abort_on_instability = setting.get("abortOnInstability", False)
+        negative_tolerance = setting.get("negativeTolerance", 1e-8)
+        engine = setting.get("engine", "vectorized")
+        particles = setting.get("particles")
+        reorder = setting.get("reorder")
+        precision = setting.get("precision", "float64")
+        output_times = setting.get("outputTimes")
+        out_of_core = setting.get("outOfCore", False)
+        memory_budget = setting.get("memoryBudget", 256)
 
         if restartFile:
             if not os.path.exists(restartFile):
@@ -79,14 +182,139 @@ if __name__ == "__main__":
         x_area = np.float64(fish_area[0])
         y_area = np.float64(fish_area[1])
 
-        factory = msh.CellFactory()
-        # -------Register Cells----------
-        factory.register(1, cls.Vertex)
-        factory.register(2, cls.Line)
-        factory.register(3, cls.Triangle)
-        # -------Register End------------
+        factory = msh.default_factory()
+
+        if adjoint:
+            sensitivity = solve.find_sensitivity(
+                mesh_path,
+                start_time,
+                end_time,
+                intervals,
+                factory,
+                x_area,
+                y_area,
+                toml_file=toml_file,
+                engine=engine,
+                reorder=reorder,
+                precision=precision,
+                weathering=config.get("weathering"),
+            )
+            logger.info(f"Sensitivity of the fish area: max {sensitivity.max()}, total {sensitivity.sum()}")
+            logger.info("Simulation Ended")
+            return
+
+        if output_times:
+            oil_area_time = solve.find_at_times(
+                mesh_path,
+                start_time or 0,
+                output_times,
+                start_point,
+                factory,
+                x_area,
+                y_area,
+                toml_file=toml_file,
+                reorder=reorder,
+                xdmf=xdmf,
+                restartFile=restartFile,
+            )
+            logger.info("Oil distribution at the output times:")
+            for output_time, oil_value in oil_area_time.items():
+                logger.info(f"  Time {output_time}: Oil amount {oil_value}")
+            logger.info("Simulation Ended")
+            return
+
+        if preview:
+            oil_area_time = solve.find_preview(
+                mesh_path,
+                start_time,
+                end_time,
+                intervals,
+                write_frequency,
+                start_point,
+                factory,
+                x_area,
+                y_area,
+                toml_file=toml_file,
+                fast=fast,
+                headless=headless,
+                reorder=reorder,
+                factor=setting.get("previewFactor", 16),
+                restartFile=restartFile,
+            )
+            logger.info("Preview of the oil distribution over time:")
+            for time_step, oil_value in oil_area_time.items():
+                logger.info(f"  Time step {time_step}: Oil amount {oil_value}")
+            logger.info("Simulation Ended")
+            return
+
+        nesting = config.get("nesting")
+        if nesting:
+            oil_area_time = solve.find_nested(
+                mesh_path,
+                start_time,
+                end_time,
+                intervals,
+                write_frequency,
+                start_point,
+                factory,
+                x_area,
+                y_area,
+                toml_file=toml_file,
+                fast=fast,
+                headless=headless,
+                reorder=reorder,
+                nest_area=nesting.get("area"),
+                levels=nesting.get("levels", 2),
+                subcycles=nesting.get("subcycles"),
+            )
+            logger.info("Oil distribution over time:")
+            for time_step, oil_value in oil_area_time.items():
+                logger.info(f"  Time step {time_step}: Oil amount {oil_value}")
+            logger.info("Simulation Ended")
+            return
+
+        if out_of_core:
+            oil_area_time = solve.find_out_of_core(
+                mesh_path,
+                start_time or 0,
+                end_time,
+                intervals,
+                start_point,
+                x_area,
+                y_area,
+                toml_file=toml_file,
+                store_folder=IO.get("meshStore"),
+                reorder=reorder or "rcm",
+                memory_budget=int(memory_budget * (1 << 20)),
+            )
+            logger.info("Oil distribution over time:")
+            for time_step, oil_value in oil_area_time.items():
+                logger.info(f"  Time step {time_step}: Oil amount {oil_value}")
+            logger.info("Simulation Ended")
+            return
+
+        # Only runs that write nothing but the restart file and the diagnostics are served from the cache
+        cache = ResultCache() if use_cache and cacheable(config, headless) else None
+        base_name = os.path.splitext(os.path.basename(toml_file))[0]
+        diagnostics_file = os.path.join("results", f"{base_name}_results", "diagnostics.csv")
+        if cache:
+            key = cache.key(config, restartFile)
+            cached = cache.get(key)
+            if cached:
+                oil_area_time, final_oil, summary, diagnostics_csv = cached
+                solve.write_restart_file(toml_file, end_time, final_oil)
+                with open(diagnostics_file, "w") as file:
+                    file.write(diagnostics_csv)
+                logger.info("Result found in the cache")
+                logger.info("Oil distribution over time:")
+                for time_step, oil_value in oil_area_time.items():
+                    logger.info(f"  Time step {time_step}: Oil amount {oil_value}")
+                logger.info(f"Diagnostics: {summary}")
+                logger.info("Simulation Ended")
+                return
 
-        oil_area_time = solve.find_and_plot(
+        mesh = msh.Mesh(mesh_path, factory, reorder)
+        oil_area_time, diagnostics = solve.find_and_plot(
             mesh_path,
             start_time,
             end_time,
@@ -98,18 +326,49 @@ if __name__ == "__main__":
             y_area,
             restartFile=restartFile,
             toml_file=toml_file,
-            fast=fast
+            fast=fast,
+            checkpoint_steps=checkpoint_steps,
+            checkpoint_seconds=checkpoint_seconds,
+            checkpoint_keep=checkpoint_keep,
+            resume=resume,
+            headless=headless,
+            abort_on_instability=abort_on_instability,
+            negative_tolerance=negative_tolerance,
+            engine=engine,
+            particles=particles,
+            reorder=reorder,
+            precision=precision,
+            xdmf=xdmf,
+            mesh=mesh,
+            sources=config.get("sources"),
+            exposure_threshold=setting.get("exposureThreshold"),
+            weathering=config.get("weathering"),
+            metrics_file=IO.get("metricsFile"),
+            metrics_interval=IO.get("metricsInterval", 5),
         )
+        if cache:
+            with open(diagnostics_file) as file:
+                diagnostics_csv = file.read()
+            cache.put(key, oil_area_time, mesh.to_original(mesh.oil_amounts()), diagnostics.summary(), diagnostics_csv)
 
         logger.info("Oil distribution over time:")
         for time_step, oil_value in oil_area_time.items():
             logger.info(f"  Time step {time_step}: Oil amount {oil_value}")
+        logger.info(f"Diagnostics: {diagnostics.summary()}")
         logger.info("Simulation Ended")
 
 
+    options = dict(
+        fast=fast,
+        resume=args.resume,
+        headless=args.headless,
+        adjoint=args.adjoint,
+        preview=args.preview,
+        use_cache=not args.no_cache,
+    )
     if args.find_all and args.folder:
         toml_files = process_all_configs(args.folder)
         for toml_file in toml_files:
-            run(toml_file, fast=fast)
+            run(toml_file, **options)
     else:
-        run(args.config, fast=fast)
+        run(args.config, **options)
@@ -0,0 +1,392 @@
+"""
+Long-running simulation service with a warm mesh cache and a job queue.
+
+The service keeps a pool of worker processes alive. Each worker imports the solver once and keeps the
+meshes it has loaded and preprocessed in memory, so repeated jobs against the same mesh skip interpreter
+startup, heavy imports and mesh preprocessing. Jobs are TOML configs in the same format as the files
+given to `main.py`, submitted over local HTTP. Progress and the fish area time series are streamed back
+as newline delimited JSON.
+
+Typical usage example:
+
+    python service.py --port 8202 --workers 4 --preload meshes/bay.msh
+
+    curl --data-binary @input.toml "http://127.0.0.1:8202/jobs?name=input"
+    curl "http://127.0.0.1:8202/jobs/<id>"
+
+Endpoints:
+    - `POST /jobs[?name=<name>]`: Submits the TOML config in the body. Responds with the id of the job.
+    - `GET /jobs/<id>`: Streams the events of a job, one JSON object per line, until the job is finished.
+      Events are `{"event": "progress", "step", "time", "oil_in_area"}` followed by either
+      `{"event": "done", "oil_area_time": [[time, oil], ...], "diagnostics"}` or `{"event": "error", "message"}`.
+    - `GET /jobs`: Lists the submitted jobs and whether they are finished.
+
+A finished job is removed once it was streamed to the end, or an hour after it finished. Configs with
+`outputTimes`, `outOfCore` or a `[nesting]` section are rejected, they only run with `main.py`.
+"""
+
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+import toml
+from config import validateConfig
+
+# Meshes loaded by the current worker process, keyed by absolute path and modification time
+_MESHES = {}
+# Queue the current worker process publishes job events to
+_EVENTS = None
+
+
+def _cached_mesh(mesh_path, reorder=None):
+    """
+    Returns a loaded and preprocessed mesh, reading it only the first time it is requested.
+    """
+    import src.Simulation.mesh as msh
+
+    key = (os.path.abspath(mesh_path), os.path.getmtime(mesh_path), reorder)
+    if key not in _MESHES:
+        mesh = msh.Mesh(mesh_path, msh.default_factory(), reorder)
+        mesh.precompute()
+        _MESHES[key] = mesh
+    return _MESHES[key]
+
+
+def _init_worker(events, preload):
+    """
+    Initializes a worker process: imports the solver and warms the mesh cache.
+    """
+    global _EVENTS
+    _EVENTS = events
+    import src.Simulation.solver  # noqa: F401
+
+    for mesh_path in preload:
+        _cached_mesh(mesh_path)
+
+
+def _ready():
+    return True
+
+
+def _run_job(job_id, name, config):
+    """
+    Runs a single simulation job in a worker process, publishing its events to the event queue.
+    """
+    import src.Simulation.solver as solve
+
+    def progress(step, current_time, oil_in_area):
+        _EVENTS.put(
+            (
+                job_id,
+                {
+                    "event": "progress",
+                    "step": step,
+                    "time": current_time,
+                    "oil_in_area": float(oil_in_area),
+                },
+            )
+        )
+
+    try:
+        setting = config["settings"]
+        geometry = config["geometry"]
+        IO = config["IO"]
+        restartFile = IO.get("restartFile")
+        if restartFile and not os.path.exists(restartFile):
+            restartFile = None
+
+        mesh = _cached_mesh(geometry["filepath"], setting.get("reorder"))
+        oil_area_time, diagnostics = solve.find_and_plot(
+            geometry["filepath"],
+            setting.get("t_start", 0),
+            setting["t_end"],
+            setting["nSteps"],
+            IO.get("writeFrequency"),
+            geometry["initial_oil_area"],
+            None,
+            np.float64(geometry["fish_area"][0]),
+            np.float64(geometry["fish_area"][1]),
+            restartFile=restartFile,
+            toml_file=name,
+            mesh=mesh,
+            progress=progress,
+            headless=not IO.get("writeFrequency"),
+            abort_on_instability=setting.get("abortOnInstability", False),
+            negative_tolerance=setting.get("negativeTolerance", 1e-8),
+            engine=setting.get("engine", "vectorized"),
+            particles=setting.get("particles"),
+            precision=setting.get("precision", "float64"),
+            xdmf=IO.get("xdmf", False),
+            sources=config.get("sources"),
+            exposure_threshold=setting.get("exposureThreshold"),
+            weathering=config.get("weathering"),
+            metrics_file=IO.get("metricsFile"),
+            metrics_interval=IO.get("metricsInterval", 5),
+        )
+        _EVENTS.put(
+            (
+                job_id,
+                {
+                    "event": "done",
+                    "oil_area_time": [
+                        [time, float(oil)] for time, oil in oil_area_time.items()
+                    ],
+                    "diagnostics": diagnostics.summary(),
+                },
+            )
+        )
+    except Exception as error:
+        _EVENTS.put((job_id, {"event": "error", "message": str(error)}))
+
+
+class Job:
+    """
+    A submitted simulation job and the events it has published so far.
+
+    The newest `max_events` events are kept, so a client connecting late receives the recent history and
+    the final event.
+
+    Args:
+        job_id (str): Id of the job.
+        name (str): Name of the job, used to name its results.
+        max_events (int): Number of events kept.
+    """
+
+    def __init__(self, job_id: str, name: str, max_events: int = 1000) -> None:
+        self._id = job_id
+        self._name = name
+        self._events = collections.deque(maxlen=max_events)
+        self._published = 0
+        self._finished = False
+        self._finished_at = None
+        self._streamed = False
+        self._condition = threading.Condition()
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    @property
+    def events(self) -> list[dict]:
+        """
+        The events kept for clients connecting later.
+        """
+        with self._condition:
+            return list(self._events)
+
+    def publish(self, event: dict) -> None:
+        """
+        Stores an event and wakes up every client streaming the job.
+        """
+        with self._condition:
+            if event["event"] in ("done", "error"):
+                self._finished = True
+                self._finished_at = time.monotonic()
+            self._events.append(event)
+            self._published += 1
+            self._condition.notify_all()
+
+    def stream(self, timeout: float = None):
+        """
+        Yields the events of the job as they arrive, until the job is finished. Events dropped before they
+        were streamed are skipped.
+        """
+        index = 0
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._published > index or self._finished, timeout)
+                first = self._published - len(self._events)
+                events = list(self._events)[max(index - first, 0) :]
+                index = self._published
+                finished = self._finished
+            yield from events
+            if finished:
+                with self._condition:
+                    self._streamed = True
+                return
+
+    def expired(self, ttl: float) -> bool:
+        """
+        Checks if the job is finished and was streamed to the end, or finished more than `ttl` seconds ago.
+        """
+        with self._condition:
+            return self._finished and (self._streamed or time.monotonic() - self._finished_at > ttl)
+
+
+class SimulationService:
+    """
+    Owns the worker pool and the submitted jobs, and routes events from the workers to the jobs.
+
+    Finished jobs are removed once a client streamed them to the end, or `ttl` seconds after they finished,
+    so a long-running service does not grow without bound.
+
+    Args:
+        workers (int): Number of worker processes.
+        preload (list[str]): Mesh files every worker loads and preprocesses at startup.
+        ttl (float): Seconds a finished job that was never streamed is kept.
+    """
+
+    def __init__(self, workers: int = 1, preload: list[str] = (), ttl: float = 3600.0) -> None:
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._ttl = ttl
+        self._events = multiprocessing.Queue()
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(self._events, list(preload)),
+        )
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+        # Starts the workers right away so the first job does not pay for the warm-up
+        for _ in range(workers):
+            self._pool.submit(_ready)
+
+    @property
+    def jobs(self) -> dict[str, Job]:
+        """
+        The jobs that are running, or finished and not yet removed.
+        """
+        self.evict()
+        with self._lock:
+            return dict(self._jobs)
+
+    def evict(self) -> None:
+        """
+        Removes the finished jobs that were streamed to the end or have outlived the time to live.
+        """
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items() if job.expired(self._ttl)]:
+                del self._jobs[job_id]
+
+    def _dispatch(self) -> None:
+        while True:
+            item = self._events.get()
+            if item is None:
+                return
+            job_id, event = item
+            with self._lock:
+                job = self._jobs.get(job_id)
+            if job:
+                job.publish(event)
+
+    def submit(self, payload: str, name: str = None) -> Job:
+        """
+        Validates a TOML config and queues it on the worker pool.
+
+        Raises:
+            ValueError, FileNotFoundError, KeyError: If the config is invalid, or uses output times, nesting
+            or the out-of-core mode, which only `main.py` runs.
+        """
+        config = toml.loads(payload)
+        validateConfig(config)
+        unsupported = [key for key in ("outputTimes", "outOfCore") if config["settings"].get(key)]
+        if config.get("nesting"):
+            unsupported.append("nesting")
+        if unsupported:
+            raise ValueError(f"The service does not run configs with {', '.join(unsupported)}, use main.py.")
+        self.evict()
+        job_id = uuid.uuid4().hex[:12]
+        job = Job(job_id, name or f"job_{job_id}")
+        with self._lock:
+            self._jobs[job_id] = job
+        self._pool.submit(_run_job, job_id, job.name, config)
+        return job
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
+        self._events.put(None)
+        self._dispatcher.join()
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    Handles the HTTP endpoints of the service. The service is available as `self.server.service`.
+    """
+
+    def _send_json(self, status: int, body) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/jobs":
+            self._send_json(404, {"error": f"Unknown endpoint {url.path}"})
+            return
+        name = parse_qs(url.query).get("name", [None])[0]
+        length = int(self.headers.get("Content-Length", 0))
+        payload = self.rfile.read(length).decode()
+        try:
+            job = self.server.service.submit(payload, name)
+        except (toml.TomlDecodeError, ValueError, FileNotFoundError, KeyError) as error:
+            self._send_json(400, {"error": str(error)})
+            return
+        self._send_json(202, {"job": job.id, "name": job.name})
+
+    def do_GET(self):
+        parts = urlparse(self.path).path.strip("/").split("/")
+        jobs = self.server.service.jobs
+        if parts == ["jobs"]:
+            self._send_json(
+                200, [{"job": job.id, "name": job.name, "finished": job.finished} for job in jobs.values()]
+            )
+        elif len(parts) == 2 and parts[0] == "jobs" and parts[1] in jobs:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            for event in jobs[parts[1]].stream():
+                self.wfile.write(json.dumps(event).encode() + b"\n")
+                self.wfile.flush()
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint {self.path}"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host: str = "127.0.0.1", port: int = 8202, workers: int = 1, preload=()):
+    """
+    Starts the service and handles requests until interrupted.
+    """
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.service = SimulationService(workers, preload)
+    print(f"Simulation service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the simulation service.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", default=8202, type=int, help="port to listen on")
+    parser.add_argument("--workers", default=1, type=int, help="number of worker processes")
+    parser.add_argument(
+        "--preload", nargs="*", default=[], help="mesh files to load when the workers start"
+    )
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.preload)
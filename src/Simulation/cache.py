@@ -0,0 +1,221 @@
+"""
+A module for a content addressed store of completed simulation results.
+
+Sweeps often run identical scenarios again. A run is identified by a hash of its normalized config, the
+contents of its mesh file (and restart file, if any) and the version of the solver source code. When a
+completed result with the same key exists, its oil in the fish area over time, final oil distribution,
+diagnostics summary and per step diagnostics are returned instead of simulating again. Only runs that write
+nothing but the restart file and the diagnostics are served from the cache, see `cacheable`.
+
+Every result is a single `.npz` file in the cache folder, written to a temporary file first and renamed
+into place. Reading a result marks it as recently used, and the least recently used results are removed
+once the cache grows beyond its size limit.
+
+Typical usage example:
+
+    cache = ResultCache("results/cache")
+    if cacheable(config, headless):
+        key = cache.key(config, restart_file)
+        cached = cache.get(key)
+        if cached is None:
+            oil_area_time, diagnostics = find_and_plot(...)
+            cache.put(key, oil_area_time, final_oil, diagnostics.summary(), diagnostics_csv)
+"""
+
+import glob
+import hashlib
+import json
+import os
+import numpy as np
+import numpy.typing as npt
+
+_SUFFIX = ".npz"
+
+# Keys of the IO section that only control how results are written, not the results themselves
+_IO_ONLY = (
+    "logName",
+    "writeFrequency",
+    "checkpointSteps",
+    "checkpointSeconds",
+    "checkpointKeep",
+    "xdmf",
+    "metricsFile",
+    "metricsInterval",
+)
+
+# Keys that make a headless run write outputs a cached result does not hold, by section. `writeFrequency`
+# only writes frames when rendering or with `xdmf`, so it is not one of them.
+_EXTRA_OUTPUTS = {
+    "settings": ("exposureThreshold",),
+    "IO": ("xdmf", "metricsFile", "checkpointSteps", "checkpointSeconds"),
+}
+
+
+def cacheable(config: dict, headless: bool) -> bool:
+    """
+    Checks if a run may be served from the cache, which only restores the restart file and the diagnostics.
+
+    Args:
+        config (dict): The config of the run.
+        headless (bool): Whether the run renders no frames or video.
+
+    Returns:
+        bool: True for headless runs without XDMF exports, exposure maps, weathering, metrics or
+        checkpoints.
+    """
+    if not headless or config.get("weathering"):
+        return False
+    return not any(config.get(section, {}).get(key) for section, keys in _EXTRA_OUTPUTS.items() for key in keys)
+
+
+def file_hash(filename: str) -> str:
+    """
+    Returns the SHA-256 hash of the contents of a file.
+    """
+    digest = hashlib.sha256()
+    with open(filename, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def solver_version() -> str:
+    """
+    Returns a hash of the source code of the simulation package, which changes with every solver change.
+    """
+    digest = hashlib.sha256()
+    folder = os.path.dirname(os.path.abspath(__file__))
+    for filename in sorted(glob.glob(os.path.join(folder, "*.py"))):
+        digest.update(os.path.basename(filename).encode())
+        digest.update(file_hash(filename).encode())
+    return digest.hexdigest()
+
+
+def _normalize(value):
+    """
+    Normalizes a config value, such that equal configs serialize equally, e.g. 0 and 0.0.
+    """
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    return float(value)
+
+
+class ResultCache:
+    """
+    Stores completed simulation results by the hash of everything that determines them.
+
+    Args:
+        folder (str): Folder the results are stored in.
+        max_bytes (int): Size limit of the cache, the least recently used results are removed beyond it.
+    """
+
+    def __init__(self, folder: str = "results/cache", max_bytes: int = 1 << 30) -> None:
+        self._folder = folder
+        self._max_bytes = max_bytes
+
+    def key(self, config: dict, restart_file: str = None) -> str:
+        """
+        Computes the key of a run from its config, as read by `config.readConfig`.
+
+        The mesh file and restart file enter the key by their contents, not their paths, and keys of
+        the IO section that do not change the results are ignored.
+
+        Args:
+            config (dict): The config of the run.
+            restart_file (str): The restart file the run starts from, or None.
+
+        Returns:
+            str: The key of the run.
+        """
+        geometry = dict(config["geometry"])
+        mesh_hash = file_hash(geometry.pop("filepath"))
+        IO = {key: value for key, value in config["IO"].items() if key not in _IO_ONLY and key != "restartFile"}
+        normalized = {
+            **{section: value for section, value in config.items() if section not in ("geometry", "IO")},
+            "geometry": geometry,
+            "IO": IO,
+            "mesh": mesh_hash,
+            "restart": file_hash(restart_file) if restart_file else None,
+            "solver": solver_version(),
+        }
+        return hashlib.sha256(json.dumps(_normalize(normalized), sort_keys=True).encode()).hexdigest()
+
+    def _filename(self, key: str) -> str:
+        return os.path.join(self._folder, f"{key}{_SUFFIX}")
+
+    def get(self, key: str) -> tuple[dict[float, float], npt.NDArray[np.float64], dict[str, float], str] | None:
+        """
+        Looks up a completed result and marks it as recently used.
+
+        Returns:
+            tuple[dict[float, float], npt.NDArray[np.float64], dict[str, float], str] | None: The oil in the
+            fish area over time, the final oil distribution, the diagnostics summary and the per step
+            diagnostics as CSV, or None if there is no readable result for the key.
+        """
+        filename = self._filename(key)
+        try:
+            with np.load(filename) as data:
+                oil_area_time = dict(zip(data["times"].tolist(), data["oil_in_area"].tolist()))
+                final_oil = data["final_oil"]
+                summary = json.loads(str(data["summary"]))
+                diagnostics = str(data["diagnostics"])
+        except (OSError, ValueError, KeyError):
+            return None
+        os.utime(filename)
+        return oil_area_time, final_oil, summary, diagnostics
+
+    def put(
+        self,
+        key: str,
+        oil_area_time: dict[float, float],
+        final_oil: npt.NDArray[np.float64],
+        summary: dict[str, float],
+        diagnostics: str = "",
+    ) -> str:
+        """
+        Stores a completed result, and removes the least recently used results beyond the size limit.
+
+        Args:
+            key (str): The key of the run.
+            oil_area_time (dict[float, float]): The oil in the fish area over time.
+            final_oil (npt.NDArray[np.float64]): The final oil distribution.
+            summary (dict[str, float]): The diagnostics summary.
+            diagnostics (str): The per step diagnostics as CSV, see `Diagnostics.write`.
+
+        Returns:
+            str: Path of the stored result.
+        """
+        os.makedirs(self._folder, exist_ok=True)
+        filename = self._filename(key)
+        temporary = f"{filename}.tmp"
+        with open(temporary, "wb") as file:
+            np.savez(
+                file,
+                times=np.array(list(oil_area_time.keys()), dtype=np.float64),
+                oil_in_area=np.array(list(oil_area_time.values()), dtype=np.float64),
+                final_oil=final_oil,
+                summary=json.dumps(summary),
+                diagnostics=diagnostics,
+            )
+        os.replace(temporary, filename)
+        self.evict()
+        return filename
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used results until the cache fits its size limit.
+        """
+        entries = sorted(
+            (os.path.getmtime(filename), os.path.getsize(filename), filename)
+            for filename in glob.glob(os.path.join(self._folder, f"*{_SUFFIX}"))
+        )
+        total = sum(size for _, size, _ in entries)
+        for _, size, filename in entries:
+            if total <= self._max_bytes:
+                break
+            os.remove(filename)
+            total -= size
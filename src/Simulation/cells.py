@@ -2,7 +2,11 @@
 A module defining geometric for a 2D mesh, including Points, Cells, and specialized cell types.
 
 This module provides classes to represent Points and Cells in a 2D mesh, including properties and methods for managing their geometry and interactions. 
-It also includes specialized cell types such as Vertex, Line, and Triangle, which inherit from the base `Cell` class. Genrating objects is handled by the mesh.py module.
+It also includes specialized cell types such as Vertex, Line, Triangle, Quadrilateral and Polygon, which inherit from the base `Cell` class. Genrating objects is handled by the mesh.py module.
+
+Geometric attributes of a cell (neighbors, midpoint, area, velocity and scaled normals) are
+computed lazily by the mesh the cell belongs to the first time they are accessed, and memoized
+afterwards. Assigning an attribute through its setter overrides the computed value.
 
 Typical usage example:
 
@@ -17,6 +21,16 @@ import numpy.typing as npt
 from typing import Self
 
 
+# Values of the geometric attributes for cells that are not computed by a mesh
+GEOMETRY_DEFAULTS = {
+    "neighbors": list,
+    "midpoint": lambda: np.float64([0, 0]),
+    "area": lambda: 0.0,
+    "velocity": lambda: np.float64([0, 0]),
+    "scaled_normal": list,
+}
+
+
 class Point:
     def __init__(self, index: int, x: float, y: float) -> None:
         self._index = index
@@ -41,14 +55,36 @@ class Cell:
         """
         self._index = index
         self._points = points
-        self._neighbors = []
+        self._neighbors = None
         self._oil_amount = 0.0 
         self._oil_change = 0.0
-        self._midpoint = np.float64([0, 0]) 
-        self._area = 0.0 
-        self._velocity = np.float64([0, 0]) 
-        self._scaled_normal = []
+        self._midpoint = None
+        self._area = None
+        self._velocity = None
+        self._scaled_normal = None
         self._num_points = num_points
+        self._mesh = None
+
+    def attach(self, mesh) -> None:
+        """
+        Binds the cell to the mesh responsible for computing its geometric attributes on demand.
+        """
+        self._mesh = mesh
+
+    def _lazy(self, name: str):
+        """
+        Returns a geometric attribute, computing and memoizing it on first access.
+
+        Cells that are not attached to a mesh fall back to the default value of the attribute.
+        """
+        value = getattr(self, f"_{name}")
+        if value is None:
+            if self._mesh is not None:
+                value = self._mesh.compute(self, name)
+            else:
+                value = GEOMETRY_DEFAULTS[name]()
+            setattr(self, f"_{name}", value)
+        return value
 
     @property
     def num_points(self) -> float:
@@ -80,7 +116,7 @@ class Cell:
     
     @property
     def midpoint(self) -> npt.NDArray[np.float64]:
-        return self._midpoint
+        return self._lazy("midpoint")
     
     @midpoint.setter
     def midpoint(self, mid_coordinates: npt.NDArray[np.float64]) -> None:
@@ -88,7 +124,7 @@ class Cell:
     
     @property
     def area(self) -> float:
-        return self._area
+        return self._lazy("area")
     
     @area.setter
     def area(self, area_of_cell: float) -> None:
@@ -96,7 +132,7 @@ class Cell:
     
     @property
     def scaled_normal(self) -> npt.NDArray[np.float64]:
-        return self._scaled_normal
+        return self._lazy("scaled_normal")
 
     @scaled_normal.setter
     def scaled_normal(self, scaled_vector: npt.NDArray[np.float64]) -> None:
@@ -104,7 +140,7 @@ class Cell:
 
     @property
     def velocity(self) -> npt.NDArray[np.float64]:
-        return self._velocity
+        return self._lazy("velocity")
     
     @velocity.setter
     def velocity(self, velocity_vector: npt.NDArray[np.float64]) -> None:
@@ -116,7 +152,7 @@ class Cell:
 
     @property
     def neighbors(self) -> list[Self]:
-        return self._neighbors
+        return self._lazy("neighbors")
 
     @neighbors.setter
     def neighbors(self, neighboring_cells: list[int]) -> None:
@@ -124,11 +160,11 @@ class Cell:
 
     def __str__(self):
         return f"""Current cell is {self._index}:
-                  midpoint: {self._midpoint},
-                  area: {self._area},
-                  normal: {self._scaled_normal},
-                  velocity: {self._velocity}
-                  neighbors: {[ngh.index for ngh in self._neighbors]}
+                  midpoint: {self.midpoint},
+                  area: {self.area},
+                  normal: {self.scaled_normal},
+                  velocity: {self.velocity}
+                  neighbors: {[ngh.index for ngh in self.neighbors]}
                   type: {self._type}
                     """
 
@@ -145,3 +181,11 @@ class Line(Cell):
 
 class Triangle(Cell):
     pass
+
+
+class Quadrilateral(Cell):
+    pass
+
+
+class Polygon(Cell):
+    pass
@@ -0,0 +1,221 @@
+"""
+A module for periodic checkpointing of the oil distribution during a simulation.
+
+Checkpoints are written as a single NumPy array holding the number of completed steps, the
+simulation time, the time step and number of steps of the run, the identifier of the run and the oil
+amount of every cell. The identifier is a hash of everything that determines the results, see `run_id`.
+Files are written to a temporary file first, flushed to disk and renamed into place, so a crash
+while writing never leaves a partial checkpoint behind. Only the newest checkpoints of a run are kept,
+and a run starting from the beginning removes the checkpoints of earlier runs. A checkpoint is only
+resumed by a run with the same time step, number of steps and identifier.
+
+Typical usage example:
+
+    run = run_id(mesh_path, restart_file, start_point=[0.35, 0.45], dt=dt)
+    checkpointer = Checkpointer("results/input_results/checkpoints", dt, intervals, run, every_steps=100)
+    checkpointer.clear()
+    for step in range(intervals):
+        ...
+        if checkpointer.due(step + 1):
+            checkpointer.write(step + 1, current_time, mesh.oil_amounts())
+
+    resumed = latest_checkpoint("results/input_results/checkpoints", len(mesh.cells), dt, intervals, run)
+"""
+
+import glob
+import hashlib
+import json
+import os
+import time
+import numpy as np
+import numpy.typing as npt
+from .cache import file_hash
+
+_PREFIX = "checkpoint_"
+_SUFFIX = ".npy"
+# Values stored before the oil amounts: step, time, dt, intervals and run identifier
+_HEADER = 5
+# Bits of the run identifier, such that it is exactly representable as a float
+_RUN_ID_BITS = 48
+
+
+def _checkpoint_files(folder: str) -> list[str]:
+    """
+    Returns the checkpoint files in a folder, oldest first.
+    """
+    return sorted(glob.glob(os.path.join(folder, f"{_PREFIX}*{_SUFFIX}")))
+
+
+def _run_of(filename: str) -> int | None:
+    """
+    Returns the run identifier in the header of a checkpoint, or None if it cannot be read.
+    """
+    try:
+        data = np.load(filename, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if data.ndim != 1 or len(data) < _HEADER:
+        return None
+    return int(data[4])
+
+
+def run_id(*files: str, **settings) -> int:
+    """
+    Identifies a run by a hash of the contents of its input files and the settings that determine its results.
+
+    Args:
+        *files (str): The mesh file and restart file of the run, None entries are skipped.
+        **settings: The settings of the run, e.g. the start point, time step, engine and sources.
+
+    Returns:
+        int: A 48 bit identifier of the run.
+    """
+    digest = hashlib.sha256(json.dumps(settings, sort_keys=True, default=repr).encode())
+    for filename in files:
+        if filename:
+            digest.update(file_hash(filename).encode())
+    return int.from_bytes(digest.digest(), "big") >> (256 - _RUN_ID_BITS)
+
+
+def write_checkpoint(
+    folder: str,
+    step: int,
+    current_time: float,
+    oil: npt.NDArray[np.float64],
+    dt: float,
+    intervals: int,
+    run: int = 0,
+) -> str:
+    """
+    Atomically writes a checkpoint for the given step.
+
+    Args:
+        folder (str): Folder the checkpoint is written to.
+        step (int): Number of completed time steps.
+        current_time (float): Simulation time after the completed steps.
+        oil (npt.NDArray[np.float64]): Oil amount of every cell, ordered by cell index.
+        dt (float): Time step of the run.
+        intervals (int): Number of time steps of the run.
+        run (int): Identifier of the run, see `run_id`.
+
+    Returns:
+        str: Path of the written checkpoint.
+    """
+    os.makedirs(folder, exist_ok=True)
+    filename = os.path.join(folder, f"{_PREFIX}{step:08d}{_SUFFIX}")
+    temporary = f"{filename}.tmp"
+    with open(temporary, "wb") as file:
+        np.save(file, np.concatenate(([step, current_time, dt, intervals, run], oil)))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, filename)
+    return filename
+
+
+def latest_checkpoint(
+    folder: str, num_cells: int, dt: float, intervals: int, run: int = 0
+) -> tuple[int, float, npt.NDArray[np.float64]] | None:
+    """
+    Finds the newest valid checkpoint in a folder.
+
+    A checkpoint is valid if it can be read, holds one value per cell, contains only finite values and
+    was written by a run with the same time step, number of steps and identifier.
+
+    Args:
+        folder (str): Folder containing the checkpoints.
+        num_cells (int): Number of cells in the mesh the checkpoint must match.
+        dt (float): Time step of the run the checkpoint must match.
+        intervals (int): Number of time steps of the run the checkpoint must match.
+        run (int): Identifier of the run the checkpoint must match, see `run_id`.
+
+    Returns:
+        tuple[int, float, npt.NDArray[np.float64]] | None: The completed steps, simulation time and
+        oil amounts of the newest valid checkpoint, or None if there is no valid checkpoint.
+    """
+    for filename in reversed(_checkpoint_files(folder)):
+        try:
+            data = np.load(filename)
+        except (OSError, ValueError):
+            continue
+        if data.shape != (num_cells + _HEADER,) or not np.all(np.isfinite(data)):
+            continue
+        if not np.isclose(data[2], dt, rtol=1e-12, atol=0) or data[3] != intervals or data[4] != run:
+            continue
+        return int(data[0]), float(data[1]), data[_HEADER:]
+    return None
+
+
+class Checkpointer:
+    """
+    Decides when checkpoints are due and writes them, keeping only the newest ones.
+
+    A checkpoint is due every `every_steps` completed steps, or when `every_seconds` of wall
+    time have passed since the last checkpoint, whichever comes first. Only the checkpoints of
+    this run are rotated.
+
+    Args:
+        folder (str): Folder the checkpoints are written to.
+        dt (float): Time step of the run.
+        intervals (int): Number of time steps of the run.
+        run (int): Identifier of the run, see `run_id`.
+        every_steps (int): Number of steps between checkpoints, or None.
+        every_seconds (float): Wall time in seconds between checkpoints, or None.
+        keep (int): Number of checkpoints kept in the folder.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        dt: float,
+        intervals: int,
+        run: int = 0,
+        every_steps: int = None,
+        every_seconds: float = None,
+        keep: int = 3,
+    ) -> None:
+        if keep < 1:
+            raise ValueError("At least one checkpoint must be kept.")
+        self._folder = folder
+        self._dt = dt
+        self._intervals = intervals
+        self._run = run
+        self._every_steps = every_steps
+        self._every_seconds = every_seconds
+        self._keep = keep
+        self._last_write = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._every_steps or self._every_seconds)
+
+    @property
+    def has_checkpoints(self) -> bool:
+        return bool(_checkpoint_files(self._folder))
+
+    def due(self, step: int) -> bool:
+        """
+        Returns True if a checkpoint should be written after the given number of completed steps.
+        """
+        if self._every_steps and step % self._every_steps == 0:
+            return True
+        if self._every_seconds:
+            return time.monotonic() - self._last_write >= self._every_seconds
+        return False
+
+    def clear(self) -> None:
+        """
+        Removes every checkpoint in the folder, for a run starting from the beginning.
+        """
+        for filename in _checkpoint_files(self._folder):
+            os.remove(filename)
+
+    def write(self, step: int, current_time: float, oil: npt.NDArray[np.float64]) -> str:
+        """
+        Writes a checkpoint and removes the oldest ones of this run beyond the retention limit.
+        """
+        filename = write_checkpoint(self._folder, step, current_time, oil, self._dt, self._intervals, self._run)
+        self._last_write = time.monotonic()
+        own = [name for name in _checkpoint_files(self._folder) if _run_of(name) == self._run]
+        for old in own[: -self._keep]:
+            os.remove(old)
+        return filename
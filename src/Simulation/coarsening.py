@@ -0,0 +1,178 @@
+"""
+A module for coarse previews of a simulation on agglomerated cells.
+
+The stable time step of the explicit scheme is limited by the smallest cells, so a full resolution run
+of a fine mesh takes many small steps. `CoarseMesh` agglomerates the triangles into coarse control
+volumes of about `factor` triangles each, and runs the same transport on them:
+
+    - The cells are binned on a square grid of the size of `factor` average triangles, and every bin is
+      split into the connected components of the neighbor graph within it, such that an aggregate never
+      spans a coastline. Aggregates smaller than half a bin, cut off by the coastline or a bin edge, are
+      merged into the neighbor aggregate they share the longest edge with, as they would limit the time
+      step of the whole preview.
+    - Prolongation P copies the oil amount of an aggregate to all its cells; restriction R averages the
+      oil amounts of the cells of an aggregate weighted by their area. Cells that do not carry oil flow
+      stay aggregates of their own.
+    - The coarse operator is R @ L @ P, with L the upwind transport operator of the fine mesh, so the
+      coarse scheme conserves the oil mass the same way the fine scheme does.
+
+The outflow of an aggregate scales with its perimeter and its content with its area, so the stable time
+step grows with the square root of `factor`. The prolonged oil distribution is piecewise constant per
+aggregate and smeared by the coarse resolution: a preview shows where a slick goes, not the amounts a
+full run would find.
+
+Typical usage example:
+
+    coarse = CoarseMesh(mesh.geometry, factor=16)
+    coarse_oil = coarse.restrict(mesh.oil_amounts())
+    for step in range(coarse.steps(end_time - start_time)):
+        coarse_oil += coarse_dt * coarse.operator @ coarse_oil
+    oil = coarse.prolong(coarse_oil)
+"""
+
+import numpy as np
+import numpy.typing as npt
+import scipy.sparse as sparse
+from scipy.sparse.csgraph import connected_components
+import src.Simulation.geometry as geo
+from .engines import transport_operator
+
+# Rounds of merging small aggregates into their neighbors
+_MERGE_ROUNDS = 4
+
+
+def aggregate(geometry: geo.MeshGeometry, factor: float = 16) -> npt.NDArray[np.int64]:
+    """
+    Agglomerates the cells of a mesh into connected aggregates of about `factor` cells.
+
+    Args:
+        geometry (geo.MeshGeometry): Geometry of the mesh.
+        factor (float): Number of cells of an aggregate, on average over the active cells.
+
+    Returns:
+        npt.NDArray[np.int64]: The aggregate of every cell, numbered from zero.
+
+    Raises:
+        ValueError: If `factor` is smaller than 1.
+    """
+    if factor < 1:
+        raise ValueError("The coarsening factor must be at least 1.")
+
+    active = geometry.active
+    num_cells = geometry.num_cells
+    first, second = geometry.face_cells.T
+    interior = active[first] & active[second]
+    lengths = np.linalg.norm(geometry.face_normals[interior], axis=1)
+    first, second = first[interior], second[interior]
+
+    target_area = factor * geometry.areas[active].mean()
+    bins = np.floor(geometry.midpoints / np.sqrt(target_area)).astype(np.int64)
+    bins -= bins.min(axis=0)
+    bin_index = bins[:, 0] * (bins[:, 1].max() + 1) + bins[:, 1]
+    same_bin = bin_index[first] == bin_index[second]
+    graph = sparse.coo_matrix(
+        (np.ones(np.count_nonzero(same_bin)), (first[same_bin], second[same_bin])), shape=(num_cells, num_cells)
+    )
+    num_aggregates, labels = connected_components(graph, directed=False)
+
+    for _ in range(_MERGE_ROUNDS):
+        area = np.bincount(labels, np.where(active, geometry.areas, 0), num_aggregates)
+        first_label, second_label = labels[first], labels[second]
+        crossing = first_label != second_label
+        shared = sparse.coo_matrix(
+            (lengths[crossing], (first_label[crossing], second_label[crossing])),
+            shape=(num_aggregates, num_aggregates),
+        ).tocsr()
+        shared = (shared + shared.T).tocsr()
+        small = np.flatnonzero((area > 0) & (area < 0.5 * target_area) & (np.diff(shared.indptr) > 0))
+        if len(small) == 0:
+            break
+        merged = np.arange(num_aggregates)
+        partners = np.asarray(shared[small].argmax(axis=1)).ravel()
+        merged[small] = partners
+        # Two small aggregates choosing each other are both merged into the lower one, after which
+        # chains of small aggregates merged into each other are followed to their end
+        mutual = merged[partners] == small
+        merged[small[mutual]] = np.minimum(small[mutual], partners[mutual])
+        while True:
+            following = merged[merged]
+            if np.array_equal(following, merged):
+                break
+            merged = following
+        _, labels = np.unique(merged[labels], return_inverse=True)
+        num_aggregates = int(labels.max()) + 1
+    return labels.astype(np.int64)
+
+
+class CoarseMesh:
+    """
+    The aggregates of a mesh, with the transfer operators and the transport operator between them.
+
+    Args:
+        geometry (geo.MeshGeometry): Geometry of the fine mesh.
+        factor (float): Number of cells of an aggregate, on average.
+    """
+
+    def __init__(self, geometry: geo.MeshGeometry, factor: float = 16) -> None:
+        self._aggregates = aggregate(geometry, factor)
+        num_cells = geometry.num_cells
+        self._num_aggregates = int(self._aggregates.max()) + 1
+        self._prolongation = sparse.csr_matrix(
+            (np.ones(num_cells), (np.arange(num_cells), self._aggregates)), shape=(num_cells, self._num_aggregates)
+        )
+        weights = np.where(geometry.active, geometry.areas, 1.0)
+        self._restriction = (
+            sparse.diags(1 / (self._prolongation.T @ weights)) @ self._prolongation.T @ sparse.diags(weights)
+        ).tocsr()
+        self._operator = (self._restriction @ transport_operator(geometry) @ self._prolongation).tocsr()
+        self._operator.eliminate_zeros()
+
+    @property
+    def num_cells(self) -> int:
+        return self._num_aggregates
+
+    @property
+    def aggregates(self) -> npt.NDArray[np.int64]:
+        """
+        The aggregate of every fine cell.
+        """
+        return self._aggregates
+
+    @property
+    def operator(self) -> sparse.csr_matrix:
+        """
+        The transport operator of the aggregates, d(oil)/dt = operator @ oil.
+        """
+        return self._operator
+
+    def stable_dt(self) -> float:
+        """
+        The largest time step of the explicit scheme on the aggregates that keeps the oil positive.
+        """
+        largest_rate = -self._operator.diagonal().min(initial=0.0)
+        return 1 / largest_rate if largest_rate > 0 else np.inf
+
+    def steps(self, duration: float) -> int:
+        """
+        The number of explicit steps needed to cover `duration` within the stable time step.
+        """
+        return max(1, int(np.ceil(duration / self.stable_dt())))
+
+    def restrict(self, oil: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        """
+        The area weighted average oil amount of every aggregate.
+        """
+        return self._restriction @ oil
+
+    def prolong(self, coarse_oil: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        """
+        The oil amount of every fine cell, that of its aggregate.
+        """
+        return coarse_oil[self._aggregates]
+
+    def cell_counts(self, cells: npt.NDArray[np.int64]) -> npt.NDArray[np.float64]:
+        """
+        The number of the given fine cells in every aggregate, such that the oil of the prolonged
+        distribution in those cells is np.dot(counts, coarse_oil).
+        """
+        return np.bincount(self._aggregates[cells], minlength=self._num_aggregates).astype(np.float64)
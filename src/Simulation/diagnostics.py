@@ -0,0 +1,177 @@
+"""
+A module for conservation and stability diagnostics computed while a simulation runs.
+
+The diagnostics are running reductions over the array of oil amounts, so they do not need any extra
+passes over the cell objects. For every step the total oil mass (area weighted, accumulated in float64),
+the smallest and largest oil amount of the cells carrying oil flow and the CFL number are recorded. Optionally the simulation is aborted
+as soon as the oil amounts become non-finite or negative beyond a tolerance.
+
+Typical usage example:
+
+    geometry = mesh.geometry
+    diagnostics = Diagnostics(geometry.areas, cfl_numbers(geometry, dt), num_steps=100, active=geometry.active)
+    for step in range(100):
+        ...
+        diagnostics.record(step + 1, current_time, oil)
+    diagnostics.write("results/input_results/diagnostics.csv")
+"""
+
+import numpy as np
+import numpy.typing as npt
+import src.Simulation.geometry as geo
+
+
+class InstabilityError(Exception):
+    """
+    Raised when a simulation becomes unstable and diagnostics are set to abort.
+    """
+
+
+def cfl_numbers(geometry: geo.MeshGeometry, dt: float) -> npt.NDArray[np.float64]:
+    """
+    Computes the CFL number of every cell for the explicit upwind scheme.
+
+    The CFL number of a cell is the fraction of its oil that leaves through its edges in one step,
+    dt / area * sum of the outgoing normal velocities. The explicit scheme is stable while it is at most 1.
+
+    Args:
+        geometry (geo.MeshGeometry): Geometry of the mesh.
+        dt (float): Time step of the simulation.
+
+    Returns:
+        npt.NDArray[np.float64]: CFL number of every cell, zero for cells not carrying oil flow.
+    """
+    first = geometry.face_cells[:, 0]
+    second = geometry.face_cells[:, 1]
+    v_mid = 0.5 * (geometry.velocities[first] + geometry.velocities[second])
+    normal_velocity = np.einsum("fi,fi->f", geometry.face_normals, v_mid)
+    num_cells = geometry.num_cells
+    outflow = np.bincount(first, np.maximum(normal_velocity, 0.0), num_cells) + np.bincount(
+        second, np.maximum(-normal_velocity, 0.0), num_cells
+    )
+    cfl = np.zeros(num_cells)
+    active = geometry.active
+    cfl[active] = dt / geometry.areas[active] * outflow[active]
+    return cfl
+
+
+class Diagnostics:
+    """
+    Records conservation and stability diagnostics for every step of a simulation.
+
+    Args:
+        areas (npt.NDArray[np.float64]): Area of every cell, zero for cells not carrying oil flow.
+        cfl (npt.NDArray[np.float64]): CFL number of every cell.
+        num_steps (int): Maximum number of steps that will be recorded.
+        abort (bool): Raise an InstabilityError when the oil amounts become non-finite or too negative.
+        tolerance (float): Most negative oil amount accepted before the simulation is considered unstable.
+        active (npt.NDArray[np.bool_]): Mask of the cells carrying oil flow, the cells with an area by default.
+            The smallest and largest oil amounts are taken over these cells only.
+    """
+
+    def __init__(
+        self,
+        areas: npt.NDArray[np.float64],
+        cfl: npt.NDArray[np.float64],
+        num_steps: int,
+        abort: bool = False,
+        tolerance: float = 1e-8,
+        active: npt.NDArray[np.bool_] = None,
+    ) -> None:
+        self._areas = np.asarray(areas, dtype=np.float64)
+        self._active = np.flatnonzero(self._areas > 0 if active is None else active)
+        self._cfl = float(np.max(cfl, initial=0.0))
+        self._abort = abort
+        self._tolerance = tolerance
+        self._count = 0
+        self._initial_mass = None
+        self._steps = np.zeros(num_steps, dtype=np.int64)
+        self._times = np.zeros(num_steps)
+        self._mass = np.zeros(num_steps)
+        self._min_oil = np.zeros(num_steps)
+        self._max_oil = np.zeros(num_steps)
+
+    @property
+    def max_cfl(self) -> float:
+        return self._cfl
+
+    @property
+    def mass(self) -> float:
+        """
+        The mass after the last recorded step, or the initial mass before the first step.
+        """
+        return float(self._mass[self._count - 1]) if self._count else self._initial_mass
+
+    def start(self, oil: npt.NDArray[np.float64]) -> None:
+        """
+        Records the mass of the initial oil distribution.
+        """
+        self._initial_mass = float(np.dot(self._areas, oil))
+
+    def record(self, step: int, current_time: float, oil: npt.NDArray[np.float64]) -> None:
+        """
+        Records the diagnostics of the oil distribution after a step.
+
+        Raises:
+            InstabilityError: If aborting is enabled and the oil amounts are non-finite or too negative.
+        """
+        mass = np.dot(self._areas, oil.astype(np.float64, copy=False))
+        active_oil = oil[self._active]
+        min_oil = active_oil.min()
+        max_oil = active_oil.max()
+
+        count = self._count
+        self._steps[count] = step
+        self._times[count] = current_time
+        self._mass[count] = mass
+        self._min_oil[count] = min_oil
+        self._max_oil[count] = max_oil
+        self._count += 1
+
+        if self._abort:
+            if not (np.isfinite(mass) and np.isfinite(min_oil) and np.isfinite(max_oil)):
+                raise InstabilityError(f"Oil amounts became non-finite at step {step}, time {current_time}")
+            if min_oil < -self._tolerance:
+                raise InstabilityError(
+                    f"Oil amount {min_oil} is negative beyond the tolerance at step {step}, time {current_time}"
+                )
+
+    def summary(self) -> dict[str, float]:
+        """
+        Returns the main diagnostics of the run: mass conservation, oil extremes and the CFL number.
+        """
+        count = self._count
+        final_mass = float(self._mass[count - 1]) if count else self._initial_mass
+        initial_mass = self._initial_mass if self._initial_mass is not None else final_mass
+        return {
+            "steps": count,
+            "initial_mass": initial_mass,
+            "final_mass": final_mass,
+            "mass_change": (final_mass - initial_mass) / initial_mass if initial_mass else 0.0,
+            "min_oil": float(self._min_oil[:count].min()) if count else None,
+            "max_oil": float(self._max_oil[:count].max()) if count else None,
+            "max_cfl": self._cfl,
+        }
+
+    def write(self, filename: str) -> None:
+        """
+        Writes the per step diagnostics as a CSV file.
+        """
+        count = self._count
+        np.savetxt(
+            filename,
+            np.column_stack(
+                (
+                    self._steps[:count],
+                    self._times[:count],
+                    self._mass[:count],
+                    self._min_oil[:count],
+                    self._max_oil[:count],
+                    np.full(count, self._cfl),
+                )
+            ),
+            delimiter=",",
+            header="step,time,mass,min_oil,max_oil,cfl",
+            comments="",
+            fmt=["%d", "%.10g", "%.17g", "%.17g", "%.17g", "%.10g"],
+        )
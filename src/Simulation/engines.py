@@ -0,0 +1,403 @@
+"""
+A module defining the time stepping engines that advance the oil distribution of a mesh.
+
+Every engine is created for a mesh and a time step, and advances an array of oil amounts, ordered by
+cell index, by one time step in place with `step`. Engines are registered by name in `ENGINES` and
+selected with the `engine` key in the settings section of the config file. Engines built on a sparse
+operator also provide `adjoint_step`, which applies the transposed step to integrate sensitivities
+backward in time.
+
+    - `reference`: The original per cell update through the Cell objects, using `Mesh.calculate_change`.
+    - `vectorized`: The same explicit upwind scheme, as one sparse matrix-vector product per step.
+    - `implicit`: The implicit (backward Euler) upwind scheme, stable for time steps far beyond the CFL limit.
+    - `multirate`: The explicit upwind scheme with a time step per cell, see `MultirateEngine`.
+    - `particles`: Lagrangian tracking of oil parcels, binned onto the cells, see `particles.ParticleEngine`.
+
+Every engine optionally weathers the oil after every step, see `weathering.Weathering`. The vectorized
+engine folds the weathering factors into its step operator, so weathering costs nothing extra per step.
+
+The vectorized engines can store the oil amounts and their coefficients in float32 instead of float64,
+which halves the memory traffic of every step. Diagnostics are still accumulated in float64.
+
+Typical usage example:
+
+    engine = make_engine("vectorized", mesh, dt, np.float32)
+    oil = mesh.oil_amounts().astype(np.float32)
+    for step in range(intervals):
+        engine.step(oil)
+"""
+
+import numpy as np
+import numpy.typing as npt
+import scipy.sparse as sparse
+import scipy.sparse.linalg as linalg
+import src.Simulation.mesh as msh
+import src.Simulation.cells as cls
+import src.Simulation.geometry as geo
+from .particles import ParticleEngine
+from .weathering import Weathering
+
+
+def face_coefficients(
+    geometry: geo.MeshGeometry,
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """
+    Computes the upwind coefficients of every face and the inverse area of every cell.
+
+    The flux over a face is oil[first] * outflow + oil[second] * inflow, with outflow = max(v.n, 0) and
+    inflow = min(v.n, 0) for the velocity v interpolated to the face and its scaled normal n.
+
+    Args:
+        geometry (geo.MeshGeometry): Geometry of the mesh.
+
+    Returns:
+        tuple[npt.NDArray[np.float64], npt.NDArray[np.float64], npt.NDArray[np.float64]]: The outflow and
+        inflow coefficient of every face, and the inverse area of every cell, zero for cells that do not
+        carry oil flow.
+    """
+    first = geometry.face_cells[:, 0]
+    second = geometry.face_cells[:, 1]
+    v_mid = 0.5 * (geometry.velocities[first] + geometry.velocities[second])
+    normal_velocity = np.einsum("fi,fi->f", geometry.face_normals, v_mid)
+    inverse_area = np.zeros(geometry.num_cells)
+    inverse_area[geometry.active] = 1 / geometry.areas[geometry.active]
+    return np.maximum(normal_velocity, 0.0), np.minimum(normal_velocity, 0.0), inverse_area
+
+
+def operator_entries(
+    geometry: geo.MeshGeometry, weights: npt.NDArray[np.float64] = None
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64], npt.NDArray[np.float64]]:
+    """
+    Computes the entries of the upwind transport operator, four for every face, see `transport_operator`.
+
+    Args:
+        geometry (geo.MeshGeometry): Geometry of the mesh.
+        weights (npt.NDArray[np.float64]): Factor of the flux over every face, or None for all ones.
+
+    Returns:
+        tuple[npt.NDArray[np.int64], npt.NDArray[np.int64], npt.NDArray[np.float64]]: The row, column and
+        value of every entry, for the faces in the order of `geometry.face_cells`, with duplicates.
+    """
+    first = geometry.face_cells[:, 0]
+    second = geometry.face_cells[:, 1]
+    outflow, inflow, inverse_area = face_coefficients(geometry)
+    if weights is not None:
+        outflow, inflow = outflow * weights, inflow * weights
+
+    rows = np.concatenate((first, first, second, second))
+    columns = np.concatenate((first, second, first, second))
+    values = np.concatenate(
+        (
+            -outflow * inverse_area[first],
+            -inflow * inverse_area[first],
+            outflow * inverse_area[second],
+            inflow * inverse_area[second],
+        )
+    )
+    return rows, columns, values
+
+
+def transport_operator(
+    geometry: geo.MeshGeometry, dtype=np.float64, weights: npt.NDArray[np.float64] = None
+) -> sparse.csr_matrix:
+    """
+    Assembles the semi-discrete upwind transport operator of a mesh.
+
+    The oil distribution evolves as d(oil)/dt = L @ oil. For every face, the upwind flux
+    oil[first] * max(v.n, 0) + oil[second] * min(v.n, 0) leaves the first cell and enters the second,
+    scaled by the inverse area of each cell. Rows of cells that do not carry oil flow are zero, so their
+    oil amount never changes.
+
+    Args:
+        geometry (geo.MeshGeometry): Geometry of the mesh.
+        dtype: Floating point type of the entries.
+        weights (npt.NDArray[np.float64]): Factor of the flux over every face, or None for all ones. Faces
+            with a zero weight are left out.
+
+    Returns:
+        sparse.csr_matrix: The operator L, of shape (cells, cells).
+    """
+    rows, columns, values = operator_entries(geometry, weights)
+    operator = sparse.csr_matrix(
+        (values, (rows, columns)), shape=(geometry.num_cells, geometry.num_cells)
+    )
+    operator.sum_duplicates()
+    operator.eliminate_zeros()
+    return operator.astype(dtype)
+
+
+class ReferenceEngine:
+    """
+    Advances the oil distribution cell by cell through the Cell objects of the mesh.
+
+    This is the original, slow implementation of the scheme, kept as the reference the faster
+    engines are validated against. The cells are kept in sync with the oil array.
+
+    Args:
+        mesh (msh.Mesh): The mesh to simulate on.
+        dt (float): Time step of the simulation.
+        dtype: Floating point type of the oil amounts, only float64 is supported.
+        weathering (Weathering): Weathering applied after every step, or None.
+    """
+
+    def __init__(self, mesh: msh.Mesh, dt: float, dtype=np.float64, weathering: Weathering = None) -> None:
+        if np.dtype(dtype) != np.float64:
+            raise Exception("The reference engine only supports float64 precision")
+        mesh.precompute()
+        self._mesh = mesh
+        self._dt = dt
+        self._weathering = weathering
+        self._cells = [
+            cell
+            for cell in mesh.cells
+            if not isinstance(cell, cls.Vertex) and not isinstance(cell, cls.Line)
+        ]
+
+    def step(self, oil: npt.NDArray[np.float64]) -> None:
+        """
+        Advances the oil distribution by one time step in place.
+        """
+        self._mesh.set_oil_amounts(oil)
+        for cell in self._cells:
+            self._mesh.calculate_change(cell, self._dt)
+
+        for cell in self._cells:
+            cell.oil_amount += cell.oil_change
+            cell.oil_change = 0
+            oil[cell.index] = cell.oil_amount
+
+        if self._weathering:
+            self._weathering.apply(oil)
+
+
+class VectorizedEngine:
+    """
+    Advances the oil distribution with the explicit upwind scheme, for all faces at once.
+
+    The velocity field is steady, so the upwind coefficients of every face are assembled once into the
+    sparse matrix dt * L (see `transport_operator`). Every step is then a single sparse matrix-vector
+    product, oil += (dt * L) @ oil. The adjoint step uses the transposed matrix.
+
+    With weathering, the step operator becomes diag(factor) @ (I + dt * L) - I, which has the same
+    sparsity, so a weathered step costs the same as a plain one.
+
+    Args:
+        mesh (msh.Mesh): The mesh to simulate on.
+        dt (float): Time step of the simulation.
+        dtype: Floating point type of the oil amounts and the coefficients.
+        weathering (Weathering): Weathering folded into every step, or None.
+    """
+
+    def __init__(self, mesh: msh.Mesh, dt: float, dtype=np.float64, weathering: Weathering = None) -> None:
+        step_operator = dt * transport_operator(mesh.geometry)
+        self._weathering = weathering
+        self._stranding = None
+        if weathering:
+            step_operator, self._stranding = weathering.fuse(step_operator)
+        self._step_operator = step_operator.astype(dtype)
+        self._adjoint_operator = None
+
+    def step(self, oil: npt.NDArray[np.float64]) -> None:
+        """
+        Advances the oil distribution by one time step in place.
+        """
+        if self._stranding is not None:
+            self._weathering.record(self._stranding, oil)
+        oil += self._step_operator @ oil
+
+    def adjoint_step(self, sensitivity: npt.NDArray[np.float64]) -> None:
+        """
+        Moves a sensitivity one time step backward in place, applying the transposed step.
+        """
+        if self._adjoint_operator is None:
+            self._adjoint_operator = self._step_operator.T.tocsr()
+        sensitivity += self._adjoint_operator @ sensitivity
+
+
+class ImplicitEngine:
+    """
+    Advances the oil distribution with the implicit (backward Euler) upwind scheme.
+
+    Every step solves (I - dt * L) @ oil_new = oil for the new oil distribution. The velocity field is
+    steady, so the system is assembled and factorized with a sparse LU decomposition once, and the
+    factorization is reused for every step. The scheme is stable and keeps oil amounts non-negative for
+    any time step, at the cost of more numerical diffusion for large time steps.
+
+    Args:
+        mesh (msh.Mesh): The mesh to simulate on.
+        dt (float): Time step of the simulation.
+        dtype: Floating point type of the oil amounts and the factorization.
+        weathering (Weathering): Weathering applied after every step, or None.
+    """
+
+    unconditionally_stable = True
+
+    def __init__(self, mesh: msh.Mesh, dt: float, dtype=np.float64, weathering: Weathering = None) -> None:
+        operator = transport_operator(mesh.geometry)
+        system = sparse.identity(operator.shape[0], format="csc") - dt * operator.tocsc()
+        self._factorization = linalg.splu(system.astype(dtype).tocsc())
+        self._weathering = weathering
+
+    def step(self, oil: npt.NDArray[np.float64]) -> None:
+        """
+        Advances the oil distribution by one time step in place.
+        """
+        oil[:] = self._factorization.solve(oil)
+        if self._weathering:
+            self._weathering.apply(oil)
+
+    def adjoint_step(self, sensitivity: npt.NDArray[np.float64]) -> None:
+        """
+        Moves a sensitivity one time step backward in place, solving with the transposed system.
+        """
+        if self._weathering:
+            np.multiply(sensitivity, self._weathering.factor, out=sensitivity)
+        sensitivity[:] = self._factorization.solve(sensitivity, trans="T")
+
+
+def step_levels(geometry: geo.MeshGeometry, dt: float) -> npt.NDArray[np.int64]:
+    """
+    Computes the time step level of every cell: the smallest level k for which the cell is stable with the
+    explicit upwind scheme at a time step of dt / 2^k, that is, its CFL number at dt is at most 2^k.
+
+    Args:
+        geometry (geo.MeshGeometry): Geometry of the mesh.
+        dt (float): Time step of the simulation.
+
+    Returns:
+        npt.NDArray[np.int64]: The level of every cell, zero for cells that do not carry oil flow.
+    """
+    cfl = -dt * transport_operator(geometry).diagonal()
+    levels = np.zeros(geometry.num_cells, dtype=np.int64)
+    unstable = cfl > 1
+    levels[unstable] = np.ceil(np.log2(cfl[unstable]))
+    return levels
+
+
+class MultirateEngine:
+    """
+    Advances the oil distribution with the explicit upwind scheme, stepping every cell at its own rate.
+
+    Every cell is assigned the level k of the time step dt / 2^k it is stable with (see `step_levels`), so
+    the small cells near the coastline no longer limit the time step of the whole mesh. Every face is
+    stepped at the finer level of its two cells. A step of dt is split into 2^K substeps, with K the finest
+    level, and the faces of level k are stepped at every 2^(K - k)-th substep, with a time step of dt / 2^k.
+    The flux over a face leaves one cell and enters the other in the same substep, so the scheme conserves
+    the oil mass, also over the interfaces between levels, and keeps the oil amounts non-negative for any dt.
+
+    The faces due at a substep are those of a level and all finer levels. The cells are sorted by the finest
+    level of their faces, so the cells changed at a substep are the first cells in that order, and every
+    substep is one sparse matrix-vector product over a contiguous slice of the sorted oil amounts, with the
+    step operator of its level assembled once. A cell is updated about 2^k times per step, with k the finest
+    level of its faces, instead of 2^K times, see `updates`.
+
+    Args:
+        mesh (msh.Mesh): The mesh to simulate on.
+        dt (float): Time step of the simulation.
+        dtype: Floating point type of the oil amounts and the coefficients.
+        weathering (Weathering): Weathering applied after every step, or None.
+    """
+
+    unconditionally_stable = True
+
+    def __init__(self, mesh: msh.Mesh, dt: float, dtype=np.float64, weathering: Weathering = None) -> None:
+        geometry = mesh.geometry
+        self._levels = step_levels(geometry, dt)
+        face_levels = self._levels[geometry.face_cells].max(axis=1)
+        finest = int(self._levels.max())
+
+        # Sorts the cells by the finest level of their faces, the cells without oil flow last
+        row_levels = np.zeros(geometry.num_cells, dtype=np.int64)
+        np.maximum.at(row_levels, geometry.face_cells[:, 0], face_levels)
+        np.maximum.at(row_levels, geometry.face_cells[:, 1], face_levels)
+        row_levels[~geometry.active] = -1
+        self._order = np.argsort(-row_levels, kind="stable")
+        self._sizes = [int(np.count_nonzero(row_levels >= level)) for level in range(finest + 1)]
+        sorted_index = np.empty_like(self._order)
+        sorted_index[self._order] = np.arange(len(self._order))
+
+        # The step operator of every level, from the entries of its faces and all finer faces
+        rows, columns, values = operator_entries(geometry, dt / 2.0**face_levels)
+        entry_levels = np.tile(face_levels, 4)
+        rows, columns = sorted_index[rows], sorted_index[columns]
+        self._operators = []
+        for level, size in enumerate(self._sizes):
+            kept = (entry_levels >= level) & (values != 0)
+            operator = sparse.csr_matrix(
+                (values[kept], (rows[kept], columns[kept])), shape=(size, geometry.num_cells)
+            )
+            operator.sum_duplicates()
+            self._operators.append(operator.astype(dtype))
+        self._adjoint_operators = None
+
+        # The coarsest level due at every substep: all levels at the first, and at substep m the levels
+        # whose substep 2^(K - k) divides m
+        self._schedule = [0] + [finest - ((m & -m).bit_length() - 1) for m in range(1, 2**finest)]
+        self._weathering = weathering
+
+    @property
+    def levels(self) -> npt.NDArray[np.int64]:
+        """
+        The time step level of every cell.
+        """
+        return self._levels
+
+    @property
+    def updates(self) -> int:
+        """
+        The number of cell updates of a step.
+        """
+        return sum(self._sizes[level] for level in self._schedule)
+
+    def step(self, oil: npt.NDArray[np.float64]) -> None:
+        """
+        Advances the oil distribution by one time step in place.
+        """
+        sorted_oil = oil[self._order]
+        for level in self._schedule:
+            sorted_oil[: self._sizes[level]] += self._operators[level] @ sorted_oil
+        oil[self._order] = sorted_oil
+        if self._weathering:
+            self._weathering.apply(oil)
+
+    def adjoint_step(self, sensitivity: npt.NDArray[np.float64]) -> None:
+        """
+        Moves a sensitivity one time step backward in place, applying the transposed substeps in reverse.
+        """
+        if self._adjoint_operators is None:
+            self._adjoint_operators = [operator.T.tocsr() for operator in self._operators]
+        if self._weathering:
+            np.multiply(sensitivity, self._weathering.factor, out=sensitivity)
+        sorted_sensitivity = sensitivity[self._order]
+        for level in reversed(self._schedule):
+            sorted_sensitivity += self._adjoint_operators[level] @ sorted_sensitivity[: self._sizes[level]]
+        sensitivity[self._order] = sorted_sensitivity
+
+
+PRECISIONS = {
+    "float64": np.float64,
+    "float32": np.float32,
+}
+
+
+ENGINES = {
+    "reference": ReferenceEngine,
+    "vectorized": VectorizedEngine,
+    "implicit": ImplicitEngine,
+    "multirate": MultirateEngine,
+    "particles": ParticleEngine,
+}
+
+
+def make_engine(name: str, mesh: msh.Mesh, dt: float, dtype=np.float64, weathering: Weathering = None, **options):
+    """
+    Creates the engine registered under the given name, storing oil amounts as `dtype`, and weathering
+    the oil after every step if `weathering` is given. Further options, such as `num_particles`, are passed
+    to the engine.
+
+    Raises:
+        Exception: If no engine is registered under the name.
+    """
+    if name not in ENGINES:
+        raise Exception(f"Unknown engine: {name}, choose one of {', '.join(ENGINES)}")
+    return ENGINES[name](mesh, dt, dtype, weathering, **options)
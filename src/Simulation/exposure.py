@@ -0,0 +1,152 @@
+"""
+A module for exposure maps, per cell reductions over the whole oil distribution history.
+
+Arrival times and maximum exposure could be found by storing every frame of a run and processing them
+afterwards. `ExposureMap` instead keeps three running reductions of the oil amount of every cell,
+updated in place after every step without allocating:
+
+    - arrival: the first time the oil amount exceeds a threshold, infinite if it never does,
+    - peak: the largest oil amount,
+    - dose: the oil amount integrated over time, summing the oil amount after every step times dt.
+
+They are written once at the end of the run as arrays, and can be rendered as maps with the raster
+renderer, replacing the frames of the whole run with three arrays.
+
+Typical usage example:
+
+    exposure = ExposureMap(len(oil), threshold=0.01)
+    exposure.start(oil, start_time)
+    for step in range(intervals):
+        engine.step(oil)
+        current_time += dt
+        exposure.update(oil, current_time, dt)
+    exposure.save("results/input_results/input_exposure.npz", mesh.to_original)
+"""
+
+import os
+import numpy as np
+import numpy.typing as npt
+
+
+class ExposureMap:
+    """
+    Keeps the arrival time, peak oil amount and time-integrated dose of every cell.
+
+    Args:
+        num_cells (int): Number of cells.
+        threshold (float): Oil amount a cell has to exceed for the oil to have arrived.
+    """
+
+    def __init__(self, num_cells: int, threshold: float) -> None:
+        self._threshold = threshold
+        self._arrival = np.full(num_cells, np.inf)
+        self._peak = np.zeros(num_cells)
+        self._dose = np.zeros(num_cells)
+        self._exceeded = np.zeros(num_cells, dtype=bool)
+        self._pending = np.ones(num_cells, dtype=bool)
+        self._scratch = np.zeros(num_cells)
+
+    @property
+    def threshold(self) -> float:
+        return self._threshold
+
+    @property
+    def arrival(self) -> npt.NDArray[np.float64]:
+        return self._arrival
+
+    @property
+    def peak(self) -> npt.NDArray[np.float64]:
+        return self._peak
+
+    @property
+    def dose(self) -> npt.NDArray[np.float64]:
+        return self._dose
+
+    def start(self, oil: npt.NDArray[np.float64], current_time: float) -> None:
+        """
+        Starts the reductions from the initial oil distribution.
+        """
+        self._arrival[:] = np.inf
+        self._peak[:] = oil
+        self._dose[:] = 0
+        self._pending[:] = True
+        self._mark_arrivals(oil, current_time)
+
+    def _mark_arrivals(self, oil: npt.NDArray[np.float64], current_time: float) -> None:
+        np.greater(oil, self._threshold, out=self._exceeded)
+        np.logical_and(self._exceeded, self._pending, out=self._exceeded)
+        np.copyto(self._arrival, current_time, where=self._exceeded)
+        np.logical_xor(self._pending, self._exceeded, out=self._pending)
+
+    def update(self, oil: npt.NDArray[np.float64], current_time: float, dt: float) -> None:
+        """
+        Updates the reductions in place with the oil distribution after a step.
+
+        Args:
+            oil (npt.NDArray[np.float64]): Oil amount of every cell after the step.
+            current_time (float): Time after the step.
+            dt (float): Time step.
+        """
+        self._mark_arrivals(oil, current_time)
+        np.maximum(self._peak, oil, out=self._peak)
+        np.multiply(oil, dt, out=self._scratch)
+        self._dose += self._scratch
+
+    def save(self, filename: str, reorder=None) -> str:
+        """
+        Writes the reductions to a `.npz` file with the arrays `arrival`, `peak` and `dose` and the
+        `threshold`.
+
+        Args:
+            filename (str): Path of the file.
+            reorder (callable): Converts the arrays from cell index order, e.g. `Mesh.to_original` to
+                write them with the cell indices of the mesh file.
+
+        Returns:
+            str: Path of the file.
+        """
+        reorder = reorder or (lambda values: values)
+        np.savez(
+            filename,
+            arrival=reorder(self._arrival),
+            peak=reorder(self._peak),
+            dose=reorder(self._dose),
+            threshold=self._threshold,
+        )
+        return filename
+
+    def maps(self, start_time: float, end_time: float) -> dict[str, npt.NDArray[np.float64]]:
+        """
+        Scales the reductions to [0, 1] for rendering.
+
+        The arrival map is 1 where the oil is present from the start, decreasing to 0 at `end_time`, and 0
+        where it never arrives, such that the cells reached first stand out. The dose is scaled by its
+        largest value; the peak is an oil amount, already on the scale of the oil distribution.
+
+        Returns:
+            dict[str, npt.NDArray[np.float64]]: The maps `arrival`, `peak` and `dose`.
+        """
+        duration = end_time - start_time
+        arrival = np.where(np.isfinite(self._arrival), 1 - (self._arrival - start_time) / duration, 0.0)
+        largest_dose = self._dose.max(initial=0.0)
+        return {
+            "arrival": arrival,
+            "peak": self._peak,
+            "dose": self._dose / largest_dose if largest_dose > 0 else self._dose,
+        }
+
+    def render(self, renderer, start_time: float, end_time: float, folder: str, base_name: str) -> list[str]:
+        """
+        Renders the arrival, peak and dose maps with a `raster.RasterRenderer` to `<base_name>_<map>.png`.
+
+        Returns:
+            list[str]: Paths of the images.
+        """
+        import cv2 as cv
+
+        filenames = []
+        for name, values in self.maps(start_time, end_time).items():
+            filename = os.path.join(folder, f"{base_name}_{name}.png")
+            cv.imwrite(filename, renderer.render(values))
+            filenames.append(filename)
+        return filenames
@@ -0,0 +1,361 @@
+"""
+A module for computing the geometry of every cell in a 2D mesh at once.
+
+Instead of computing midpoints, areas, velocities and edge normals one cell at a time, the functions in this
+module work directly on the point array and the cell connectivity of the mesh, in a handful of NumPy operations.
+The result is collected in a `MeshGeometry`, which is what the vectorized solvers work on.
+
+Edges shared by two cells are faces. Every face is stored once, with the outward scaled normal of its first
+cell, which always carries oil flow. Edges of cells carrying oil flow that are not shared with any other cell
+are boundary edges.
+
+Typical usage example:
+
+    geometry = build_geometry(points, [(0, lines), (69, triangles)], [False, True])
+    print(geometry.areas[300])
+    print(geometry.face_cells[:10])
+"""
+
+import numpy as np
+import numpy.typing as npt
+
+
+def cell_midpoints(
+    points: npt.NDArray[np.float64], connectivity: npt.NDArray[np.int64]
+) -> npt.NDArray[np.float64]:
+    """
+    Computes the midpoint of every cell as the average of its points.
+
+    Args:
+        points (npt.NDArray[np.float64]): Coordinates of the points, shape (points, 2).
+        connectivity (npt.NDArray[np.int64]): Point indices of every cell, shape (cells, points per cell).
+
+    Returns:
+        npt.NDArray[np.float64]: Midpoint of every cell, shape (cells, 2).
+    """
+    return points[connectivity].mean(axis=1)
+
+
+def cell_areas(
+    points: npt.NDArray[np.float64], connectivity: npt.NDArray[np.int64]
+) -> npt.NDArray[np.float64]:
+    """
+    Computes the area of every cell with the shoelace formula.
+
+    Args:
+        points (npt.NDArray[np.float64]): Coordinates of the points, shape (points, 2).
+        connectivity (npt.NDArray[np.int64]): Point indices of every cell, shape (cells, points per cell).
+
+    Returns:
+        npt.NDArray[np.float64]: Area of every cell, shape (cells,).
+    """
+    coordinates = points[connectivity]
+    x = coordinates[..., 0]
+    y = coordinates[..., 1]
+    return 0.5 * np.abs(
+        np.sum(x * np.roll(y, -1, axis=1) - np.roll(x, -1, axis=1) * y, axis=1)
+    )
+
+
+def velocity_field(positions: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    """
+    Computes the velocity of the ocean current at the given positions.
+
+    Args:
+        positions (npt.NDArray[np.float64]): Positions, shape (n, 2).
+
+    Returns:
+        npt.NDArray[np.float64]: Velocity at every position, shape (n, 2).
+    """
+    velocity = np.empty_like(positions)
+    velocity[:, 0] = positions[:, 1] - 0.2 * positions[:, 0]
+    velocity[:, 1] = -positions[:, 0]
+    return velocity
+
+
+def edge_normals(
+    points: npt.NDArray[np.float64],
+    connectivity: npt.NDArray[np.int64],
+    midpoints: npt.NDArray[np.float64],
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """
+    Computes the midpoint and the outward scaled normal of every edge of every cell.
+
+    Edge k of a cell goes from its point k to its point k + 1. The scaled normal has the length of the edge
+    and points away from the midpoint of the cell.
+
+    Args:
+        points (npt.NDArray[np.float64]): Coordinates of the points, shape (points, 2).
+        connectivity (npt.NDArray[np.int64]): Point indices of every cell, shape (cells, edges per cell).
+        midpoints (npt.NDArray[np.float64]): Midpoint of every cell, shape (cells, 2).
+
+    Returns:
+        tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]: Edge midpoints and scaled normals,
+        both of shape (cells, edges per cell, 2).
+    """
+    start = points[connectivity]
+    end = points[np.roll(connectivity, -1, axis=1)]
+    edge = end - start
+    normals = np.stack((-edge[..., 1], edge[..., 0]), axis=-1)
+    edge_midpoints = 0.5 * (start + end)
+
+    # Flips the normals pointing into the cell
+    inward = np.einsum("cki,cki->ck", edge_midpoints - midpoints[:, None, :], normals) < 0
+    normals[inward] = -normals[inward]
+    return edge_midpoints, normals
+
+
+def _match_edges(
+    edge_points: npt.NDArray[np.int64], num_points: int
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64], npt.NDArray[np.bool_]]:
+    """
+    Finds every pair of identical edges.
+
+    Args:
+        edge_points (npt.NDArray[np.int64]): Sorted point indices of every edge, shape (edges, 2).
+        num_points (int): Number of points in the mesh.
+
+    Returns:
+        tuple: The first and second edge of every pair, and whether each edge is shared with another edge.
+    """
+    # Sorting the edges puts identical edges next to each other
+    keys = edge_points[:, 0].astype(np.int64) * num_points + edge_points[:, 1]
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    shared = np.zeros(len(keys), dtype=bool)
+    first_edges, second_edges = [], []
+    offset = 1
+    while offset < len(order):
+        match = sorted_keys[:-offset] == sorted_keys[offset:]
+        if not match.any():
+            break
+        first_edges.append(order[:-offset][match])
+        second_edges.append(order[offset:][match])
+        shared[order[:-offset][match]] = True
+        shared[order[offset:][match]] = True
+        offset += 1
+    if not first_edges:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), shared
+    return np.concatenate(first_edges), np.concatenate(second_edges), shared
+
+
+def shared_edge_pairs(
+    connectivity: npt.NDArray[np.int64],
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    """
+    Finds every pair of cells in a block of polygons that share an edge.
+
+    Args:
+        connectivity (npt.NDArray[np.int64]): Point indices of every cell, shape (cells, points per cell).
+
+    Returns:
+        tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]: The two cells of every pair.
+    """
+    num_cells, num_edges = connectivity.shape
+    pairs = np.stack((connectivity, np.roll(connectivity, -1, axis=1)), axis=-1)
+    edge_points = np.sort(pairs.reshape(-1, 2), axis=1)
+    edge_cells = np.repeat(np.arange(num_cells), num_edges)
+    first_edges, second_edges, _ = _match_edges(edge_points, int(connectivity.max()) + 1)
+    return edge_cells[first_edges], edge_cells[second_edges]
+
+
+def refine(
+    points: npt.NDArray[np.float64], blocks: list[npt.NDArray[np.int64]]
+) -> tuple[npt.NDArray[np.float64], list[npt.NDArray[np.int64]]]:
+    """
+    Uniformly refines a mesh: every triangle is split into four and every line into two.
+
+    The new points are the midpoints of the edges. Edges shared between cells get a single new point,
+    so the refined mesh stays conforming. Blocks of other cell types are kept as they are.
+
+    Args:
+        points (npt.NDArray[np.float64]): Coordinates of the points, shape (points, 2 or 3).
+        blocks (list[npt.NDArray[np.int64]]): Connectivity of every cell block.
+
+    Returns:
+        tuple: Coordinates of the refined points and the connectivity of every refined block.
+    """
+    edges = []
+    for connectivity in blocks:
+        if connectivity.shape[1] == 2:
+            edges.append(connectivity)
+        elif connectivity.shape[1] == 3:
+            edges.append(np.stack((connectivity, np.roll(connectivity, -1, axis=1)), axis=-1).reshape(-1, 2))
+    edges = np.unique(np.sort(np.concatenate(edges), axis=1), axis=0)
+    keys = edges[:, 0].astype(np.int64) * len(points) + edges[:, 1]
+    new_points = np.concatenate((points, 0.5 * (points[edges[:, 0]] + points[edges[:, 1]])))
+
+    def midpoint_index(a, b):
+        key = np.minimum(a, b).astype(np.int64) * len(points) + np.maximum(a, b)
+        return len(points) + np.searchsorted(keys, key)
+
+    refined = []
+    for connectivity in blocks:
+        if connectivity.shape[1] == 2:
+            a, b = connectivity.T
+            ab = midpoint_index(a, b)
+            refined.append(np.concatenate((np.stack((a, ab), axis=1), np.stack((ab, b), axis=1))))
+        elif connectivity.shape[1] == 3:
+            a, b, c = connectivity.T
+            ab, bc, ca = midpoint_index(a, b), midpoint_index(b, c), midpoint_index(c, a)
+            refined.append(
+                np.concatenate(
+                    (
+                        np.stack((a, ab, ca), axis=1),
+                        np.stack((ab, b, bc), axis=1),
+                        np.stack((ca, bc, c), axis=1),
+                        np.stack((ab, bc, ca), axis=1),
+                    )
+                )
+            )
+        else:
+            refined.append(connectivity)
+    return new_points, refined
+
+
+class MeshGeometry:
+    """
+    The geometry of every cell and face of a mesh, stored as arrays indexed by cell index.
+
+    Cells that do not carry oil flow (vertices and lines) have zero midpoint, area and velocity,
+    the same defaults as the Cell objects they correspond to.
+
+    Attributes:
+        points (npt.NDArray[np.float64]): Coordinates of the points, shape (points, 2).
+        active (npt.NDArray[np.bool_]): Whether each cell carries oil flow, shape (cells,).
+        midpoints (npt.NDArray[np.float64]): Midpoint of every cell, shape (cells, 2).
+        areas (npt.NDArray[np.float64]): Area of every cell, shape (cells,).
+        velocities (npt.NDArray[np.float64]): Velocity at the midpoint of every cell, shape (cells, 2).
+        face_cells (npt.NDArray[np.int64]): The two cells of every face, shape (faces, 2). The first cell
+            always carries oil flow.
+        face_normals (npt.NDArray[np.float64]): Scaled normal of every face, pointing out of its first cell.
+        face_midpoints (npt.NDArray[np.float64]): Midpoint of every face, shape (faces, 2).
+        boundary_cells (npt.NDArray[np.int64]): Cell of every boundary edge, shape (boundary edges,).
+        boundary_normals (npt.NDArray[np.float64]): Outward scaled normal of every boundary edge.
+        boundary_midpoints (npt.NDArray[np.float64]): Midpoint of every boundary edge.
+    """
+
+    def __init__(
+        self,
+        points,
+        active,
+        midpoints,
+        areas,
+        velocities,
+        face_cells,
+        face_normals,
+        face_midpoints,
+        boundary_cells,
+        boundary_normals,
+        boundary_midpoints,
+    ) -> None:
+        self.points = points
+        self.active = active
+        self.midpoints = midpoints
+        self.areas = areas
+        self.velocities = velocities
+        self.face_cells = face_cells
+        self.face_normals = face_normals
+        self.face_midpoints = face_midpoints
+        self.boundary_cells = boundary_cells
+        self.boundary_normals = boundary_normals
+        self.boundary_midpoints = boundary_midpoints
+
+    @property
+    def num_cells(self) -> int:
+        return len(self.areas)
+
+    @property
+    def num_faces(self) -> int:
+        return len(self.face_cells)
+
+
+def build_geometry(
+    points: npt.NDArray[np.float64],
+    blocks: list[tuple[int, npt.NDArray[np.int64]]],
+    active_blocks: list[bool],
+) -> MeshGeometry:
+    """
+    Computes the geometry of a whole mesh from its points and cell blocks.
+
+    Args:
+        points (npt.NDArray[np.float64]): Coordinates of the points, shape (points, 2).
+        blocks (list[tuple[int, npt.NDArray[np.int64]]]): Index of the first cell and the connectivity
+            of every block of cells with the same number of points.
+        active_blocks (list[bool]): Whether the cells of each block carry oil flow.
+
+    Returns:
+        MeshGeometry: The geometry of the mesh.
+    """
+    num_cells = sum(len(connectivity) for _, connectivity in blocks)
+    active = np.zeros(num_cells, dtype=bool)
+    midpoints = np.zeros((num_cells, 2))
+    areas = np.zeros(num_cells)
+
+    # Every edge of every cell: cell index, sorted point indices, midpoint and outward normal
+    edge_cells, edge_points, edge_mids, edge_norms = [], [], [], []
+    for (first, connectivity), is_active in zip(blocks, active_blocks):
+        indices = np.arange(first, first + len(connectivity))
+        num_points = connectivity.shape[1]
+        if is_active:
+            active[indices] = True
+            midpoints[indices] = cell_midpoints(points, connectivity)
+            areas[indices] = cell_areas(points, connectivity)
+            mids, norms = edge_normals(points, connectivity, midpoints[indices])
+        elif num_points >= 2:
+            mids = np.zeros((len(connectivity), num_points, 2))
+            norms = np.zeros((len(connectivity), num_points, 2))
+        else:
+            continue
+        # A line has a single edge, a polygon has one edge per point
+        num_edges = 1 if num_points == 2 else num_points
+        pairs = np.stack((connectivity, np.roll(connectivity, -1, axis=1)), axis=-1)
+        edge_cells.append(np.repeat(indices, num_edges))
+        edge_points.append(np.sort(pairs[:, :num_edges].reshape(-1, 2), axis=1))
+        edge_mids.append(mids[:, :num_edges].reshape(-1, 2))
+        edge_norms.append(norms[:, :num_edges].reshape(-1, 2))
+
+    velocities = velocity_field(midpoints)
+    velocities[~active] = 0
+
+    edge_cells = np.concatenate(edge_cells)
+    edge_points = np.concatenate(edge_points)
+    edge_mids = np.concatenate(edge_mids)
+    edge_norms = np.concatenate(edge_norms)
+
+    # Cells sharing an edge are neighbors
+    first_edges, second_edges, shared = _match_edges(edge_points, len(points))
+
+    # Orients every face out of a cell carrying oil flow, skipping faces between two inactive cells
+    swap = ~active[edge_cells[first_edges]]
+    first_edges, second_edges = (
+        np.where(swap, second_edges, first_edges),
+        np.where(swap, first_edges, second_edges),
+    )
+    keep = active[edge_cells[first_edges]] & (
+        edge_cells[first_edges] != edge_cells[second_edges]
+    )
+    first_edges = first_edges[keep]
+    second_edges = second_edges[keep]
+
+    # Orders the faces by cell, so the faces of a cell are close in memory
+    order = np.lexsort((edge_cells[second_edges], edge_cells[first_edges]))
+    first_edges = first_edges[order]
+    second_edges = second_edges[order]
+    face_cells = np.stack((edge_cells[first_edges], edge_cells[second_edges]), axis=1)
+
+    boundary = ~shared & active[edge_cells]
+
+    return MeshGeometry(
+        points=points,
+        active=active,
+        midpoints=midpoints,
+        areas=areas,
+        velocities=velocities,
+        face_cells=face_cells,
+        face_normals=edge_norms[first_edges],
+        face_midpoints=edge_mids[first_edges],
+        boundary_cells=edge_cells[boundary],
+        boundary_normals=edge_norms[boundary],
+        boundary_midpoints=edge_mids[boundary],
+    )
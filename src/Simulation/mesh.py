@@ -7,11 +7,12 @@ and functions for simulation-related tasks such as calculating velocity, oil dis
 Typical usage example:
 
     from mesh import Mesh, CellFactory
-    from src.Simulation.cells import Triangle, Line
+    from src.Simulation.cells import Triangle, Quadrilateral, Line
 
     # Create a cell factory and register cell types
     factory = CellFactory()
     factory.register(3, Triangle)
+    factory.register(4, Quadrilateral)
     factory.register(2, Line)
 
     # Load a mesh file and initialize the mesh
@@ -21,15 +22,19 @@ Typical usage example:
     cells = mesh.cells
     points = mesh.points
 
-    # Perform calculations on a specific cell
-    mesh.calculate(cell)
+    # Geometric attributes are computed the first time they are accessed
     print(cell.midpoint)
+
+    # Or computed for all cells at once before a simulation
+    mesh.precompute()
 """
 
 import meshio
 import numpy as np
 import numpy.typing as npt
 import src.Simulation.cells as cls
+import src.Simulation.geometry as geo
+import src.Simulation.ordering as ordering
 
 
 class CellFactory:
@@ -78,6 +83,22 @@ class CellFactory:
         return self._cell_types[key](self._cell_index, points, key)
 
 
+def default_factory() -> CellFactory:
+    """
+    Creates a cell factory with every cell type of the simulation registered: vertices, lines, triangles,
+    quadrilaterals and polygons of up to eight points. A factory numbers the cells it creates, so every
+    mesh needs a new one.
+    """
+    factory = CellFactory()
+    factory.register(1, cls.Vertex)
+    factory.register(2, cls.Line)
+    factory.register(3, cls.Triangle)
+    factory.register(4, cls.Quadrilateral)
+    for amount_of_points in range(5, 9):
+        factory.register(amount_of_points, cls.Polygon)
+    return factory
+
+
 class Mesh:
     """
     Represents a computational mesh, containing points and cells, initialized from a mesh file.
@@ -89,25 +110,56 @@ class Mesh:
     Args:
         msh_file (str): Path to the mesh file to be read.
         cell_factory (CellFactory): Factory object for creating cell instances.
+        reorder (str): Optional cache friendly ordering of the cells, one of `ordering.ORDERINGS`.
 
     Attributes:
         _cell_index (int): Tracks the current index of a cell in the mesh.
         _points (list[cls.Point]): List of Point objects representing points in a mesh.
         _cells (list[cls.Cell]): List of Cell objects representing cells in a mesh.
+        _edges (dict[tuple[int, int], list[cls.Cell]]): Cells sharing each edge, built on first use.
+        _blocks (list[tuple[int, npt.NDArray[np.int64]]]): Index of the first cell and connectivity of every cell block.
+        _geometry (geo.MeshGeometry): Geometry of all cells as arrays, built on first use.
+        _permutation (npt.NDArray[np.int64]): Index in the mesh file of every cell.
+
+    Geometric attributes of the cells are not computed when the mesh is read. Each cell computes
+    its attributes through `compute` the first time they are accessed, and `precompute` computes
+    them for every cell at once. The `geometry` property holds the same geometry as arrays, computed
+    for all cells in bulk, for the vectorized solvers.
+
+    With `reorder`, the cells of every polygon block are reordered before any cell or array is built,
+    such that cells close in space are close in memory. Cell indices then differ from the indices in
+    the mesh file; `to_original` and `from_original` convert arrays between the two orders, so restart
+    files and outputs can always use the indices of the mesh file.
     """
 
-    def __init__(self, msh_file: str, cell_factory: CellFactory) -> None:
+    def __init__(self, msh_file: str, cell_factory: CellFactory, reorder: str = None) -> None:
         msh = meshio.read(msh_file)
         # Makes a list of points objects
         self._points = [
             cls.Point(index, points[0], points[1])
             for index, points in enumerate(msh.points)
         ]
+        self._point_array = np.asarray(msh.points[:, :2], dtype=np.float64)
         self._cells = []
+        self._blocks = []
+        permutation = []
         for cell_types in msh.cells:
+            data = np.asarray(cell_types.data)
+            block_order = np.arange(len(data))
+            if reorder and data.shape[1] >= 3:
+                block_order = ordering.cell_order(reorder, self._point_array, data)
+                data = data[block_order]
+            permutation.append(len(self._cells) + block_order)
+            self._blocks.append((len(self._cells), data))
             self._cells.extend(
-                [cell_factory(cell, self._points) for cell in cell_types.data]
+                [cell_factory(cell, self._points) for cell in data]
             )
+        self._permutation = np.concatenate(permutation) if permutation else np.zeros(0, dtype=np.int64)
+        for cell in self._cells:
+            cell.attach(self)
+        self._edges = None
+        self._geometry = None
+        self._precomputed = False
 
     @property
     def cells(self) -> list[cls.Cell]:
@@ -117,6 +169,55 @@ class Mesh:
     def points(self) -> list[cls.Point]:
         return self._points
 
+    @property
+    def permutation(self) -> npt.NDArray[np.int64]:
+        """
+        The index in the mesh file of every cell.
+        """
+        return self._permutation
+
+    @property
+    def point_array(self) -> npt.NDArray[np.float64]:
+        """
+        The coordinates of every point, shape (points, 2).
+        """
+        return self._point_array
+
+    @property
+    def blocks(self) -> list[tuple[int, npt.NDArray[np.int64]]]:
+        """
+        The index of the first cell and the connectivity of every cell block, in cell index order.
+        """
+        return self._blocks
+
+    def to_original(self, values: npt.NDArray) -> npt.NDArray:
+        """
+        Reorders an array of per cell values from cell index order to the order of the mesh file.
+        """
+        original = np.empty_like(values)
+        original[self._permutation] = values
+        return original
+
+    def from_original(self, values: npt.NDArray) -> npt.NDArray:
+        """
+        Reorders an array of per cell values from the order of the mesh file to cell index order.
+        """
+        return np.asarray(values)[self._permutation]
+
+    @property
+    def geometry(self) -> geo.MeshGeometry:
+        """
+        The geometry of every cell and face as arrays, computed in bulk on first access.
+        """
+        if self._geometry is None:
+            active_blocks = [
+                not isinstance(self._cells[first], cls.Vertex)
+                and not isinstance(self._cells[first], cls.Line)
+                for first, _ in self._blocks
+            ]
+            self._geometry = geo.build_geometry(self._point_array, self._blocks, active_blocks)
+        return self._geometry
+
     def cells_within_area(
         self, x_area: npt.NDArray[np.float64], y_area: npt.NDArray[np.float64]
     ) -> list[cls.Cell]:
@@ -140,6 +241,32 @@ class Mesh:
                     break
         return cells_within
 
+    @staticmethod
+    def _cell_edges(cell: cls.Cell) -> list[tuple[int, int]]:
+        """
+        Returns the edges of a cell as sorted pairs of point indices.
+        """
+        indices = [point.index for point in cell.points]
+        if len(indices) < 2:
+            return []
+        if len(indices) == 2:
+            return [tuple(sorted(indices))]
+        return [
+            tuple(sorted((indices[i], indices[(i + 1) % len(indices)])))
+            for i in range(len(indices))
+        ]
+
+    def _edge_map(self) -> dict[tuple[int, int], list[cls.Cell]]:
+        """
+        Builds, on first use, a map from every edge in the mesh to the cells containing it.
+        """
+        if self._edges is None:
+            self._edges = {}
+            for cell in self._cells:
+                for edge in self._cell_edges(cell):
+                    self._edges.setdefault(edge, []).append(cell)
+        return self._edges
+
     def _find_neighbors(self, cell: cls.Cell) -> list[cls.Cell]:
         """
         Finds the neighboring cells for a given cell. Neighbors share exactly two points.
@@ -148,14 +275,16 @@ class Mesh:
             cell (cls.Cell): The cell for which neighbors are to be determined.
 
         Returns:
-            list[cls.Cell]: List of neighboring cells.
+            list[cls.Cell]: List of neighboring cells, ordered by index.
         """
-        points_in_cell = set(cell.points)
-        return [
-            internal_cell
-            for internal_cell in self._cells
-            if len(points_in_cell & set(internal_cell.points)) == 2
-        ]
+        edge_map = self._edge_map()
+        neighbors = {
+            internal_cell.index: internal_cell
+            for edge in self._cell_edges(cell)
+            for internal_cell in edge_map[edge]
+            if internal_cell is not cell
+        }
+        return [neighbors[index] for index in sorted(neighbors)]
 
     def _midpoint(self, cell: cls.Cell) -> npt.NDArray[np.float64]:
         """
@@ -169,23 +298,22 @@ class Mesh:
         """
         return (1 / cell.num_points) * (np.sum(cell.coordinates, axis=0))
 
-    def _calculate_area(self, cell: cls.Triangle) -> float:
+    def _calculate_area(self, cell: cls.Cell) -> float:
         """
-        Calculates the area of a triangular cell.
+        Calculates the area of a polygonal cell with the shoelace formula.
 
         Args:
-            cell (cls.Triangle): The triangular cell.
+            cell (cls.Cell): The cell, a triangle, quadrilateral or other polygon.
 
         Returns:
-            float: Area of the triangle, or None if the cell is not triangular.
-        """
-        if cell.num_points == 3:
-            point_coordinates = cell.coordinates
-            x0, y0 = point_coordinates[0]
-            x1, y1 = point_coordinates[1]
-            x2, y2 = point_coordinates[2]
+            float: Area of the cell.
 
-            return 0.5 * abs((x0 - x2) * (y1 - y0) - (x0 - x1) * (y2 - y0))
+        Raises:
+            Exception: If the cell has fewer than 3 points.
+        """
+        if cell.num_points >= 3:
+            x, y = np.array(cell.coordinates).T
+            return 0.5 * abs(float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)))
         else:
             raise Exception(f"Calculate area for cell type with amount of points {cell.num_points} has not been implemented")
 
@@ -251,6 +379,60 @@ class Mesh:
         cell.velocity = self._velocity(cell)
         cell.scaled_normal = self._unit_and_scaled_normal_vector(cell)
 
+    def compute(self, cell: cls.Cell, name: str):
+        """
+        Computes a single geometric attribute of a cell. Called by cells on first access.
+
+        Vertices and lines do not carry oil flow, so they keep the default values of their attributes.
+
+        Args:
+            cell (cls.Cell): The cell the attribute belongs to.
+            name (str): Name of the attribute, one of neighbors, midpoint, area, velocity or scaled_normal.
+
+        Returns:
+            The computed value of the attribute.
+        """
+        if isinstance(cell, cls.Vertex) or isinstance(cell, cls.Line):
+            return cls.GEOMETRY_DEFAULTS[name]()
+        calculations = {
+            "neighbors": self._find_neighbors,
+            "midpoint": self._midpoint,
+            "area": self._calculate_area,
+            "velocity": self._velocity,
+            "scaled_normal": self._unit_and_scaled_normal_vector,
+        }
+        return calculations[name](cell)
+
+    def precompute(self) -> None:
+        """
+        Computes the geometric attributes of every cell carrying oil flow at once.
+
+        The attributes are taken from the bulk `geometry` instead of being calculated cell by cell.
+        Neighbors are ordered by index, with the scaled normals in the same order.
+        Calling it again on an already precomputed mesh does nothing, so a mesh can be reused
+        between simulations.
+        """
+        if self._precomputed:
+            return
+        geometry = self.geometry
+        neighbors = [[] for _ in self._cells]
+        for (first, second), normal in zip(geometry.face_cells.tolist(), geometry.face_normals):
+            neighbors[first].append((second, normal))
+            if geometry.active[second]:
+                neighbors[second].append((first, -normal))
+
+        for cell in self._cells:
+            index = cell.index
+            if not geometry.active[index]:
+                continue
+            cell_neighbors = sorted(neighbors[index], key=lambda neighbor: neighbor[0])
+            cell.neighbors = [self._cells[neighbor] for neighbor, _ in cell_neighbors]
+            cell.scaled_normal = [normal for _, normal in cell_neighbors]
+            cell.midpoint = geometry.midpoints[index]
+            cell.area = float(geometry.areas[index])
+            cell.velocity = geometry.velocities[index]
+        self._precomputed = True
+
     def initial_oil_distribution(self, start_point: npt.NDArray[np.float64]):
         """
         Initializes the oil distribution across the mesh, centered around a given start point.
@@ -258,10 +440,23 @@ class Mesh:
         Args:
             start_point (npt.NDArray[np.float64]): The starting point for oil distribution.
         """
-        cells = self._cells
-        for cell in cells:
-            u = np.exp(-np.sum((cell.midpoint - start_point) ** 2) / 0.01)
-            cell.oil_amount = u
+        distance_squared = np.sum((self.geometry.midpoints - start_point) ** 2, axis=1)
+        self.set_oil_amounts(np.exp(-distance_squared / 0.01))
+
+    def oil_amounts(self) -> npt.NDArray[np.float64]:
+        """
+        Returns the oil amount of every cell as an array ordered by cell index.
+        """
+        return np.fromiter(
+            (cell.oil_amount for cell in self._cells), dtype=np.float64, count=len(self._cells)
+        )
+
+    def set_oil_amounts(self, oil: npt.NDArray[np.float64]) -> None:
+        """
+        Assigns the oil amount of every cell from an array ordered by cell index.
+        """
+        for cell, oil_amount in zip(self._cells, oil):
+            cell.oil_amount = float(oil_amount)
 
     def calculate_change(self, cell: cls.Cell, dt: float):
         """
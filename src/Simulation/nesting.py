@@ -0,0 +1,351 @@
+"""
+A module for nested simulations: a fine mesh over the fish area inside the coarse mesh of the region.
+
+Refining a whole mesh to resolve the fish area makes every step expensive. `NestedMesh` instead replaces
+the triangles of a mesh whose midpoints lie in a nest area, and the coastline lines along them, by their
+uniform refinement. The fine mesh is conforming to the coarse mesh: every edge of the interface between
+the two is split into `2^levels` fine edges, each within a single coarse edge. The meshes are coupled
+through the upwind flux over these fine edges,
+
+    flux out of the fine cell = oil_fine * max(v.n, 0) + oil_coarse * min(v.n, 0),
+
+with v the average velocity of the fine and the coarse cell and n the scaled normal of the fine edge,
+which leaves the fine cell and enters the coarse cell. Like the flux over the faces within each mesh, it is
+exactly conservative. Without refinement, the nested simulation is the simulation of the coarse mesh.
+
+`NestedEngine` steps each mesh with its own sparse operator. The fine cells are `2^levels` times smaller,
+so the fine mesh can take `subcycles` steps per step of the coarse mesh. During the fine steps, the coarse
+oil at the interface is that at the start of the coarse step; the flux the fine cells send to the coarse
+mesh is summed over the fine steps and added to the coarse cells at the end of the coarse step, such that
+the oil mass is conserved.
+
+The nested cells stay in the coarse oil distribution, with the area weighted average of the fine cells
+they contain (see `NestedMesh.combine`), so the coarse mesh can still be rendered and written as usual.
+
+Typical usage example:
+
+    nested = NestedMesh(mesh, x_area, y_area, levels=2)
+    outer_oil, fine_oil = nested.initial_oil(start_point)
+    engine = NestedEngine(nested, dt, subcycles=4)
+    for step in range(intervals):
+        engine.step(outer_oil, fine_oil)
+    oil = nested.combine(outer_oil, fine_oil)
+"""
+
+import numpy as np
+import numpy.typing as npt
+import scipy.sparse as sparse
+import src.Simulation.geometry as geo
+import src.Simulation.mesh as msh
+from .engines import transport_operator
+
+
+def _restrict_faces(geometry: geo.MeshGeometry, keep: npt.NDArray[np.bool_]) -> geo.MeshGeometry:
+    """
+    Returns the geometry with only the faces selected by `keep`.
+    """
+    return geo.MeshGeometry(
+        points=geometry.points,
+        active=geometry.active,
+        midpoints=geometry.midpoints,
+        areas=geometry.areas,
+        velocities=geometry.velocities,
+        face_cells=geometry.face_cells[keep],
+        face_normals=geometry.face_normals[keep],
+        face_midpoints=geometry.face_midpoints[keep],
+        boundary_cells=geometry.boundary_cells,
+        boundary_normals=geometry.boundary_normals,
+        boundary_midpoints=geometry.boundary_midpoints,
+    )
+
+
+class NestedMesh:
+    """
+    A coarse mesh with the triangles in a nest area replaced by a fine mesh, and their coupling.
+
+    Args:
+        mesh (msh.Mesh): The coarse mesh of the region.
+        x_area (npt.NDArray[np.float64]): [min, max] of the nest area along the x-axis.
+        y_area (npt.NDArray[np.float64]): [min, max] of the nest area along the y-axis.
+        levels (int): Number of uniform refinements of the nested triangles.
+
+    Raises:
+        ValueError: If `levels` is negative or no triangle lies in the nest area.
+    """
+
+    def __init__(
+        self,
+        mesh: msh.Mesh,
+        x_area: npt.NDArray[np.float64],
+        y_area: npt.NDArray[np.float64],
+        levels: int = 2,
+    ) -> None:
+        if levels < 0:
+            raise ValueError("The number of refinement levels can not be negative.")
+        outer = mesh.geometry
+        x, y = outer.midpoints.T
+        # Only triangles are refined, other polygons in the area stay in the coarse mesh
+        is_triangle = np.zeros(outer.num_cells, dtype=bool)
+        for first_cell, block in mesh.blocks:
+            is_triangle[first_cell : first_cell + len(block)] = block.shape[1] == 3
+        triangles = is_triangle & (x > x_area[0]) & (x < x_area[1]) & (y > y_area[0]) & (y < y_area[1])
+        if not triangles.any():
+            raise ValueError("No triangle lies in the nest area.")
+
+        # The coastline lines along the nested triangles belong to the fine mesh as well
+        first, second = outer.face_cells.T
+        lines = np.unique(second[triangles[first] & ~outer.active[second]])
+        self._nested = triangles.copy()
+        self._nested[lines] = True
+        self._levels = levels
+        self._outer_midpoints = outer.midpoints
+
+        # Refines the nested cells, compacting the points they use
+        triangle_cells = np.flatnonzero(triangles)
+        line_points = self._connectivity(mesh.blocks, lines, 2)
+        triangle_points = self._connectivity(mesh.blocks, triangle_cells, 3)
+        used, inverse = np.unique(np.concatenate((line_points.ravel(), triangle_points.ravel())), return_inverse=True)
+        points = outer.points[used]
+        blocks = [inverse[: line_points.size].reshape(-1, 2), inverse[line_points.size :].reshape(-1, 3)]
+        for _ in range(levels):
+            points, blocks = geo.refine(points, blocks)
+        fine_lines, fine_triangles = blocks
+        self._fine_blocks = [(0, fine_lines), (len(fine_lines), fine_triangles)]
+        self._fine = geo.build_geometry(points, self._fine_blocks, [False, True])
+
+        # Every refinement keeps the parent of a cell at its index modulo the number of parents
+        self._parents = np.concatenate(
+            (
+                lines[np.arange(len(fine_lines)) % max(len(lines), 1)],
+                triangle_cells[np.arange(len(fine_triangles)) % len(triangle_cells)],
+            )
+        ).astype(np.int64)
+        self._build_operators(outer)
+
+    @staticmethod
+    def _connectivity(
+        blocks: list[tuple[int, npt.NDArray[np.int64]]], cells: npt.NDArray[np.int64], num_points: int
+    ) -> npt.NDArray[np.int64]:
+        """
+        The point indices of cells with `num_points` points, from the cell blocks of the mesh.
+        """
+        connectivity = np.zeros((len(cells), num_points), dtype=np.int64)
+        for first_cell, block in blocks:
+            within = (cells >= first_cell) & (cells < first_cell + len(block))
+            if block.shape[1] == num_points:
+                connectivity[within] = block[cells[within] - first_cell]
+        return connectivity
+
+    def _interface(self, outer: geo.MeshGeometry) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+        """
+        Matches the boundary edges of the fine mesh to the coarse faces of the interface.
+
+        Returns:
+            tuple: The fine boundary edges on the interface, and the coarse cell across each of them.
+        """
+        fine = self._fine
+        nested = self._nested
+        first, second = outer.face_cells.T
+        # The interface faces, with the nested cell first and the normal pointing out of it
+        into_nested = ~nested[first] & nested[second] & outer.active[second]
+        out_of_nested = nested[first] & ~nested[second] & outer.active[second]
+        inner = np.concatenate((first[out_of_nested], second[into_nested]))
+        across = np.concatenate((second[out_of_nested], first[into_nested]))
+        normals = np.concatenate((outer.face_normals[out_of_nested], -outer.face_normals[into_nested]))
+        midpoints = np.concatenate((outer.face_midpoints[out_of_nested], outer.face_midpoints[into_nested]))
+        if len(inner) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        # The (at most three) interface faces of every nested triangle
+        order = np.argsort(inner, kind="stable")
+        inner, across, normals, midpoints = inner[order], across[order], normals[order], midpoints[order]
+        starts = np.searchsorted(inner, np.arange(outer.num_cells))
+        rank = np.arange(len(inner)) - starts[inner]
+        candidates = np.full((outer.num_cells, 3), -1, dtype=np.int64)
+        candidates[inner, rank] = np.arange(len(inner))
+
+        edges = np.arange(len(fine.boundary_cells))
+        parent_faces = candidates[self._parents[fine.boundary_cells]]
+        offsets = fine.boundary_midpoints[:, None, :] - midpoints[parent_faces]
+        lengths = np.linalg.norm(normals[parent_faces], axis=2)
+        units = normals[parent_faces] / lengths[..., None]
+        # A fine edge lies on a coarse face if it is parallel to it, on its line and within its length
+        on_face = (
+            (parent_faces >= 0)
+            & (np.einsum("eki,eki->ek", fine.boundary_normals[:, None, :], units) > 0)
+            & (np.abs(np.einsum("eki,eki->ek", offsets, units)) <= 1e-9 * lengths)
+            & (np.linalg.norm(offsets, axis=2) <= 0.5 * lengths * (1 + 1e-9))
+        )
+        matched = on_face.any(axis=1)
+        faces = parent_faces[edges, np.argmax(on_face, axis=1)]
+        return edges[matched], across[faces[matched]]
+
+    def _build_operators(self, outer: geo.MeshGeometry) -> None:
+        fine = self._fine
+        nested = self._nested
+        first, second = outer.face_cells.T
+        self._outer_operator = transport_operator(_restrict_faces(outer, ~nested[first] & ~nested[second]))
+        self._fine_operator = transport_operator(fine)
+
+        edges, across = self._interface(outer)
+        cells = fine.boundary_cells[edges]
+        velocity = 0.5 * (fine.velocities[cells] + outer.velocities[across])
+        normal_velocity = np.einsum("fi,fi->f", fine.boundary_normals[edges], velocity)
+        outflow, inflow = np.maximum(normal_velocity, 0.0), np.minimum(normal_velocity, 0.0)
+        fine_area, outer_area = fine.areas[cells], outer.areas[across]
+
+        num_outer, num_fine = outer.num_cells, fine.num_cells
+        self._outer_operator = (
+            self._outer_operator + sparse.diags(np.bincount(across, inflow / outer_area, num_outer), dtype=np.float64)
+        ).tocsr()
+        self._fine_operator = (
+            self._fine_operator - sparse.diags(np.bincount(cells, outflow / fine_area, num_fine), dtype=np.float64)
+        ).tocsr()
+        self._fine_from_outer = sparse.csr_matrix((-inflow / fine_area, (cells, across)), shape=(num_fine, num_outer))
+        self._outer_from_fine = sparse.csr_matrix((outflow / outer_area, (across, cells)), shape=(num_outer, num_fine))
+        for operator in (self._outer_operator, self._fine_operator, self._fine_from_outer, self._outer_from_fine):
+            operator.sum_duplicates()
+            operator.eliminate_zeros()
+        self._interface_edges = len(edges)
+
+        # Restriction of the fine oil to the nested cells: area weighted for triangles, the mean for lines
+        weights = np.where(fine.active, fine.areas, 1.0)
+        totals = np.bincount(self._parents, weights, num_outer)
+        self._restriction = sparse.csr_matrix(
+            (weights / totals[self._parents], (self._parents, np.arange(num_fine))), shape=(num_outer, num_fine)
+        )
+
+    @property
+    def levels(self) -> int:
+        return self._levels
+
+    @property
+    def nested(self) -> npt.NDArray[np.bool_]:
+        """
+        Whether every coarse cell is replaced by fine cells.
+        """
+        return self._nested
+
+    @property
+    def fine(self) -> geo.MeshGeometry:
+        """
+        The geometry of the fine mesh, with its lines first and its triangles after them.
+        """
+        return self._fine
+
+    @property
+    def fine_blocks(self) -> list[tuple[int, npt.NDArray[np.int64]]]:
+        """
+        The index of the first cell and the connectivity of the lines and triangles of the fine mesh.
+        """
+        return self._fine_blocks
+
+    @property
+    def parents(self) -> npt.NDArray[np.int64]:
+        """
+        The coarse cell containing every fine cell.
+        """
+        return self._parents
+
+    @property
+    def interface_edges(self) -> int:
+        """
+        The number of fine edges coupling the meshes.
+        """
+        return self._interface_edges
+
+    def operators(self) -> tuple[sparse.csr_matrix, sparse.csr_matrix, sparse.csr_matrix, sparse.csr_matrix]:
+        """
+        The operators of the coupled transport, d(outer)/dt = A @ outer + B @ fine and
+        d(fine)/dt = C @ outer + D @ fine.
+
+        Returns:
+            tuple: A, the coarse transport without the nested cells, B, the flux of the fine cells into the
+            coarse cells, C, the flux of the coarse cells into the fine cells, and D, the fine transport.
+            The rows of the nested cells in A and B are zero.
+        """
+        return self._outer_operator, self._outer_from_fine, self._fine_from_outer, self._fine_operator
+
+    def initial_oil(
+        self, start_point: npt.NDArray[np.float64]
+    ) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """
+        The initial oil distribution centered around `start_point` on both meshes, see
+        `Mesh.initial_oil_distribution`.
+        """
+        outer_oil = np.exp(-np.sum((self._outer_midpoints - start_point) ** 2, axis=1) / 0.01)
+        outer_oil[self._nested] = 0.0
+        fine_oil = np.exp(-np.sum((self._fine.midpoints - start_point) ** 2, axis=1) / 0.01)
+        return outer_oil, fine_oil
+
+    def cell_weights(
+        self, cells: npt.NDArray[np.int64]
+    ) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """
+        Weights giving the oil of coarse cells in the combined oil distribution, such that
+        `combine(outer_oil, fine_oil)[cells].sum()` is `np.dot(outer_weights, outer_oil) + np.dot(fine_weights,
+        fine_oil)`, without combining the oil distributions.
+
+        Args:
+            cells (npt.NDArray[np.int64]): Cells of the coarse mesh, e.g. those in the fish area.
+
+        Returns:
+            tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]: The weights of the coarse and the fine oil.
+        """
+        selected = np.zeros(len(self._nested))
+        np.add.at(selected, cells, 1.0)
+        outer_weights = np.where(self._nested, 0.0, selected)
+        fine_weights = self._restriction.T @ np.where(self._nested, selected, 0.0)
+        return outer_weights, fine_weights
+
+    def combine(self, outer_oil: npt.NDArray[np.float64], fine_oil: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        """
+        The oil distribution of the coarse mesh, with the average oil amount of the fine cells in every
+        nested cell.
+        """
+        combined = outer_oil.copy()
+        combined[self._nested] = (self._restriction @ fine_oil)[self._nested]
+        return combined
+
+
+class NestedEngine:
+    """
+    Advances the oil distributions of a nested mesh, stepping the fine mesh `subcycles` times per step.
+
+    Args:
+        nested (NestedMesh): The nested mesh.
+        dt (float): Time step of the coarse mesh.
+        subcycles (int): Number of steps of the fine mesh per step of the coarse mesh.
+
+    Raises:
+        ValueError: If `subcycles` is smaller than 1.
+    """
+
+    def __init__(self, nested: NestedMesh, dt: float, subcycles: int = 1) -> None:
+        if subcycles < 1:
+            raise ValueError("The number of subcycles must be at least 1.")
+        fine_dt = dt / subcycles
+        outer_operator, outer_from_fine, fine_from_outer, fine_operator = nested.operators()
+        self._outer_step = (dt * outer_operator).tocsr()
+        self._outer_from_fine = (fine_dt * outer_from_fine).tocsr()
+        self._fine_from_outer = (fine_dt * fine_from_outer).tocsr()
+        self._fine_step = (fine_dt * fine_operator).tocsr()
+        self._subcycles = subcycles
+        self._inflow = np.zeros(fine_operator.shape[0])
+        self._sent = np.zeros(fine_operator.shape[0])
+
+    @property
+    def subcycles(self) -> int:
+        return self._subcycles
+
+    def step(self, outer_oil: npt.NDArray[np.float64], fine_oil: npt.NDArray[np.float64]) -> None:
+        """
+        Advances both oil distributions by one time step of the coarse mesh in place.
+        """
+        # The inflow from the coarse cells is that of their oil at the start of the step
+        self._inflow[:] = self._fine_from_outer @ outer_oil
+        self._sent[:] = 0
+        for _ in range(self._subcycles):
+            self._sent += fine_oil
+            fine_oil += self._fine_step @ fine_oil + self._inflow
+        outer_oil += self._outer_step @ outer_oil + self._outer_from_fine @ self._sent
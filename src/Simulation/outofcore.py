@@ -0,0 +1,442 @@
+"""
+A module for simulating meshes larger than memory, from memory-mapped arrays on disk.
+
+A `Mesh` holds every point, cell and neighbor as Python objects, which limits the size of the meshes that
+can be simulated. In out-of-core mode a mesh file is converted once into a folder of NumPy arrays, a
+`MeshStore`, and the simulation only ever maps small windows of those arrays into memory:
+
+    points.npy              Coordinates of the points, shape (points, 2).
+    connectivity.npy        Point indices of every cell, padded with -1, shape (cells, corners).
+    corners.npy             Coordinates of the points of every cell, padded with NaN, shape (cells, corners, 2).
+    permutation.npy         Index in the mesh file of every cell.
+    active.npy              Whether every cell carries oil flow.
+    midpoints.npy           Midpoint of every cell, shape (cells, 2).
+    areas.npy               Area of every cell.
+    inverse_areas.npy       Inverse area of every cell, zero for cells that do not carry oil flow.
+    face_cells.npy          The two cells of every face between cells carrying oil flow, sorted by cell.
+    face_normals.npy        Scaled normal of every face, pointing out of its first cell.
+    face_coefficients.npy   Upwind outflow and inflow coefficient of every face, see `engines.face_coefficients`.
+    boundary_faces.npy      Cell and neighbor of every face between a cell carrying oil flow and one that does not.
+    boundary_coefficients.npy   Upwind coefficients of every boundary face.
+    store.json              Sizes of the mesh and the file and ordering it was converted from.
+
+The cells are ordered with a bandwidth reducing ordering (`rcm` by default), such that the faces of a
+contiguous range of faces only touch a narrow range of cells. Every step then processes the faces in
+chunks: the oil amounts of the cells of a chunk are read from a memory-mapped state file, and the net
+flux into them is accumulated in a second memory-mapped file. The windows are unmapped after every chunk,
+so the memory in use never grows beyond the configured budget, whatever the size of the mesh.
+
+Cells that do not carry oil flow never change their oil amount, so the flux over a boundary face only
+depends on the oil of its first cell and a constant, computed once when the state is initialized.
+
+The conversion itself reads the mesh file with meshio and computes the geometry in memory once, so it has
+to run on a machine that can hold the mesh arrays, e.g. ahead of a sweep.
+
+Typical usage example:
+
+    store = open_store("meshes/region.msh", "results/stores/region")
+    engine = OutOfCoreEngine(store, dt, "results/input_results/state", memory_budget=256 << 20)
+    engine.initialize(start_point)
+    for step in range(intervals):
+        engine.step()
+        oil_in_area = engine.total(fish_cells)
+"""
+
+import json
+import os
+import meshio
+import numpy as np
+import numpy.typing as npt
+import src.Simulation.geometry as geo
+import src.Simulation.ordering as ordering
+from .engines import face_coefficients
+
+_VERSION = 1
+_METADATA = "store.json"
+
+# Memory used per face of a chunk (indices, coefficients, gathered oil amounts and fluxes), and per
+# cell of the window of a chunk (oil, change and accumulated fluxes), in bytes
+_FACE_BYTES = 96
+_CELL_BYTES = 48
+
+
+def _save(folder: str, name: str, array: npt.NDArray) -> None:
+    np.save(os.path.join(folder, f"{name}.npy"), np.ascontiguousarray(array))
+
+
+def _header(filename: str) -> tuple[int, tuple[int, ...], np.dtype]:
+    """
+    Returns the offset of the data, the shape and the type of an array file.
+    """
+    with open(filename, "rb") as file:
+        version = np.lib.format.read_magic(file)
+        if version == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(file)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(file)
+        return file.tell(), shape, dtype
+
+
+def window(filename: str, start: int, stop: int, mode: str = "r") -> np.memmap:
+    """
+    Maps the rows `start` to `stop` of an array file into memory. The rows are unmapped again once the
+    returned array and every view of it are deleted.
+
+    Args:
+        filename (str): Path of the `.npy` file.
+        start (int): First row of the window.
+        stop (int): Row after the last row of the window, greater than `start`.
+        mode (str): "r" to read, "r+" to also write the rows.
+
+    Returns:
+        np.memmap: The rows of the array.
+    """
+    offset, shape, dtype = _header(filename)
+    row_bytes = dtype.itemsize * int(np.prod(shape[1:], dtype=np.int64))
+    return np.memmap(
+        filename,
+        dtype=dtype,
+        mode=mode,
+        offset=offset + start * row_bytes,
+        shape=(stop - start,) + tuple(shape[1:]),
+    )
+
+
+def _create(filename: str, length: int) -> None:
+    """
+    Creates an array file of `length` zeros, without writing the zeros to disk.
+    """
+    array = np.lib.format.open_memmap(filename, mode="w+", dtype=np.float64, shape=(length,))
+    del array
+
+
+def _chunks(length: int, size: int):
+    """
+    Yields the start and stop of consecutive chunks of at most `size` rows.
+    """
+    for start in range(0, length, size):
+        yield start, min(start + size, length)
+
+
+def convert_mesh(msh_file: str, folder: str, reorder: str = "rcm") -> str:
+    """
+    Converts a mesh file into a folder of arrays for out-of-core simulations.
+
+    Args:
+        msh_file (str): Path to the mesh file.
+        folder (str): Folder the arrays are written to.
+        reorder (str): Ordering of the cells of every polygon block, see `ordering.ORDERINGS`.
+
+    Returns:
+        str: The folder.
+    """
+    os.makedirs(folder, exist_ok=True)
+    msh = meshio.read(msh_file)
+    points = np.asarray(msh.points[:, :2], dtype=np.float64)
+    blocks = []
+    permutation = []
+    num_cells = 0
+    for cell_block in msh.cells:
+        data = np.asarray(cell_block.data, dtype=np.int64)
+        block_order = np.arange(len(data))
+        if reorder and data.shape[1] >= 3:
+            block_order = ordering.cell_order(reorder, points, data)
+            data = data[block_order]
+        permutation.append(num_cells + block_order)
+        blocks.append((num_cells, data))
+        num_cells += len(data)
+    geometry = geo.build_geometry(points, blocks, [data.shape[1] >= 3 for _, data in blocks])
+    del msh
+
+    corners = max(data.shape[1] for _, data in blocks)
+    connectivity = np.full((num_cells, corners), -1, dtype=np.int64)
+    for first, data in blocks:
+        connectivity[first : first + len(data), : data.shape[1]] = data
+    _save(folder, "points", points)
+    _save(folder, "connectivity", connectivity)
+    _save(folder, "corners", np.where((connectivity >= 0)[..., None], points[connectivity], np.nan))
+    del connectivity
+    _save(folder, "permutation", np.concatenate(permutation))
+    _save(folder, "active", geometry.active)
+    _save(folder, "midpoints", geometry.midpoints)
+    _save(folder, "areas", geometry.areas)
+
+    outflow, inflow, inverse_area = face_coefficients(geometry)
+    _save(folder, "inverse_areas", inverse_area)
+    coefficients = np.stack((outflow, inflow), axis=1)
+    interior = geometry.active[geometry.face_cells[:, 1]]
+    order = np.lexsort((geometry.face_cells[:, 1], geometry.face_cells[:, 0]))
+    faces = order[interior[order]]
+    _save(folder, "face_cells", geometry.face_cells[faces])
+    _save(folder, "face_normals", geometry.face_normals[faces])
+    _save(folder, "face_coefficients", coefficients[faces])
+    boundary = order[~interior[order]]
+    _save(folder, "boundary_faces", geometry.face_cells[boundary])
+    _save(folder, "boundary_coefficients", coefficients[boundary])
+
+    status = os.stat(msh_file)
+    metadata = {
+        "version": _VERSION,
+        "source": os.path.abspath(msh_file),
+        "size": status.st_size,
+        "mtime": status.st_mtime,
+        "reorder": reorder,
+        "num_cells": num_cells,
+        "num_faces": len(faces),
+        "num_boundary_faces": len(boundary),
+    }
+    with open(os.path.join(folder, _METADATA), "w") as file:
+        json.dump(metadata, file, indent=2)
+    return folder
+
+
+def _is_current(msh_file: str, folder: str, reorder: str) -> bool:
+    """
+    Checks whether a folder holds a conversion of the current version of a mesh file.
+    """
+    try:
+        with open(os.path.join(folder, _METADATA), "r") as file:
+            metadata = json.load(file)
+    except (OSError, ValueError):
+        return False
+    status = os.stat(msh_file)
+    return (
+        metadata.get("version") == _VERSION
+        and metadata.get("source") == os.path.abspath(msh_file)
+        and metadata.get("size") == status.st_size
+        and metadata.get("mtime") == status.st_mtime
+        and metadata.get("reorder") == reorder
+    )
+
+
+def open_store(msh_file: str, folder: str, reorder: str = "rcm") -> "MeshStore":
+    """
+    Opens the converted arrays of a mesh file, converting it first if the folder does not hold a
+    conversion of its current version.
+    """
+    if not _is_current(msh_file, folder, reorder):
+        print(f"Converting {msh_file} to {folder}")
+        convert_mesh(msh_file, folder, reorder)
+    return MeshStore(folder)
+
+
+class MeshStore:
+    """
+    The arrays of a converted mesh, mapped into memory a window of rows at a time.
+
+    Args:
+        folder (str): Folder written by `convert_mesh`.
+
+    Raises:
+        Exception: If the folder does not hold a conversion of a supported version.
+    """
+
+    def __init__(self, folder: str) -> None:
+        with open(os.path.join(folder, _METADATA), "r") as file:
+            self._metadata = json.load(file)
+        if self._metadata.get("version") != _VERSION:
+            raise Exception(f"{folder} does not hold a supported mesh conversion")
+        self._folder = folder
+
+    @property
+    def folder(self) -> str:
+        return self._folder
+
+    @property
+    def num_cells(self) -> int:
+        return self._metadata["num_cells"]
+
+    @property
+    def num_faces(self) -> int:
+        return self._metadata["num_faces"]
+
+    @property
+    def num_boundary_faces(self) -> int:
+        return self._metadata["num_boundary_faces"]
+
+    def filename(self, name: str) -> str:
+        return os.path.join(self._folder, f"{name}.npy")
+
+    def window(self, name: str, start: int, stop: int) -> np.memmap:
+        """
+        Maps the rows `start` to `stop` of an array of the mesh into memory, see `window`.
+        """
+        return window(self.filename(name), start, stop)
+
+    def cells_within_area(
+        self, x_area: npt.NDArray[np.float64], y_area: npt.NDArray[np.float64], chunk_size: int = 1 << 16
+    ) -> npt.NDArray[np.int64]:
+        """
+        Finds the cells with at least one point strictly inside a rectangular area, like
+        `Mesh.cells_within_area`.
+
+        Returns:
+            npt.NDArray[np.int64]: Indices of the cells, in increasing order.
+        """
+        cells = []
+        for start, stop in _chunks(self.num_cells, chunk_size):
+            corners = self.window("corners", start, stop)
+            with np.errstate(invalid="ignore"):
+                inside = (
+                    (corners[..., 0] > x_area[0])
+                    & (corners[..., 0] < x_area[1])
+                    & (corners[..., 1] > y_area[0])
+                    & (corners[..., 1] < y_area[1])
+                )
+            cells.append(start + np.flatnonzero(inside.any(axis=1)))
+            del corners
+        return np.concatenate(cells) if cells else np.zeros(0, dtype=np.int64)
+
+
+class OutOfCoreEngine:
+    """
+    Advances the oil distribution of a `MeshStore` with the explicit upwind scheme of the vectorized
+    engine, keeping the oil amounts in a memory-mapped state file.
+
+    The faces are processed in chunks sized such that the memory of a chunk and of the window of cells
+    it touches stays within `memory_budget`. The chunks are planned once, when the engine is created.
+
+    Args:
+        store (MeshStore): The converted mesh.
+        dt (float): Time step.
+        state_folder (str): Folder of the state files, `oil.npy` holds the oil amount of every cell.
+        memory_budget (int): Memory the engine may use at a time, in bytes.
+
+    Raises:
+        Exception: If a single face does not fit the memory budget.
+    """
+
+    def __init__(self, store: MeshStore, dt: float, state_folder: str, memory_budget: int = 256 << 20) -> None:
+        self._store = store
+        self._dt = dt
+        self._budget = memory_budget
+        self._cell_chunk = max(memory_budget // _CELL_BYTES, 1)
+        self._faces = self._plan("face_cells", store.num_faces, both=True)
+        self._boundary = self._plan("boundary_faces", store.num_boundary_faces, both=False)
+
+        os.makedirs(state_folder, exist_ok=True)
+        self._oil = os.path.join(state_folder, "oil.npy")
+        self._change = os.path.join(state_folder, "change.npy")
+        self._inflow = os.path.join(state_folder, "boundary_inflow.npy")
+        _create(self._change, store.num_cells)
+
+    @property
+    def oil_file(self) -> str:
+        return self._oil
+
+    def _plan(self, name: str, length: int, both: bool) -> list[tuple[int, int, int, int]]:
+        """
+        Splits a list of faces into chunks that fit the memory budget.
+
+        Returns:
+            list[tuple[int, int, int, int]]: The first and after last face of every chunk, and the first
+            and after last cell of the window of cells it touches.
+        """
+        plan = []
+        size = max(self._budget // (_FACE_BYTES + _CELL_BYTES), 1)
+        start = 0
+        while start < length:
+            stop = min(start + size, length)
+            faces = self._store.window(name, start, stop)
+            cells = faces if both else faces[:, 0]
+            low, high = int(cells.min()), int(cells.max()) + 1
+            del faces, cells
+            if (stop - start) * _FACE_BYTES + (high - low) * _CELL_BYTES > self._budget:
+                if stop - start == 1:
+                    raise Exception(
+                        f"The memory budget of {self._budget} bytes is too small for the mesh, "
+                        "convert it with a bandwidth reducing ordering or increase the budget"
+                    )
+                size = (stop - start) // 2
+                continue
+            plan.append((start, stop, low, high))
+            start = stop
+        return plan
+
+    def initialize(self, start_point: npt.NDArray[np.float64]) -> None:
+        """
+        Writes the initial oil distribution around `start_point`, the same distribution as
+        `Mesh.initial_oil_distribution`, to the state file.
+        """
+        store = self._store
+        _create(self._oil, store.num_cells)
+        for start, stop in _chunks(store.num_cells, self._cell_chunk):
+            midpoints = store.window("midpoints", start, stop)
+            oil = window(self._oil, start, stop, "r+")
+            oil[:] = np.exp(-np.sum((midpoints - np.asarray(start_point)) ** 2, axis=1) / 0.01)
+            oil.flush()
+            del midpoints, oil
+        self._boundary_inflow()
+
+    def _boundary_inflow(self) -> None:
+        """
+        Computes the constant inflow over every boundary face, from the oil of the neighbor that does
+        not carry oil flow.
+        """
+        store = self._store
+        _create(self._inflow, store.num_boundary_faces)
+        for start, stop in _chunks(store.num_boundary_faces, self._cell_chunk):
+            neighbors = np.array(store.window("boundary_faces", start, stop)[:, 1])
+            low, high = int(neighbors.min()), int(neighbors.max()) + 1
+            oil = window(self._oil, low, high)
+            coefficients = store.window("boundary_coefficients", start, stop)
+            inflow = window(self._inflow, start, stop, "r+")
+            inflow[:] = oil[neighbors - low] * coefficients[:, 1]
+            inflow.flush()
+            del oil, coefficients, inflow
+
+    def step(self) -> None:
+        """
+        Advances the oil distribution in the state file by one time step.
+        """
+        store = self._store
+        for start, stop, low, high in self._faces:
+            faces = store.window("face_cells", start, stop)
+            coefficients = store.window("face_coefficients", start, stop)
+            first = faces[:, 0] - low
+            second = faces[:, 1] - low
+            oil = window(self._oil, low, high)
+            change = window(self._change, low, high, "r+")
+            flux = oil[first] * coefficients[:, 0] + oil[second] * coefficients[:, 1]
+            change += np.bincount(second, flux, high - low)
+            change -= np.bincount(first, flux, high - low)
+            del faces, coefficients, oil, change
+
+        for start, stop, low, high in self._boundary:
+            faces = store.window("boundary_faces", start, stop)
+            coefficients = store.window("boundary_coefficients", start, stop)
+            inflow = window(self._inflow, start, stop)
+            first = faces[:, 0] - low
+            oil = window(self._oil, low, high)
+            change = window(self._change, low, high, "r+")
+            change -= np.bincount(first, oil[first] * coefficients[:, 0] + inflow, high - low)
+            del faces, coefficients, inflow, oil, change
+
+        for start, stop in _chunks(store.num_cells, self._cell_chunk):
+            oil = window(self._oil, start, stop, "r+")
+            change = window(self._change, start, stop, "r+")
+            inverse_areas = store.window("inverse_areas", start, stop)
+            change *= inverse_areas
+            change *= self._dt
+            oil += change
+            change[:] = 0
+            del oil, change, inverse_areas
+
+    def total(self, cells: npt.NDArray[np.int64]) -> float:
+        """
+        Returns the total oil amount of the given cells, in increasing order.
+        """
+        value = 0.0
+        for start, stop in _chunks(len(cells), self._cell_chunk):
+            low, high = int(cells[start]), int(cells[stop - 1]) + 1
+            oil = window(self._oil, low, high)
+            value += float(oil[cells[start:stop] - low].sum(dtype=np.float64))
+            del oil
+        return value
+
+    def oil(self, start: int = 0, stop: int = None) -> npt.NDArray[np.float64]:
+        """
+        Returns a copy of the oil amounts of the cells `start` to `stop`, ordered by cell index.
+        """
+        stop = self._store.num_cells if stop is None else stop
+        return np.array(window(self._oil, start, stop))
@@ -0,0 +1,413 @@
+"""
+A module for Lagrangian particle tracking of the oil, as an alternative to the Eulerian upwind engines.
+
+Instead of moving oil between cells over their faces, `ParticleEngine` represents the oil as parcels of mass
+that are advected through the velocity field of the ocean current (`geometry.velocity_field`, the same field
+as `Mesh._velocity`) with the classical fourth order Runge-Kutta method, all particles at once. After every
+step, the particles are located in the cells of the mesh and their mass is binned onto the cells, so the oil
+distribution, the oil in the fish area and the frames are computed from the particles exactly as for the
+other engines. The cost of a step grows with the number of particles rather than with the size of the mesh,
+and the result has no numerical diffusion, which suits small spills on large meshes. The oil distribution is
+noisy for few particles per cell.
+
+`PointLocator` finds the cell containing every particle. A particle walks from the cell it was in towards its
+new position, over the edge it lies furthest beyond, for at most `max_walk` cells. A particle that moved
+further than a bin of a uniform grid of bins, each holding the cells overlapping it, walks from the first cell
+of its bin instead. The few particles not found by walking, because the walk ran into the coastline of a
+concave bay, are tested against every cell of their bin. A particle outside every cell has left the mesh,
+over the coastline or an open boundary, and is removed with its mass, as the upwind engines remove the oil
+flowing into a line.
+
+The engine works on the same array of oil amounts as the other engines. Every step first compares that
+array with the distribution it binned the previous step, the only work of a step that grows with the size of
+the mesh: oil that was added, initially, by sources or from a restart file, is seeded as new particles spread
+uniformly over its cells, and oil that was removed scales the mass of the particles in its cells. Only the
+cells holding particles are written.
+
+Typical usage example:
+
+    engine = ParticleEngine(mesh, dt, num_particles=100_000)
+    oil = mesh.oil_amounts()
+    for step in range(intervals):
+        engine.step(oil)
+        oil_in_area = oil[fish_cells].sum()
+"""
+
+import numpy as np
+import numpy.typing as npt
+import src.Simulation.geometry as geo
+import src.Simulation.mesh as msh
+from .weathering import Weathering
+
+
+class PointLocator:
+    """
+    Finds the cell of a mesh containing every position, by walking over neighboring cells or with a grid.
+
+    Cells are assumed to be convex polygons: a position lies in a cell if it lies behind all of its edges.
+
+    Args:
+        mesh (msh.Mesh): The mesh.
+        cells_per_bin (float): Average number of cells overlapping a bin of the grid.
+        max_walk (int): Largest number of cells a position walks over before it is looked up in the grid.
+    """
+
+    def __init__(self, mesh: msh.Mesh, cells_per_bin: float = 2.0, max_walk: int = 8) -> None:
+        geometry = mesh.geometry
+        num_cells = geometry.num_cells
+        polygon_blocks = [(first, data) for first, data in mesh.blocks if data.shape[1] >= 3]
+        corners = max(data.shape[1] for _, data in polygon_blocks)
+        self._max_walk = max_walk
+        self._points = geometry.points
+        self._midpoints = geometry.midpoints
+
+        # Point indices of every polygon padded with -1, and its edges as lines n.x = c, with n the outward
+        # scaled normal of the edge, such that a position lies n.x - c beyond the edge. The offsets include a
+        # small tolerance; padded edges have every position behind them, and cells that are no polygons have
+        # an edge every position lies beyond.
+        self._connectivity = np.full((num_cells, corners), -1, dtype=np.int64)
+        self._edges = np.zeros((num_cells, corners, 3))
+        self._edges[:, 0, 2] = -1.0
+        for first, data in polygon_blocks:
+            cells = slice(first, first + len(data))
+            self._connectivity[cells, : data.shape[1]] = data
+            edge_midpoints, normals = geo.edge_normals(geometry.points, data, geometry.midpoints[cells])
+            self._edges[cells] = 0.0
+            self._edges[cells, : data.shape[1], :2] = normals
+            self._edges[cells, : data.shape[1], 2] = np.einsum("cki,cki->ck", normals, edge_midpoints)
+            self._edges[cells, :, 2] += 1e-12 * geometry.areas[cells, None]
+        polygon = self._connectivity[:, 0] >= 0
+
+        # The polygon across every edge, -1 for the coastline and open boundaries
+        self._across = np.full((num_cells, corners), -1, dtype=np.int64)
+        cells, edges = np.nonzero(self._connectivity >= 0)
+        start = self._connectivity[cells, edges]
+        following = (edges + 1) % corners
+        end = self._connectivity[cells, following]
+        wrap = end < 0
+        end[wrap] = self._connectivity[cells[wrap], 0]
+        keys = np.minimum(start, end) * len(geometry.points) + np.maximum(start, end)
+        order = np.argsort(keys, kind="stable")
+        pairs = np.flatnonzero(keys[order][:-1] == keys[order][1:])
+        first_edge, second_edge = order[pairs], order[pairs + 1]
+        self._across[cells[first_edge], edges[first_edge]] = cells[second_edge]
+        self._across[cells[second_edge], edges[second_edge]] = cells[first_edge]
+
+        # The uniform grid, holding every polygon in the bins its bounding box overlaps
+        polygon_points = geometry.points[
+            np.where(self._connectivity >= 0, self._connectivity, self._connectivity[:, :1])
+        ]
+        polygon_cells = np.flatnonzero(polygon)
+        lower = polygon_points[polygon_cells].min(axis=1)
+        upper = polygon_points[polygon_cells].max(axis=1)
+        self._origin = lower.min(axis=0)
+        extent = np.maximum(upper.max(axis=0) - self._origin, np.finfo(np.float64).tiny)
+        bin_size = np.sqrt(np.prod(extent) * cells_per_bin / len(polygon_cells))
+        self._shape = np.maximum(np.ceil(extent / bin_size), 1).astype(np.int64)
+        self._bin_size = extent / self._shape
+        low_bins = self._bins(lower)
+        high_bins = self._bins(upper)
+        spans = high_bins - low_bins + 1
+        counts = spans[:, 0] * spans[:, 1]
+        owner = np.repeat(np.arange(len(polygon_cells)), counts)
+        offset = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+        x_bins = low_bins[owner, 0] + offset // spans[owner, 1]
+        y_bins = low_bins[owner, 1] + offset % spans[owner, 1]
+        bins = x_bins * self._shape[1] + y_bins
+        order = np.argsort(bins, kind="stable")
+        self._bin_cells = polygon_cells[owner[order]]
+        self._bin_start = np.searchsorted(bins[order], np.arange(np.prod(self._shape) + 1))
+        self._first_cells = np.full(np.prod(self._shape), -1, dtype=np.int64)
+        nonempty = self._bin_start[1:] > self._bin_start[:-1]
+        self._first_cells[nonempty] = self._bin_cells[self._bin_start[:-1][nonempty]]
+
+    @property
+    def connectivity(self) -> npt.NDArray[np.int64]:
+        """
+        The point indices of every polygon, padded with -1, and -1 for cells that are no polygons.
+        """
+        return self._connectivity
+
+    def _bins(self, positions: npt.NDArray[np.float64]) -> npt.NDArray[np.int64]:
+        """
+        The x and y index of the bin of every position, clipped to the grid.
+        """
+        bins = np.floor((positions - self._origin) / self._bin_size).astype(np.int64)
+        return np.clip(bins, 0, self._shape - 1)
+
+    def _bin_indices(self, positions: npt.NDArray[np.float64]) -> npt.NDArray[np.int64]:
+        """
+        The flat index of the bin of every position.
+        """
+        bins = self._bins(positions)
+        return bins[:, 0] * self._shape[1] + bins[:, 1]
+
+    def _beyond(self, positions: npt.NDArray[np.float64], cells: npt.NDArray[np.int64]) -> npt.NDArray[np.float64]:
+        """
+        How far every position lies beyond every edge of its cell, scaled by the length of the edge.
+        """
+        homogeneous = np.empty((len(positions), 3))
+        homogeneous[:, :2] = positions
+        homogeneous[:, 2] = -1.0
+        return np.einsum("pki,pi->pk", np.take(self._edges, cells, axis=0), homogeneous)
+
+    def contains(self, positions: npt.NDArray[np.float64], cells: npt.NDArray[np.int64]) -> npt.NDArray[np.bool_]:
+        """
+        Whether every position lies in its cell, including its edges.
+
+        Args:
+            positions (npt.NDArray[np.float64]): The positions, shape (n, 2).
+            cells (npt.NDArray[np.int64]): A cell for every position.
+
+        Returns:
+            npt.NDArray[np.bool_]: Whether the cell is a polygon containing the position.
+        """
+        return np.all(self._beyond(positions, cells) <= 0, axis=1)
+
+    def _walk(
+        self,
+        positions: npt.NDArray[np.float64],
+        found: npt.NDArray[np.int64],
+        walking: npt.NDArray[np.int64],
+        cells: npt.NDArray[np.int64],
+    ) -> None:
+        """
+        Walks the given positions from the given cells towards the cells containing them, recording them in
+        `found`. Positions that run into the coastline or an open boundary, or do not arrive within
+        `max_walk` cells, are left at -1.
+        """
+        for _ in range(self._max_walk + 1):
+            if len(walking) == 0:
+                break
+            beyond = self._beyond(positions[walking], cells)
+            inside = np.all(beyond <= 0, axis=1)
+            found[walking[inside]] = cells[inside]
+            walking, cells, beyond = walking[~inside], cells[~inside], beyond[~inside]
+            # Steps over the edge the position lies furthest beyond
+            following = self._across[cells, np.argmax(beyond, axis=1)]
+            walking, cells = walking[following >= 0], following[following >= 0]
+
+    def locate(
+        self, positions: npt.NDArray[np.float64], guess: npt.NDArray[np.int64] = None
+    ) -> npt.NDArray[np.int64]:
+        """
+        Finds the cell containing every position.
+
+        Positions are walked from their guess if it is within a bin of the grid from them, else from the
+        first cell of their bin, and the positions not found by walking are tested against every cell of
+        their bin.
+
+        Args:
+            positions (npt.NDArray[np.float64]): The positions, shape (n, 2).
+            guess (npt.NDArray[np.int64]): A cell near every position to walk from, -1 for none.
+
+        Returns:
+            npt.NDArray[np.int64]: The cell containing every position, -1 for positions outside the mesh.
+        """
+        positions = np.asarray(positions, dtype=np.float64)
+        found = np.full(len(positions), -1, dtype=np.int64)
+        if guess is None:
+            start_cells = np.full(len(positions), -1, dtype=np.int64)
+        else:
+            start_cells = np.asarray(guess, dtype=np.int64).copy()
+        distance = np.abs(positions - self._midpoints[start_cells]).max(axis=1)
+        far = np.flatnonzero((start_cells < 0) | (distance >= self._bin_size.max()))
+        if len(far):
+            start_cells[far] = self._first_cells[self._bin_indices(positions[far])]
+        walking = np.flatnonzero(start_cells >= 0)
+        self._walk(positions, found, walking, start_cells[walking])
+
+        # Tests the positions still not found against every cell of their bin
+        missing = np.flatnonzero(found < 0)
+        if len(missing) == 0:
+            return found
+        bins = self._bin_indices(positions[missing])
+        starts = self._bin_start[bins]
+        counts = self._bin_start[bins + 1] - starts
+        candidates = np.repeat(np.arange(len(missing)), counts)
+        offsets = np.arange(len(candidates)) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = self._bin_cells[np.repeat(starts, counts) + offsets]
+        inside = self.contains(positions[missing[candidates]], cells)
+        found[missing[candidates[inside][::-1]]] = cells[inside][::-1]
+        return found
+
+    def sample(self, cells: npt.NDArray[np.int64], generator: np.random.Generator) -> npt.NDArray[np.float64]:
+        """
+        Draws a uniformly distributed position in every given polygon.
+
+        Args:
+            cells (npt.NDArray[np.int64]): The polygons, one for every position to draw.
+            generator (np.random.Generator): Source of the random numbers.
+
+        Returns:
+            npt.NDArray[np.float64]: A position in every polygon, shape (n, 2).
+        """
+        connectivity = self._connectivity[cells]
+        points = self._points[np.maximum(connectivity, 0)]
+
+        # Picks a triangle of the fan around the first point, with a probability proportional to its area
+        a = points[:, :1]
+        b, c = points[:, 1:-1], points[:, 2:]
+        ab, ac = b - a, c - a
+        areas = np.abs(ab[..., 0] * ac[..., 1] - ab[..., 1] * ac[..., 0])
+        areas[connectivity[:, 2:] < 0] = 0.0
+        cumulative = np.cumsum(areas, axis=1)
+        threshold = generator.random(len(cells)) * cumulative[:, -1]
+        triangle = np.minimum(np.sum(cumulative <= threshold[:, None], axis=1), areas.shape[1] - 1)
+        rows = np.arange(len(cells))
+
+        # Uniform in the triangle, reflecting the points beyond its diagonal
+        weights = generator.random((len(cells), 2))
+        flip = weights.sum(axis=1) > 1
+        weights[flip] = 1 - weights[flip]
+        return (
+            a[:, 0]
+            + weights[:, :1] * ab[rows, triangle]
+            + weights[:, 1:] * ac[rows, triangle]
+        )
+
+
+class ParticleEngine:
+    """
+    Advances the oil distribution by advecting parcels of oil mass and binning them onto the cells.
+
+    Args:
+        mesh (msh.Mesh): The mesh to simulate on.
+        dt (float): Time step of the simulation.
+        dtype: Floating point type of the oil amounts. Particles are always tracked in float64.
+        weathering (Weathering): Weathering applied to the mass of every particle after every step, or None.
+        num_particles (int): Number of particles the first oil added is represented by. Later oil is seeded
+            as particles of the same mass.
+        seed (int): Seed of the random positions of seeded particles, such that runs can be repeated.
+
+    Raises:
+        ValueError: If the number of particles is not positive.
+    """
+
+    unconditionally_stable = True
+
+    def __init__(
+        self,
+        mesh: msh.Mesh,
+        dt: float,
+        dtype=np.float64,
+        weathering: Weathering = None,
+        num_particles: int = 100_000,
+        seed: int = 0,
+    ) -> None:
+        if num_particles < 1:
+            raise ValueError("The number of particles must be positive.")
+        geometry = mesh.geometry
+        self._locator = PointLocator(mesh)
+        self._dt = dt
+        self._weathering = weathering
+        self._num_particles = num_particles
+        self._generator = np.random.default_rng(seed)
+        self._areas = geometry.areas
+        self._polygon = self._locator.connectivity[:, 0] >= 0
+        self._occupied = np.zeros(0, dtype=np.int64)
+        self._particle_mass = None
+        self._positions = np.zeros((0, 2))
+        self._cells = np.zeros(0, dtype=np.int64)
+        self._masses = np.zeros(0)
+        self._binned = None
+        self._removed = 0.0
+
+    @property
+    def positions(self) -> npt.NDArray[np.float64]:
+        return self._positions
+
+    @property
+    def cells(self) -> npt.NDArray[np.int64]:
+        return self._cells
+
+    @property
+    def masses(self) -> npt.NDArray[np.float64]:
+        return self._masses
+
+    @property
+    def removed(self) -> float:
+        """
+        The oil mass of the particles that have left the mesh.
+        """
+        return self._removed
+
+    def _advect(self, positions: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        """
+        Moves every position by one time step with the classical fourth order Runge-Kutta method.
+        """
+        dt = self._dt
+        k1 = geo.velocity_field(positions)
+        k2 = geo.velocity_field(positions + 0.5 * dt * k1)
+        k3 = geo.velocity_field(positions + 0.5 * dt * k2)
+        k4 = geo.velocity_field(positions + dt * k3)
+        return positions + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+    def _seed(self, cells: npt.NDArray[np.int64], mass: npt.NDArray[np.float64]) -> None:
+        """
+        Adds particles spreading the given oil mass uniformly over every given cell.
+
+        Cells get their mass in particles of the particle mass on average, rounding at random, such that
+        cells with little oil do not each add a particle. The new particles share the added mass equally.
+        """
+        total = mass.sum()
+        if self._particle_mass is None:
+            self._particle_mass = total / self._num_particles
+        counts = np.floor(mass / self._particle_mass + self._generator.random(len(mass))).astype(np.int64)
+        if counts.sum() == 0:
+            counts[np.argmax(mass)] = 1
+        new_cells = np.repeat(cells, counts)
+        self._positions = np.concatenate((self._positions, self._locator.sample(new_cells, self._generator)))
+        self._cells = np.concatenate((self._cells, new_cells))
+        self._masses = np.concatenate((self._masses, np.full(len(new_cells), total / len(new_cells))))
+
+    def _reconcile(self, oil: npt.NDArray[np.float64]) -> None:
+        """
+        Seeds the oil added to the oil amounts since the last step, and removes the oil taken from them.
+        """
+        if self._binned is None:
+            self._binned = np.where(self._polygon, 0, oil).astype(oil.dtype)
+        changed = np.flatnonzero(oil != self._binned)
+        changed = changed[self._polygon[changed]]
+        if len(changed) == 0:
+            return
+        binned = self._binned[changed].astype(np.float64)
+        change = oil[changed] - binned
+        taken = change < 0
+        if taken.any():
+            ratio = np.ones(len(oil))
+            ratio[changed[taken]] = np.maximum(oil[changed[taken]], 0) / binned[taken]
+            self._masses *= ratio[self._cells]
+        added = change > 0
+        if added.any():
+            self._seed(changed[added], change[added] * self._areas[changed[added]])
+        # The oil of the changed cells is now carried by particles, which are binned again after the step
+        oil[changed] = 0
+        self._binned[changed] = 0
+
+    def step(self, oil: npt.NDArray[np.float64]) -> None:
+        """
+        Advances the oil distribution by one time step in place.
+        """
+        self._reconcile(oil)
+
+        # Moves and locates the particles, removing those that left the mesh
+        positions = self._advect(self._positions)
+        cells = self._locator.locate(positions, self._cells)
+        inside = cells >= 0
+        if not inside.all():
+            self._removed += float(self._masses[~inside].sum())
+            positions, cells, self._masses = positions[inside], cells[inside], self._masses[inside]
+        self._positions, self._cells = positions, cells
+
+        # Bins the mass onto the cells holding particles, and empties the cells that held them before
+        occupied, slots = np.unique(cells, return_inverse=True)
+        amounts = np.bincount(slots, self._masses, len(occupied)) / self._areas[occupied]
+        oil[self._occupied] = 0
+        oil[occupied] = amounts
+        if self._weathering:
+            self._weathering.apply(oil)
+            self._masses *= self._weathering.factor[cells]
+        self._binned[self._occupied] = 0
+        self._binned[occupied] = oil[occupied]
+        self._occupied = occupied
@@ -1,4 +1,3 @@
-import cairo
 import numpy as np
 import os
 import matplotlib.pyplot as plt
@@ -8,6 +7,8 @@ def plotting_mesh_cairo(cells, current_time, cells_in_area, images_folder):
     """
     Plots a mesh using Cairo for effecient plotting of large meshes.
     """
+    import cairo
+
     width = 1424
     height = 1024
     surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
@@ -0,0 +1,196 @@
+"""
+A module for rendering frames of the oil distribution from a precomputed pixel to cell lookup.
+
+The mesh never moves during a simulation, so the cell under every pixel of a frame is always the same.
+`RasterRenderer` rasterizes the mesh once into an image of cell indices and draws the static parts of the
+frame (background, frame, colorbar and labels) once. Every frame is then produced by mapping the oil amount
+of every cell to a color through a colormap lookup table, and a single gather of those colors through the
+image of cell indices, so the cost of a frame hardly depends on the number of cells. The layout matches
+`plotting.plotting_mesh_cairo`.
+
+Typical usage example:
+
+    renderer = RasterRenderer(mesh, cells_in_area)
+    for step in range(intervals):
+        renderer.save(oil, current_time, images_folder)
+        engine.step(oil)
+"""
+
+import os
+import cv2 as cv
+import numpy as np
+import numpy.typing as npt
+import src.Simulation.mesh as msh
+from .results import polygon_cells
+
+_FISH_COLOR = (255, 178, 102)  # BGR
+
+
+def _colormap(size: int = 256) -> npt.NDArray[np.uint8]:
+    """
+    Returns the viridis colormap as a lookup table of BGR colors.
+    """
+    from matplotlib import colormaps
+
+    rgb = colormaps["viridis"](np.linspace(0, 1, size))[:, :3]
+    return np.round(rgb[:, ::-1] * 255).astype(np.uint8)
+
+
+def _pack(colors: npt.NDArray[np.uint8]) -> npt.NDArray[np.uint32]:
+    """
+    Packs BGR colors into one opaque 32 bit BGRA value each.
+    """
+    alpha = np.full((len(colors), 1), 255, dtype=np.uint8)
+    return np.ascontiguousarray(np.concatenate((colors, alpha), axis=1)).view(np.uint32).ravel()
+
+
+def rasterize(
+    points: npt.NDArray[np.float64],
+    connectivity: npt.NDArray[np.int64],
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+) -> npt.NDArray[np.int64]:
+    """
+    Finds the polygon containing every sample position.
+
+    Polygons are split into triangles around their first point, and the triangle containing every
+    position is located with a trapezoid map. Polygons with fewer points than others are padded with -1,
+    as by `results.polygon_cells`, and contribute only their own triangles.
+
+    Args:
+        points (npt.NDArray[np.float64]): Coordinates of the points, shape (points, 2).
+        connectivity (npt.NDArray[np.int64]): Point indices of every polygon, padded with -1.
+        x (npt.NDArray[np.float64]): x coordinates of the sample positions.
+        y (npt.NDArray[np.float64]): y coordinates of the sample positions.
+
+    Returns:
+        npt.NDArray[np.int64]: Index of the polygon containing every position, -1 outside the mesh.
+    """
+    from matplotlib.tri import Triangulation
+
+    fans = [
+        (connectivity[:, [0, k, k + 1]], np.flatnonzero(connectivity[:, k + 1] >= 0))
+        for k in range(1, connectivity.shape[1] - 1)
+    ]
+    triangles = np.concatenate([fan[polygons] for fan, polygons in fans])
+    polygon = np.concatenate([polygons for _, polygons in fans])
+    finder = Triangulation(points[:, 0], points[:, 1], triangles).get_trifinder()
+    found = np.asarray(finder(x, y), dtype=np.int64)
+    return np.where(found >= 0, polygon[found], -1)
+
+
+class RasterRenderer:
+    """
+    Renders frames of the oil distribution through an image of the cell under every pixel.
+
+    Args:
+        mesh (msh.Mesh): The mesh, with coordinates in the unit square.
+        cells_in_area (set): Cells of the fish area, drawn in a fixed color.
+        width (int): Width of the frames in pixels.
+        height (int): Height of the frames in pixels.
+    """
+
+    def __init__(self, mesh: msh.Mesh, cells_in_area: set, width: int = 1424, height: int = 1024) -> None:
+        lut = _colormap()
+
+        # defining the plot size and margins from total size, as in plotting_mesh_cairo
+        plot_margin = 0.05
+        colorbar_width = 0.1 * width
+        plot_width = width * (1 - 3 * plot_margin) - colorbar_width
+        plot_height = height * (1 - 2 * plot_margin)
+        plot_x = width * plot_margin
+        plot_y = height * plot_margin
+
+        # Finds the cell under the center of every pixel of the plot area
+        rows, columns = np.mgrid[0:height, 0:width]
+        x = (columns.ravel() + 0.5 - plot_x) / plot_width
+        y = 1 - (rows.ravel() + 0.5 - plot_y) / plot_height
+        inside = (x >= 0) & (x <= 1) & (y >= 0) & (y <= 1)
+        connectivity, indices = polygon_cells(mesh)
+        polygon = np.full(width * height, -1, dtype=np.int64)
+        polygon[inside] = rasterize(mesh.point_array, connectivity, x[inside], y[inside])
+        covered = polygon >= 0
+        cell_image = np.full(width * height, -1, dtype=np.int64)
+        cell_image[covered] = indices[polygon[covered]]
+
+        fish = np.zeros(len(mesh.cells), dtype=bool)
+        fish[[cell.index for cell in cells_in_area]] = True
+        fish_pixels = covered & fish[np.maximum(cell_image, 0)]
+        oil_pixels = covered & ~fish_pixels
+        self._cell_image = cell_image.reshape(height, width)
+
+        # Draws everything that does not change between frames
+        background = np.full((height, width, 3), 255, dtype=np.uint8)
+        cv.rectangle(
+            background,
+            (int(plot_x), int(plot_y)),
+            (int(plot_x + plot_width), int(plot_y + plot_height)),
+            (0, 0, 0),
+            2,
+        )
+        background.reshape(-1, 3)[fish_pixels] = _FISH_COLOR
+        colorbar_x_start = int(plot_x + plot_width)
+        for i, value in enumerate(np.linspace(0, 1, 100)):
+            y_start = int(plot_y + (99 - i) * (plot_height / 100))
+            y_end = int(plot_y + (100 - i) * (plot_height / 100))
+            color = tuple(int(c) for c in lut[int(round(value * (len(lut) - 1)))])
+            cv.rectangle(
+                background, (colorbar_x_start, y_start), (int(colorbar_x_start + colorbar_width), y_end), color, -1
+            )
+        for i, tick in enumerate(np.linspace(0, 1, 11)):
+            label_y = int(plot_y + plot_height - i * (plot_height / 10))
+            cv.putText(
+                background,
+                f"{tick:.1f}",
+                (int(colorbar_x_start + colorbar_width + 10), label_y),
+                cv.FONT_HERSHEY_SIMPLEX,
+                0.5,
+                (0, 0, 0),
+                1,
+                cv.LINE_AA,
+            )
+
+        # Every pixel looks up its color in a table holding the color of every cell, followed by the
+        # few distinct colors of the static pixels. Colors are packed as 32 bit BGRA values.
+        self._lut = _pack(lut)
+        static_colors, static_index = np.unique(_pack(background.reshape(-1, 3)), return_inverse=True)
+        self._num_cells = len(mesh.cells)
+        self._colors = np.empty(self._num_cells + len(static_colors), dtype=np.uint32)
+        self._colors[self._num_cells:] = static_colors
+        self._source = (self._num_cells + static_index.ravel()).astype(np.intp)
+        self._source[oil_pixels] = cell_image[oil_pixels]
+        self._shape = (height, width, 4)
+
+    @property
+    def cell_image(self) -> npt.NDArray[np.int64]:
+        """
+        The index of the cell under every pixel, -1 where there is no polygon cell.
+        """
+        return self._cell_image
+
+    def render(self, oil: npt.NDArray[np.float64]) -> npt.NDArray[np.uint8]:
+        """
+        Renders a frame of the oil distribution as a BGR image.
+
+        Args:
+            oil (npt.NDArray[np.float64]): Oil amount of every cell, ordered by cell index.
+
+        Returns:
+            npt.NDArray[np.uint8]: The frame, shape (height, width, 3).
+        """
+        scale = len(self._lut) - 1
+        color_index = np.clip(np.nan_to_num(oil * scale + 0.5), 0, scale).astype(np.intp)
+        self._colors[: self._num_cells] = self._lut[color_index]
+        return self._colors[self._source].view(np.uint8).reshape(self._shape)[..., :3]
+
+    def save(self, oil: npt.NDArray[np.float64], current_time: float, images_folder: str) -> str:
+        """
+        Renders a frame and writes it as a PNG file, named like the frames of the other plotting functions.
+        """
+        filename = os.path.join(images_folder, f"mesh_plot{current_time:.2f}.png")
+        cv.imwrite(
+            filename,
+            self.render(oil),
+            [cv.IMWRITE_PNG_COMPRESSION, 1, cv.IMWRITE_PNG_STRATEGY, cv.IMWRITE_PNG_STRATEGY_RLE],
+        )
+        return filename
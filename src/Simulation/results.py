@@ -0,0 +1,237 @@
+"""
+A module for exporting the oil distribution over time as an XDMF/HDF5 time series.
+
+The points and cells of the mesh are written once to an HDF5 file, and every exported frame appends one
+row to a chunked, compressed dataset holding the oil amount of every cell. A small XDMF file next to it
+describes the time series, such that it can be opened directly in ParaView. Only one frame is held in
+memory at a time, so memory usage does not grow with the length of the run. The XDMF file is written
+when the writer is closed; the HDF5 file is flushed after every frame.
+
+Cells are written in the order of the mesh file. Only polygon cells are exported, since lines and vertices
+carry no oil flow. Meshes of a single cell type are written with the XDMF topology of that type, meshes mixing
+cell types with the `Mixed` topology, where every cell is a type id followed by its point indices.
+
+The file layout is:
+    /mesh/points    Coordinates of the points, shape (points, 2).
+    /mesh/cells     Point indices of every cell, shape (cells, points per cell), or flat for mixed cell types.
+    /time           Simulation time of every frame.
+    /step           Number of completed steps of every frame.
+    /oil            Oil amount of every cell in every frame, shape (frames, cells).
+
+Typical usage example:
+
+    connectivity, indices = polygon_cells(mesh)
+    with ResultsWriter("results/input_results/input", points, connectivity, indices) as writer:
+        for step in range(intervals):
+            if step % write_frequency == 0:
+                writer.write(step, current_time, oil)
+            engine.step(oil)
+"""
+
+import os
+import numpy as np
+import numpy.typing as npt
+import src.Simulation.mesh as msh
+
+_TOPOLOGIES = {3: "Triangle", 4: "Quadrilateral"}
+
+# Type ids of the cells of the XDMF Mixed topology, polygons are followed by their number of points
+_MIXED_IDS = {3: 4, 4: 5}
+_MIXED_POLYGON = 3
+
+_FOOTER = """    </Grid>
+  </Domain>
+</Xdmf>
+"""
+
+
+def polygon_cells(mesh: msh.Mesh) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    """
+    Collects the polygon cells of a mesh in the order of the mesh file.
+
+    Blocks of polygons with fewer points than the largest polygon are padded with -1.
+
+    Args:
+        mesh (msh.Mesh): The mesh.
+
+    Returns:
+        tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]: The point indices of every polygon cell, and
+        the cell index of every polygon cell.
+    """
+    blocks = [(first, data) for first, data in mesh.blocks if data.shape[1] >= 3]
+    if not blocks:
+        raise Exception("The mesh has no polygon cells to export")
+    corners = max(data.shape[1] for _, data in blocks)
+    connectivity = np.full((sum(len(data) for _, data in blocks), corners), -1, dtype=np.int64)
+    indices = []
+    start = 0
+    for first, data in blocks:
+        connectivity[start : start + len(data), : data.shape[1]] = data
+        indices.append(first + np.arange(len(data)))
+        start += len(data)
+    indices = np.concatenate(indices)
+    order = np.argsort(mesh.permutation[indices], kind="stable")
+    return connectivity[order], indices[order]
+
+
+def _topology(connectivity: npt.NDArray[np.int64]) -> tuple[str, npt.NDArray[np.int64]]:
+    """
+    Chooses the XDMF topology of the cells, padded with -1 as by `polygon_cells`.
+
+    Returns:
+        tuple[str, npt.NDArray[np.int64]]: The attributes of the topology besides its number of elements,
+        and the cells as stored in the HDF5 file.
+    """
+    counts = np.count_nonzero(connectivity >= 0, axis=1)
+    if len(counts) and np.any(counts < 3):
+        raise Exception("Cells with fewer than 3 points can not be exported")
+    if len(np.unique(counts)) <= 1:
+        corners = int(counts[0]) if len(counts) else connectivity.shape[1]
+        cells = connectivity[:, :corners]
+        if corners in _TOPOLOGIES:
+            return f'TopologyType="{_TOPOLOGIES[corners]}"', cells
+        return f'TopologyType="Polygon" NodesPerElement="{corners}"', cells
+
+    # Every cell is its type id, for general polygons its number of points, and its point indices
+    ids = np.array([_MIXED_IDS.get(int(count), _MIXED_POLYGON) for count in range(connectivity.shape[1] + 1)])
+    header = np.stack((ids[counts], counts), axis=1)
+    header_size = np.where(ids[counts] == _MIXED_POLYGON, 2, 1)
+    rows = np.concatenate((header, connectivity), axis=1)
+    keep = np.concatenate(
+        (np.arange(2)[None, :] < header_size[:, None], connectivity >= 0), axis=1
+    )
+    return 'TopologyType="Mixed"', rows[keep]
+
+
+class ResultsWriter:
+    """
+    Appends frames of the oil distribution to an HDF5 file described by an XDMF file.
+
+    When continuing an earlier run, the frames already in the file are kept up to `first_step`, and
+    frames of later steps are dropped, such that they can be written again.
+
+    Args:
+        basename (str): Path of the files without extension, `.h5` and `.xdmf` are appended.
+        points (npt.NDArray[np.float64]): Coordinates of the points, shape (points, 2).
+        connectivity (npt.NDArray[np.int64]): Point indices of every exported cell, padded with -1.
+        indices (npt.NDArray[np.int64]): Cell index of every exported cell, selecting its oil amount.
+        dtype: Floating point type the oil amounts are stored as.
+        first_step (int): Step the run continues from, 0 for a new run.
+    """
+
+    def __init__(
+        self,
+        basename: str,
+        points: npt.NDArray[np.float64],
+        connectivity: npt.NDArray[np.int64],
+        indices: npt.NDArray[np.int64],
+        dtype=np.float64,
+        first_step: int = 0,
+    ) -> None:
+        import h5py
+
+        self._topology, cells = _topology(np.asarray(connectivity, dtype=np.int64))
+        self._h5_filename = f"{basename}.h5"
+        self._xdmf_filename = f"{basename}.xdmf"
+        self._indices = np.asarray(indices, dtype=np.int64)
+        num_cells = len(self._indices)
+
+        self._file = None
+        if first_step > 0 and os.path.exists(self._h5_filename):
+            self._file = h5py.File(self._h5_filename, "a")
+            if self._file["oil"].shape[1] != num_cells:
+                self._file.close()
+                self._file = None
+            else:
+                kept = int(np.count_nonzero(self._file["step"][:] < first_step))
+                for name in ("time", "step", "oil"):
+                    self._file[name].resize(kept, axis=0)
+
+        if self._file is None:
+            self._file = h5py.File(self._h5_filename, "w")
+            self._file.create_dataset("mesh/points", data=np.asarray(points, dtype=np.float64))
+            self._file.create_dataset("mesh/cells", data=cells)
+            self._file.create_dataset("time", shape=(0,), maxshape=(None,), dtype=np.float64, chunks=(1024,))
+            self._file.create_dataset("step", shape=(0,), maxshape=(None,), dtype=np.int64, chunks=(1024,))
+            self._file.create_dataset(
+                "oil",
+                shape=(0, num_cells),
+                maxshape=(None, num_cells),
+                dtype=dtype,
+                chunks=(1, num_cells),
+                compression="gzip",
+                shuffle=True,
+            )
+
+    @property
+    def num_frames(self) -> int:
+        return self._file["oil"].shape[0]
+
+    def _grid(self, frame: int, current_time: float) -> str:
+        """
+        Returns the XDMF grid of one frame, referencing its row of the oil dataset.
+        """
+        h5_name = os.path.basename(self._h5_filename)
+        num_points = self._file["mesh/points"].shape[0]
+        num_cells = len(self._indices)
+        dimensions = " ".join(str(size) for size in self._file["mesh/cells"].shape)
+        precision = self._file["oil"].dtype.itemsize
+        return f"""      <Grid Name="frame_{frame}" GridType="Uniform">
+        <Time Value="{current_time!r}"/>
+        <Topology {self._topology} NumberOfElements="{num_cells}">
+          <DataItem Dimensions="{dimensions}" NumberType="Int" Precision="8" Format="HDF">{h5_name}:/mesh/cells</DataItem>
+        </Topology>
+        <Geometry GeometryType="XY">
+          <DataItem Dimensions="{num_points} 2" NumberType="Float" Precision="8" Format="HDF">{h5_name}:/mesh/points</DataItem>
+        </Geometry>
+        <Attribute Name="oil" AttributeType="Scalar" Center="Cell">
+          <DataItem ItemType="HyperSlab" Dimensions="1 {num_cells}">
+            <DataItem Dimensions="3 2" NumberType="Int" Format="XML">{frame} 0 1 1 1 {num_cells}</DataItem>
+            <DataItem Dimensions="{self.num_frames} {num_cells}" NumberType="Float" Precision="{precision}" Format="HDF">{h5_name}:/oil</DataItem>
+          </DataItem>
+        </Attribute>
+      </Grid>
+"""
+
+    def _write_xdmf(self) -> None:
+        """
+        Rewrites the XDMF file describing every frame in the HDF5 file.
+        """
+        temporary = f"{self._xdmf_filename}.tmp"
+        with open(temporary, "w") as file:
+            file.write('<?xml version="1.0"?>\n<Xdmf Version="3.0">\n  <Domain>\n')
+            file.write('    <Grid Name="oil" GridType="Collection" CollectionType="Temporal">\n')
+            for frame, current_time in enumerate(self._file["time"][:]):
+                file.write(self._grid(frame, float(current_time)))
+            file.write(_FOOTER)
+        os.replace(temporary, self._xdmf_filename)
+
+    def write(self, step: int, current_time: float, oil: npt.NDArray[np.float64]) -> None:
+        """
+        Appends the oil distribution after the given number of completed steps as a new frame.
+
+        Args:
+            step (int): Number of completed time steps.
+            current_time (float): Simulation time of the frame.
+            oil (npt.NDArray[np.float64]): Oil amount of every cell, ordered by cell index.
+        """
+        frame = self.num_frames
+        for name in ("time", "step", "oil"):
+            self._file[name].resize(frame + 1, axis=0)
+        self._file["time"][frame] = current_time
+        self._file["step"][frame] = step
+        self._file["oil"][frame] = oil[self._indices]
+        self._file.flush()
+
+    def close(self) -> None:
+        """
+        Writes the XDMF file describing every frame and closes the HDF5 file.
+        """
+        self._write_xdmf()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -13,19 +13,65 @@ Args:
     write_frequency (int): Frequency (in steps) at which the state of the mesh is plotted.
     start_point (npt.NDArray[np.float64]): Coordinates of the initial oil distribution area.
     cell_factory (msh.CellFactory): Factory for creating cell objects from the mesh data.
+    checkpoint_steps (int): Number of steps between checkpoints, or None.
+    checkpoint_seconds (float): Wall time in seconds between checkpoints, or None.
+    checkpoint_keep (int): Number of checkpoints kept in the experiment folder.
+    resume (bool): Continue from the newest valid checkpoint of the experiment, if there is one.
+    mesh (msh.Mesh): An already loaded mesh to reuse instead of reading `mesh_path`.
+    progress (callable): Called after every step with the step number, time and oil in the fish area.
+    headless (bool): Only compute, without rendering frames or a video.
+    abort_on_instability (bool): Stop the simulation when oil amounts become non-finite or negative.
+    negative_tolerance (float): Most negative oil amount accepted when aborting on instability.
+    engine (str): Name of the engine advancing the oil distribution, see `engines.ENGINES`.
+    reorder (str): Cache friendly ordering of the cells, see `ordering.ORDERINGS`. Restart files and
+        checkpoints always use the cell indices of the mesh file.
+    precision (str): Floating point type of the oil amounts during the run, see `engines.PRECISIONS`.
+        The oil in the fish area and the diagnostics are accumulated in float64.
+    sources (list[dict]): Continuous oil sources added every step, see `sources.SourceTerms`.
+    xdmf (bool): Export the oil distribution every `write_frequency` steps and at the end of the run to
+        `<name>.h5` and `<name>.xdmf` in the experiment folder, see `results.ResultsWriter`. Without a
+        `write_frequency`, only the first and the last frame are exported.
+    exposure_threshold (float): Keep the arrival time above this oil amount, the peak oil amount and
+        the dose of every cell, see `exposure.ExposureMap`, or None.
+    weathering (dict): The `evaporation`, `decay` and `beaching` rates of the oil, see
+        `weathering.Weathering`, or None.
+    particles (int): Number of particles of the `particles` engine, see `particles.ParticleEngine`, or
+        None for its default.
 
 Key Steps:
 1. Load the mesh and initialize cell objects using the provided `mesh_path` and `cell_factory`.
 2. Compute the time step (`dt`) based on the simulation duration and number of intervals.
 3. Initialize the oil distribution based on the `start_point`.
-4. Perform the simulation:
-   - At each time step, compute changes in oil distribution for triangular cells.
-   - Update the oil amounts in cells based on computed changes.
-5. Plot the mesh at intervals specified by `write_frequency`.
-6. Generate a final plot at the end of the simulation.
+4. Create the engine, which computes the geometry it needs from the mesh in bulk.
+5. Perform the simulation:
+   - At each time step, advance the array of oil amounts with the engine, which also weathers the oil,
+     and add the oil released by the sources.
+   - Record mass, oil extremes and CFL number of the step in the diagnostics.
+   - Write a checkpoint of the oil distribution when one is due.
+6. Plot the mesh, and export the oil distribution, at intervals specified by `write_frequency`.
+7. Generate a final plot at the end of the simulation.
 
 Outputs:
+- Returns the oil in the fish area over time and the diagnostics of the run.
 - Generates plots of the mesh at specified time intervals and saves them as images.
+- Writes the per step diagnostics to `diagnostics.csv` in the experiment folder.
+- Optionally exports the oil distribution over time as an XDMF/HDF5 time series readable by ParaView.
+- With weathering, writes the oil mass beached by every coastal cell to `<name>_beached.txt` in the
+  experiment folder, as `index;mass` with the cell indices of the mesh file.
+- Optionally writes the exposure maps of the run to `<name>_exposure.npz` in the experiment folder, with
+  the cell indices of the mesh file, and renders them to `<name>_arrival.png`, `<name>_peak.png` and
+  `<name>_dose.png` unless headless.
+- The plotting and video modules (matplotlib, cairo, OpenCV) are only imported once a frame or video
+  is produced, so headless runs do not pay for importing them.
+- With `fast == 2`, frames are rendered from a pixel to cell lookup built once, see `raster.RasterRenderer`.
+- `find_out_of_core` runs the same explicit scheme on meshes larger than memory, from memory-mapped
+  arrays within a memory budget, see `outofcore`.
+- Setting `metrics_file` publishes the progress and throughput of the run to a Prometheus text file every
+  `metrics_interval` seconds, see `telemetry`.
+- `find_nested` refines the mesh over the fish area only, stepping the fine cells with subcycles, see
+  `nesting`.
+- `find_preview` runs the scheme on agglomerated cells with a larger time step for a quick look, see
+  `coarsening`.
 
 Example:
     find_and_plot(
@@ -42,10 +88,94 @@ Example:
 import numpy as np
 import numpy.typing as npt
 import os
-import src.Simulation.plotting as plot
+import time
 import src.Simulation.mesh as msh
-import src.Simulation.cells as cls
-from .create_video import make_video
+from .checkpoint import Checkpointer, latest_checkpoint, run_id
+from .diagnostics import Diagnostics, cfl_numbers
+from .engines import PRECISIONS, make_engine, transport_operator
+from .exposure import ExposureMap
+from .results import ResultsWriter, polygon_cells
+from .sources import SourceTerms
+from .telemetry import Telemetry
+from .weathering import Weathering
+
+
+def _plot(mesh, oil, current_time, cells_in_area, images_folder, fast, steps, renderer=None):
+    """
+    Plots the mesh, importing the plotting module only when the first frame is produced.
+
+    With `fast == 2`, frames are rendered by a raster renderer, which is built for the first frame and
+    returned, such that it can be reused for the next frames.
+    """
+    if fast == 2:
+        if renderer is None:
+            from .raster import RasterRenderer
+
+            renderer = RasterRenderer(mesh, cells_in_area)
+        renderer.save(oil, current_time, images_folder)
+        print(f"raster: plotting number {steps}...")
+        return renderer
+
+    import src.Simulation.plotting as plot
+
+    mesh.set_oil_amounts(oil)
+    if fast == 1:
+        plot.plotting_mesh_cairo(mesh.cells, current_time, cells_in_area, images_folder)
+        print(f"fast: plotting number {steps}...")
+    else:
+        plot.plotting_mesh(mesh.cells, current_time, cells_in_area, images_folder)
+        print(f"plotting number {steps}...")
+    return renderer
+
+
+def write_restart_file(toml_file, end_time: float, oil: npt.NDArray[np.float64]) -> str:
+    """
+    Stores the oil amount values such that the simulation can be started from a different time.
+
+    Args:
+        toml_file (str): Config file of the run, or None.
+        end_time (float): Time of the oil distribution.
+        oil (npt.NDArray[np.float64]): Oil amount of every cell, with the cell indices of the mesh file.
+
+    Returns:
+        str: Path of the restart file, in the input folder of the experiment.
+    """
+    if toml_file:
+        base_name = os.path.splitext(os.path.basename(toml_file))[0]
+        restart_filename = f"{base_name}_restartFile.txt"
+    else:
+        base_name = "default_experiment"
+        restart_filename = "restartFile.txt"
+
+    input_folder = os.path.join("results", f"{base_name}_results", "input")
+    os.makedirs(input_folder, exist_ok=True)
+    filename = os.path.join(input_folder, restart_filename)
+    with open(filename, "w") as file:
+        file.write(f"{end_time}\n")
+        for index, oil_amount in enumerate(oil):
+            file.write(f"{index};{oil_amount}\n")
+    return filename
+
+
+def read_restart_file(restartFile: str, mesh: msh.Mesh) -> float:
+    """
+    Sets the oil amounts of a mesh to those stored in a restart file, see `write_restart_file`.
+
+    Args:
+        restartFile (str): Path of the restart file.
+        mesh (msh.Mesh): The mesh to set the oil amounts of. Cells not in the file keep their oil amount.
+
+    Returns:
+        float: Time of the stored oil distribution.
+    """
+    with open(restartFile, "r") as file:
+        lines = file.readlines()
+    restart_oil = mesh.to_original(mesh.oil_amounts())
+    for line in lines[1:]:
+        index, oil_amount = line.split(";")
+        restart_oil[int(index)] = float(oil_amount)
+    mesh.set_oil_amounts(mesh.from_original(restart_oil))
+    return float(lines[0])
 
 
 def find_and_plot(
@@ -61,10 +191,33 @@ def find_and_plot(
     restartFile=None,
     toml_file=None,
     fast=0,
-) -> dict[str, float]:
+    checkpoint_steps=None,
+    checkpoint_seconds=None,
+    checkpoint_keep=3,
+    resume=False,
+    mesh=None,
+    progress=None,
+    headless=False,
+    abort_on_instability=False,
+    negative_tolerance=1e-8,
+    engine="vectorized",
+    reorder=None,
+    precision="float64",
+    xdmf=False,
+    sources=None,
+    exposure_threshold=None,
+    weathering=None,
+    metrics_file=None,
+    metrics_interval=5.0,
+    particles=None,
+) -> tuple[dict[str, float], Diagnostics]:
     """
     Plots and finds the change over the specified time
     """
+    if precision not in PRECISIONS:
+        raise Exception(f"Unknown precision: {precision}, choose one of {', '.join(PRECISIONS)}")
+    dtype = PRECISIONS[precision]
+
     root_folder = "results"
     os.makedirs(root_folder, exist_ok=True)
 
@@ -78,24 +231,15 @@ def find_and_plot(
     os.makedirs(os.path.join(experiment_folder, "input"), exist_ok=True)
     images_folder = os.path.join(experiment_folder, "images")
     os.makedirs(images_folder, exist_ok=True)
+    checkpoint_folder = os.path.join(experiment_folder, "checkpoints")
 
-    mesh = msh.Mesh(mesh_path, cell_factory)
+    if mesh is None:
+        mesh = msh.Mesh(mesh_path, cell_factory, reorder)
     cells = mesh.cells
 
-    # Calculates area, midpoint, neighbors etc
-    print("Calculating...")
-    for cell in cells:
-        if not isinstance(cell, cls.Vertex) and not isinstance(cell, cls.Line):
-            mesh.calculate(cell)
-
     # Runs if the simulation is suppose to start from a different time
     if restartFile:
-        with open(restartFile, "r") as file:
-            lines = file.readlines()
-            start_time = float(lines[0])
-            for line in lines[1:]:
-                index, oil_amount = line.split(";")
-                cells[int(index)].oil_amount = float(oil_amount)
+        start_time = read_restart_file(restartFile, mesh)
     else:
         mesh.initial_oil_distribution(start_point)
 
@@ -106,55 +250,598 @@ def find_and_plot(
     else:
         dt = round((end_time - start_time) / intervals, 6)
         
+    # Identifies the checkpoints of this run among those of earlier runs of the experiment
+    run = 0
+    if resume or checkpoint_steps or checkpoint_seconds:
+        run = run_id(
+            mesh_path,
+            restartFile,
+            start_time=start_time,
+            end_time=end_time,
+            intervals=intervals,
+            start_point=None if restartFile else np.asarray(start_point).tolist(),
+            engine=engine,
+            precision=precision,
+            sources=sources,
+            weathering=weathering,
+            particles=particles,
+        )
+    checkpointer = Checkpointer(
+        checkpoint_folder, dt, intervals, run, checkpoint_steps, checkpoint_seconds, checkpoint_keep
+    )
+
+    # Continues from the newest checkpoint of this run
+    first_step = 0
+    if resume:
+        checkpoint = latest_checkpoint(checkpoint_folder, len(cells), dt, intervals, run)
+        if checkpoint:
+            first_step, start_time, oil = checkpoint
+            mesh.set_oil_amounts(mesh.from_original(oil))
+            print(f"Resuming from checkpoint at step {first_step}, time {start_time}")
+        elif checkpointer.has_checkpoints:
+            raise Exception(
+                f"No checkpoint in {checkpoint_folder} matches this run, run without --resume to start over"
+            )
+    if first_step == 0 and checkpointer.enabled:
+        checkpointer.clear()
+
+    # Calculates area, midpoint, neighbors etc
+    print("Calculating...")
+    geometry = mesh.geometry
+    weathering = Weathering(geometry, dt, **weathering) if weathering else None
+    options = {"num_particles": particles} if particles else {}
+    engine = make_engine(engine, mesh, dt, dtype, weathering, **options)
+    source_terms = SourceTerms(geometry, sources, dtype) if sources else None
+
+    oil = mesh.oil_amounts().astype(dtype)
+    diagnostics = Diagnostics(
+        geometry.areas,
+        cfl_numbers(geometry, dt),
+        intervals - first_step,
+        abort=abort_on_instability,
+        tolerance=negative_tolerance,
+        active=geometry.active,
+    )
+    diagnostics.start(oil)
+    exposure = ExposureMap(len(oil), exposure_threshold) if exposure_threshold is not None else None
+    if exposure:
+        exposure.start(oil, start_time)
+    if diagnostics.max_cfl > 1 and not getattr(engine, "unconditionally_stable", False):
+        print(f"Warning: the CFL number is {diagnostics.max_cfl:.3f}, the simulation may be unstable")
+
+    results = None
+    if xdmf:
+        connectivity, indices = polygon_cells(mesh)
+        results = ResultsWriter(
+            os.path.join(experiment_folder, base_name),
+            mesh.point_array,
+            connectivity,
+            indices,
+            dtype,
+            first_step,
+        )
+
+    telemetry = None
+    if metrics_file:
+        telemetry = Telemetry(metrics_file, base_name, intervals, len(oil), first_step, metrics_interval)
+
     # Calculates change and plots
     current_time = start_time
     cells_in_area = set(mesh.cells_within_area(x_area, y_area))
+    fish_cells = np.array(sorted(cell.index for cell in cells_in_area), dtype=np.int64)
     oil_area_time = {}
-    for steps in range(intervals):
-        if steps % write_frequency == 0:
-            if fast == 1:
-                plot.plotting_mesh_cairo(cells, current_time, cells_in_area, images_folder)
-                print(f"fast: plotting number {steps}...")
-            else:
-                plot.plotting_mesh(cells, current_time, cells_in_area, images_folder)
-                print(f"plotting number {steps}...")
-
-        for cell in cells:
-            if not isinstance(cell, cls.Vertex) and not isinstance(cell, cls.Line):
-                mesh.calculate_change(cell, dt)
-
-        for cell in cells:
-            if not isinstance(cell, cls.Vertex) and not isinstance(cell, cls.Line):
-                cell.oil_amount += cell.oil_change
-                cell.oil_change = 0
+    renderer = None
+    steps = first_step
+    try:
+        for steps in range(first_step, intervals):
+            write_due = steps % write_frequency == 0 if write_frequency else steps == first_step
+            if results and write_due:
+                results.write(steps, current_time, oil)
+
+            if not headless and write_frequency and steps % write_frequency == 0:
+                render_start = time.perf_counter()
+                renderer = _plot(mesh, oil, current_time, cells_in_area, images_folder, fast, steps, renderer)
+                if telemetry:
+                    telemetry.rendered(time.perf_counter() - render_start)
+
+            engine.step(oil)
+            if source_terms:
+                source_terms.apply(oil, current_time, dt)
+
+            current_time = round(current_time + dt, 4)
+
+            oil_in_area = float(oil[fish_cells].sum(dtype=np.float64))
+            oil_area_time[current_time] = oil_in_area
+            if progress:
+                progress(steps + 1, current_time, oil_in_area)
+
+            diagnostics.record(steps + 1, current_time, oil)
+            if exposure:
+                exposure.update(oil, current_time, dt)
+            if telemetry:
+                telemetry.step(steps + 1, current_time, diagnostics.mass, oil_in_area)
+
+            if checkpointer.enabled and checkpointer.due(steps + 1):
+                checkpointer.write(steps + 1, current_time, mesh.to_original(oil))
+
+        if results:
+            results.write(intervals, current_time, oil)
+        if telemetry:
+            telemetry.finish(intervals, current_time, diagnostics.mass, oil_area_time.get(current_time, 0.0))
+    finally:
+        diagnostics.write(os.path.join(experiment_folder, "diagnostics.csv"))
+        if results:
+            results.close()
+
+    mesh.set_oil_amounts(oil)
+    if not headless:
+        renderer = _plot(mesh, oil, current_time, cells_in_area, images_folder, fast, steps, renderer)
+
+    write_restart_file(toml_file, end_time, mesh.to_original(oil))
 
+    if weathering:
+        with open(os.path.join(experiment_folder, f"{base_name}_beached.txt"), "w") as file:
+            for cell, mass in zip(mesh.permutation[weathering.coastal_cells], weathering.beached):
+                file.write(f"{cell};{mass}\n")
+        print(f"Beached oil mass: {weathering.beached.sum()}")
+
+    if exposure:
+        exposure.save(os.path.join(experiment_folder, f"{base_name}_exposure.npz"), mesh.to_original)
+        if not headless:
+            if renderer is None:
+                from .raster import RasterRenderer
+
+                renderer = RasterRenderer(mesh, cells_in_area)
+            exposure.render(renderer, start_time, end_time, experiment_folder, base_name)
+
+    if write_frequency and not headless:
+        from .create_video import make_video
+
+        make_video(f"{experiment_folder}/images", write_frequency, intervals)
+
+    return oil_area_time, diagnostics
+
+
+def find_sensitivity(
+    mesh_path: str,
+    start_time: float,
+    end_time: float,
+    intervals: int,
+    cell_factory: msh.CellFactory,
+    x_area: npt.NDArray[np.float64],
+    y_area: npt.NDArray[np.float64],
+    toml_file=None,
+    mesh=None,
+    engine="vectorized",
+    reorder=None,
+    precision="float64",
+    weathering=None,
+) -> npt.NDArray[np.float64]:
+    """
+    Computes how much of the oil starting in every cell ends up in the fish area at `end_time`.
+
+    The oil in the fish area at the end of a run is a linear function of the initial oil distribution,
+    sum(oil_end[fish]) = sensitivity @ oil_start. Instead of running the simulation once for every
+    candidate starting area, the sensitivity is computed with one backward (adjoint) run: starting from
+    the indicator of the fish area, the transposed time step of the engine is applied `intervals` times.
+
+    Writes `<name>_sensitivity.txt` to the experiment folder, holding `index;sensitivity` for every
+    cell, with the cell indices of the mesh file.
+
+    Args:
+        mesh_path (str): Path to the mesh file used for the simulation.
+        start_time (float): Starting time of the simulation.
+        end_time (float): Ending time of the simulation.
+        intervals (int): Number of simulation time steps.
+        cell_factory (msh.CellFactory): Factory for creating cell objects from the mesh data.
+        x_area (npt.NDArray[np.float64]): [min, max] of the fish area along the x-axis.
+        y_area (npt.NDArray[np.float64]): [min, max] of the fish area along the y-axis.
+        toml_file (str): Config file, used to name the experiment folder.
+        mesh (msh.Mesh): An already loaded mesh to reuse instead of reading `mesh_path`.
+        engine (str): Name of the engine, which must provide `adjoint_step`.
+        reorder (str): Cache friendly ordering of the cells, see `ordering.ORDERINGS`.
+        precision (str): Floating point type of the sensitivity, see `engines.PRECISIONS`.
+        weathering (dict): Rates of the weathering processes of the forward run, see `weathering.Weathering`,
+            or None.
+
+    Returns:
+        npt.NDArray[np.float64]: The sensitivity of every cell, ordered by cell index.
+
+    Raises:
+        Exception: If the engine has no adjoint step.
+    """
+    if precision not in PRECISIONS:
+        raise Exception(f"Unknown precision: {precision}, choose one of {', '.join(PRECISIONS)}")
+    dtype = PRECISIONS[precision]
+
+    if toml_file:
+        base_name = os.path.splitext(os.path.basename(toml_file))[0]
+    else:
+        base_name = "default_experiment"
+    experiment_folder = os.path.join("results", f"{base_name}_results")
+    os.makedirs(experiment_folder, exist_ok=True)
+
+    if mesh is None:
+        mesh = msh.Mesh(mesh_path, cell_factory, reorder)
+    dt = round((end_time - start_time) / intervals, 6)
+
+    weathering = Weathering(mesh.geometry, dt, **weathering) if weathering else None
+    engine = make_engine(engine, mesh, dt, dtype, weathering)
+    if not hasattr(engine, "adjoint_step"):
+        raise Exception(f"The {type(engine).__name__} has no adjoint step")
+
+    sensitivity = np.zeros(len(mesh.cells), dtype=dtype)
+    sensitivity[[cell.index for cell in mesh.cells_within_area(x_area, y_area)]] = 1
+    for _ in range(intervals):
+        engine.adjoint_step(sensitivity)
+
+    with open(os.path.join(experiment_folder, f"{base_name}_sensitivity.txt"), "w") as file:
+        for index, value in enumerate(mesh.to_original(sensitivity)):
+            file.write(f"{index};{value}\n")
+
+    return sensitivity
+
+
+def find_at_times(
+    mesh_path: str,
+    start_time: float,
+    output_times: list[float],
+    start_point: npt.NDArray[np.float64],
+    cell_factory: msh.CellFactory,
+    x_area: npt.NDArray[np.float64],
+    y_area: npt.NDArray[np.float64],
+    toml_file=None,
+    mesh=None,
+    reorder=None,
+    xdmf=False,
+    restartFile=None,
+) -> dict[float, float]:
+    """
+    Evaluates the oil in the fish area directly at the requested output times, without time steps.
+
+    The velocity field is steady, so the oil distribution follows the linear ODE d(oil)/dt = L @ oil,
+    with L the upwind transport operator (see `engines.transport_operator`). Its solution at time t is
+    exp((t - start_time) * L) @ oil_start, whose action on the oil distribution is computed with
+    `scipy.sparse.linalg.expm_multiply`, from one output time to the next. This is the exact solution
+    of the semi-discrete scheme, which the time stepping engines approximate with errors of order dt.
+
+    Writes `<name>.h5` and `<name>.xdmf` with one frame per output time when `xdmf` is set.
+
+    Args:
+        mesh_path (str): Path to the mesh file used for the simulation.
+        start_time (float): Time of the initial oil distribution.
+        output_times (list[float]): Times to evaluate the oil distribution at, not before `start_time`.
+        start_point (npt.NDArray[np.float64]): Coordinates of the initial oil distribution area.
+        cell_factory (msh.CellFactory): Factory for creating cell objects from the mesh data.
+        x_area (npt.NDArray[np.float64]): [min, max] of the fish area along the x-axis.
+        y_area (npt.NDArray[np.float64]): [min, max] of the fish area along the y-axis.
+        toml_file (str): Config file, used to name the experiment folder.
+        mesh (msh.Mesh): An already loaded mesh to reuse instead of reading `mesh_path`.
+        reorder (str): Cache friendly ordering of the cells, see `ordering.ORDERINGS`.
+        xdmf (bool): Export the oil distribution at every output time, see `results.ResultsWriter`.
+        restartFile (str): Restart file to start from instead of `start_point`, at the time stored in it.
+
+    Returns:
+        dict[float, float]: The oil in the fish area at every output time.
+
+    Raises:
+        ValueError: If an output time is before the start time.
+    """
+    from scipy.sparse.linalg import expm_multiply
+
+    if toml_file:
+        base_name = os.path.splitext(os.path.basename(toml_file))[0]
+    else:
+        base_name = "default_experiment"
+    experiment_folder = os.path.join("results", f"{base_name}_results")
+    os.makedirs(experiment_folder, exist_ok=True)
+
+    if mesh is None:
+        mesh = msh.Mesh(mesh_path, cell_factory, reorder)
+    if restartFile:
+        start_time = read_restart_file(restartFile, mesh)
+    else:
+        mesh.initial_oil_distribution(start_point)
+    if min(output_times) < start_time:
+        raise ValueError("Output times can not be before the start time.")
+    oil = mesh.oil_amounts()
+    operator = transport_operator(mesh.geometry)
+
+    results = None
+    if xdmf:
+        connectivity, indices = polygon_cells(mesh)
+        results = ResultsWriter(os.path.join(experiment_folder, base_name), mesh.point_array, connectivity, indices)
+
+    fish_cells = np.array([cell.index for cell in mesh.cells_within_area(x_area, y_area)], dtype=np.int64)
+    oil_area_time = {}
+    current_time = start_time
+    try:
+        for frame, output_time in enumerate(sorted(output_times)):
+            if output_time > current_time:
+                oil = expm_multiply((output_time - current_time) * operator, oil)
+                current_time = output_time
+            oil_area_time[output_time] = float(oil[fish_cells].sum())
+            if results:
+                results.write(frame, output_time, oil)
+    finally:
+        if results:
+            results.close()
+
+    mesh.set_oil_amounts(oil)
+    return oil_area_time
+
+
+def find_out_of_core(
+    mesh_path: str,
+    start_time: float,
+    end_time: float,
+    intervals: int,
+    start_point: npt.NDArray[np.float64],
+    x_area: npt.NDArray[np.float64],
+    y_area: npt.NDArray[np.float64],
+    toml_file=None,
+    store_folder=None,
+    reorder="rcm",
+    memory_budget=256 << 20,
+    progress=None,
+) -> dict[float, float]:
+    """
+    Finds the oil in the fish area over time for meshes larger than memory, see `outofcore`.
+
+    The mesh is converted once into a folder of arrays, `results/stores/<mesh name>` by default, and
+    converted again only when the mesh file changes. The oil distribution is kept in
+    `results/<name>_results/state/oil.npy`, in the cell order of the store; `permutation.npy` in the
+    store holds the index in the mesh file of every cell.
+
+    Args:
+        mesh_path (str): Path to the mesh file used for the simulation.
+        start_time (float): Start time of the simulation.
+        end_time (float): End time of the simulation.
+        intervals (int): Number of time steps.
+        start_point (npt.NDArray[np.float64]): Coordinates of the initial oil distribution area.
+        x_area (npt.NDArray[np.float64]): [min, max] of the fish area along the x-axis.
+        y_area (npt.NDArray[np.float64]): [min, max] of the fish area along the y-axis.
+        toml_file (str): Config file, used to name the experiment folder.
+        store_folder (str): Folder of the converted mesh.
+        reorder (str): Bandwidth reducing ordering of the cells, see `ordering.ORDERINGS`.
+        memory_budget (int): Memory the time stepping may use at a time, in bytes.
+        progress (callable): Called with the number of completed steps, the time and the oil in the fish
+            area after every step.
+
+    Returns:
+        dict[float, float]: The oil in the fish area after every step.
+    """
+    from .outofcore import OutOfCoreEngine, open_store
+
+    if toml_file:
+        base_name = os.path.splitext(os.path.basename(toml_file))[0]
+    else:
+        base_name = "default_experiment"
+    experiment_folder = os.path.join("results", f"{base_name}_results")
+    if store_folder is None:
+        store_folder = os.path.join("results", "stores", os.path.splitext(os.path.basename(mesh_path))[0])
+
+    store = open_store(mesh_path, store_folder, reorder)
+    dt = round((end_time - start_time) / intervals, 6)
+    engine = OutOfCoreEngine(store, dt, os.path.join(experiment_folder, "state"), memory_budget)
+    engine.initialize(start_point)
+    fish_cells = store.cells_within_area(x_area, y_area)
+
+    oil_area_time = {}
+    current_time = start_time
+    for steps in range(intervals):
+        engine.step()
         current_time = round(current_time + dt, 4)
+        oil_area_time[current_time] = engine.total(fish_cells)
+        if progress:
+            progress(steps + 1, current_time, oil_area_time[current_time])
+    return oil_area_time
 
-        oil_in_area = 0
-        for cell in cells_in_area:
-            oil_in_area += cell.oil_amount
-        oil_area_time[current_time] = oil_in_area
 
-    if fast == 1:
-        plot.plotting_mesh_cairo(cells, current_time, cells_in_area, images_folder)
-        print(f"fast: plotting number {steps}...")
+def find_preview(
+    mesh_path: str,
+    start_time: float,
+    end_time: float,
+    intervals: int,
+    write_frequency: int,
+    start_point: npt.NDArray[np.float64],
+    cell_factory: msh.CellFactory,
+    x_area: npt.NDArray[np.float64],
+    y_area: npt.NDArray[np.float64],
+    toml_file=None,
+    fast=0,
+    headless=False,
+    mesh=None,
+    reorder=None,
+    factor=16,
+    restartFile=None,
+) -> dict[float, float]:
+    """
+    Previews the oil distribution on agglomerated cells, see `coarsening`.
+
+    The same explicit upwind transport runs on aggregates of about `factor` cells, with the largest stable
+    time step of the aggregates, but never more steps than `intervals`. The oil in the fish area is that
+    of the coarse oil distribution prolonged back onto the fine cells. Unless headless, a frame of the
+    prolonged oil distribution is written to `results/<name>_results/preview` for about every
+    `write_frequency` fine steps. Like `find_and_plot`, the run starts from the restart file if given, but
+    no restart file is written.
+
+    Args:
+        mesh_path (str): Path to the mesh file used for the simulation.
+        start_time (float): Start time of the simulation.
+        end_time (float): End time of the simulation.
+        intervals (int): Number of time steps of the full resolution run.
+        write_frequency (int): Number of full resolution steps between frames.
+        start_point (npt.NDArray[np.float64]): Coordinates of the initial oil distribution area.
+        cell_factory (msh.CellFactory): Factory for creating cell objects from the mesh data.
+        x_area (npt.NDArray[np.float64]): [min, max] of the fish area along the x-axis.
+        y_area (npt.NDArray[np.float64]): [min, max] of the fish area along the y-axis.
+        toml_file (str): Config file, used to name the experiment folder.
+        fast (int): Rendering mode, see `find_and_plot`.
+        headless (bool): Only compute, without rendering frames.
+        mesh (msh.Mesh): An already loaded mesh to reuse instead of reading `mesh_path`.
+        reorder (str): Cache friendly ordering of the cells, see `ordering.ORDERINGS`.
+        factor (float): Number of cells of an aggregate, on average.
+        restartFile (str): Restart file to start from instead of `start_point`, at the time stored in it.
+
+    Returns:
+        dict[float, float]: The oil in the fish area after every coarse step.
+    """
+    from .coarsening import CoarseMesh
+
+    start_time = start_time or 0
+    if toml_file:
+        base_name = os.path.splitext(os.path.basename(toml_file))[0]
     else:
-        plot.plotting_mesh(cells,current_time, cells_in_area, images_folder)
-        print(f"plotting number {steps}...")
+        base_name = "default_experiment"
+    images_folder = os.path.join("results", f"{base_name}_results", "preview")
+    os.makedirs(images_folder, exist_ok=True)
+
+    if mesh is None:
+        mesh = msh.Mesh(mesh_path, cell_factory, reorder)
+    if restartFile:
+        start_time = read_restart_file(restartFile, mesh)
+        # As in `find_and_plot`, a restart file written at the end time runs again from time 0
+        if start_time == end_time:
+            start_time = 0
+    else:
+        mesh.initial_oil_distribution(start_point)
+    coarse = CoarseMesh(mesh.geometry, factor)
+    steps = min(coarse.steps(end_time - start_time), intervals)
+    dt = (end_time - start_time) / steps
+    step_operator = dt * coarse.operator
+    print(f"Preview on {coarse.num_cells} aggregates of {len(mesh.cells)} cells, {steps} steps of {dt:.6g}")
+
+    cells_in_area = set(mesh.cells_within_area(x_area, y_area))
+    fish_cells = np.array(sorted(cell.index for cell in cells_in_area), dtype=np.int64)
+    fish_counts = coarse.cell_counts(fish_cells)
+    frame_steps = max(1, round(steps * write_frequency / intervals)) if write_frequency else None
+
+    coarse_oil = coarse.restrict(mesh.oil_amounts())
+    oil_area_time = {}
+    renderer = None
+    current_time = start_time
+    for step in range(steps):
+        if not headless and frame_steps and step % frame_steps == 0:
+            renderer = _plot(
+                mesh, coarse.prolong(coarse_oil), current_time, cells_in_area, images_folder, fast, step, renderer
+            )
+        coarse_oil += step_operator @ coarse_oil
+        current_time = round(start_time + (step + 1) * dt, 4)
+        oil_area_time[current_time] = float(np.dot(fish_counts, coarse_oil))
+
+    mesh.set_oil_amounts(coarse.prolong(coarse_oil))
+    if not headless:
+        _plot(mesh, mesh.oil_amounts(), current_time, cells_in_area, images_folder, fast, steps, renderer)
+    return oil_area_time
+
 
+def find_nested(
+    mesh_path: str,
+    start_time: float,
+    end_time: float,
+    intervals: int,
+    write_frequency: int,
+    start_point: npt.NDArray[np.float64],
+    cell_factory: msh.CellFactory,
+    x_area: npt.NDArray[np.float64],
+    y_area: npt.NDArray[np.float64],
+    toml_file=None,
+    fast=0,
+    headless=False,
+    mesh=None,
+    reorder=None,
+    nest_area=None,
+    levels=2,
+    subcycles=None,
+    progress=None,
+) -> dict[float, float]:
+    """
+    Finds the oil in the fish area over time with a fine mesh over the nest area, see `nesting`.
+
+    The triangles of the mesh in the nest area are refined `levels` times and stepped `subcycles` times
+    per time step of the rest of the mesh, `2^levels` times by default, which keeps the CFL number of the
+    fine cells that of the coarse cells. The oil in the fish area is that of the cells of the mesh, with
+    the area weighted average oil amount of the fine cells in the nested cells, so it can be compared with
+    a run without nesting. Frames and the restart file are those of the mesh with these averages; the
+    final oil distribution of the fine mesh is written to `results/<name>_results/<name>_fine.npz`, with
+    the arrays `points`, `triangles` and `oil`.
+
+    Args:
+        mesh_path (str): Path to the mesh file used for the simulation.
+        start_time (float): Start time of the simulation.
+        end_time (float): End time of the simulation.
+        intervals (int): Number of time steps of the coarse mesh.
+        write_frequency (int): Number of steps between frames.
+        start_point (npt.NDArray[np.float64]): Coordinates of the initial oil distribution area.
+        cell_factory (msh.CellFactory): Factory for creating cell objects from the mesh data.
+        x_area (npt.NDArray[np.float64]): [min, max] of the fish area along the x-axis.
+        y_area (npt.NDArray[np.float64]): [min, max] of the fish area along the y-axis.
+        toml_file (str): Config file, used to name the experiment folder.
+        fast (int): Rendering mode, see `find_and_plot`.
+        headless (bool): Only compute, without rendering frames.
+        mesh (msh.Mesh): An already loaded mesh to reuse instead of reading `mesh_path`.
+        reorder (str): Cache friendly ordering of the cells, see `ordering.ORDERINGS`.
+        nest_area (list): [[x min, x max], [y min, y max]] of the nest area, the fish area by default.
+        levels (int): Number of uniform refinements of the nested triangles.
+        subcycles (int): Number of steps of the fine mesh per time step.
+        progress (callable): Called with the number of completed steps, the time and the oil in the fish
+            area after every step.
+
+    Returns:
+        dict[float, float]: The oil in the fish area after every step.
+    """
+    from .nesting import NestedEngine, NestedMesh
+
+    start_time = start_time or 0
     if toml_file:
         base_name = os.path.splitext(os.path.basename(toml_file))[0]
-        restart_filename = f"{base_name}_restartFile.txt"
     else:
-        restart_filename = "restartFile.txt"
+        base_name = "default_experiment"
+    experiment_folder = os.path.join("results", f"{base_name}_results")
+    images_folder = os.path.join(experiment_folder, "images")
+    os.makedirs(images_folder, exist_ok=True)
 
-    # Stores the oil amount values such that the simulation can be started from a different time
-    with open(os.path.join(experiment_folder, "input/", restart_filename), "w") as file:
-        file.write(f"{end_time}\n")
-        for cell in cells:
-            file.write(f"{cell.index};{cell.oil_amount}\n")
+    if mesh is None:
+        mesh = msh.Mesh(mesh_path, cell_factory, reorder)
+    nest_x, nest_y = (x_area, y_area) if nest_area is None else np.asarray(nest_area, dtype=np.float64)
+    nested = NestedMesh(mesh, nest_x, nest_y, levels)
+    if subcycles is None:
+        subcycles = 2**levels
+    dt = round((end_time - start_time) / intervals, 6)
+    engine = NestedEngine(nested, dt, subcycles)
+    outer_oil, fine_oil = nested.initial_oil(np.asarray(start_point, dtype=np.float64))
+    print(f"Nesting {nested.fine.num_cells} fine cells in {np.count_nonzero(nested.nested)} cells")
 
-    if write_frequency:
-        make_video(f"{experiment_folder}/images", write_frequency, intervals)
+    cells_in_area = set(mesh.cells_within_area(x_area, y_area))
+    fish_cells = np.array(sorted(cell.index for cell in cells_in_area), dtype=np.int64)
+    outer_weights, fine_weights = nested.cell_weights(fish_cells)
 
+    oil_area_time = {}
+    renderer = None
+    current_time = start_time
+    for steps in range(intervals):
+        if not headless and write_frequency and steps % write_frequency == 0:
+            oil = nested.combine(outer_oil, fine_oil)
+            renderer = _plot(mesh, oil, current_time, cells_in_area, images_folder, fast, steps, renderer)
+
+        engine.step(outer_oil, fine_oil)
+        current_time = round(current_time + dt, 4)
+
+        oil_in_area = float(np.dot(outer_weights, outer_oil) + np.dot(fine_weights, fine_oil))
+        oil_area_time[current_time] = oil_in_area
+        if progress:
+            progress(steps + 1, current_time, oil_in_area)
+
+    oil = nested.combine(outer_oil, fine_oil)
+    mesh.set_oil_amounts(oil)
+    if not headless:
+        _plot(mesh, oil, current_time, cells_in_area, images_folder, fast, intervals, renderer)
+    write_restart_file(toml_file, end_time, mesh.to_original(oil))
+    np.savez(
+        os.path.join(experiment_folder, f"{base_name}_fine.npz"),
+        points=nested.fine.points,
+        triangles=nested.fine_blocks[1][1],
+        oil=fine_oil[nested.fine_blocks[1][0] :],
+    )
     return oil_area_time
@@ -0,0 +1,115 @@
+"""
+A module for continuous oil sources, such as ongoing leaks, added to the oil distribution every step.
+
+Every source has a location, a radius and a schedule of release rates. It adds oil with the same Gaussian
+shape as the initial oil distribution, exp(-|midpoint - location|^2 / radius^2), scaled by the rate of the
+source at the current time: the rate is the increase of the oil amount per unit time at the center of the
+source. Sources are configured in the TOML file as an array of tables:
+
+    [[sources]]
+    location = [0.35, 0.45]
+    radius = 0.1
+    rates = [[0.0, 1.0], [0.5, 0.0]]   # [time, rate] pairs, each rate holds until the next time
+
+A constant rate can be given as `rate = 1.0` instead of `rates`.
+
+The weights of every source are computed once, for the cells within four radii of its location. Every step
+then costs one small matrix-vector product over those cells, written into preallocated buffers.
+
+Typical usage example:
+
+    source_terms = SourceTerms(mesh.geometry, config.get("sources", []))
+    for step in range(intervals):
+        engine.step(oil)
+        source_terms.apply(oil, current_time, dt)
+"""
+
+import numpy as np
+import numpy.typing as npt
+import src.Simulation.geometry as geo
+
+# Cells further from a source than this many radii receive no oil from it
+_CUTOFF = 4.0
+
+
+def source_weights(
+    geometry: geo.MeshGeometry, location: npt.NDArray[np.float64], radius: float
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]]:
+    """
+    Computes the Gaussian weights of a source as a sparse vector.
+
+    Args:
+        geometry (geo.MeshGeometry): Geometry of the mesh.
+        location (npt.NDArray[np.float64]): Center of the source.
+        radius (float): Radius of the source.
+
+    Returns:
+        tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]]: The cells carrying oil flow near the source,
+        and the weight of each of those cells.
+    """
+    distance_squared = np.sum((geometry.midpoints - np.asarray(location)) ** 2, axis=1)
+    cells = np.flatnonzero(geometry.active & (distance_squared < (_CUTOFF * radius) ** 2))
+    return cells, np.exp(-distance_squared[cells] / radius**2)
+
+
+def rate_schedule(source: dict) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """
+    Returns the times and rates of the schedule of a source from its config.
+
+    Raises:
+        ValueError: If the source has no rate, a negative rate, or the times of its schedule are not increasing.
+    """
+    if "rates" in source:
+        schedule = np.asarray(source["rates"], dtype=np.float64).reshape(-1, 2)
+    elif "rate" in source:
+        schedule = np.array([[-np.inf, source["rate"]]], dtype=np.float64)
+    else:
+        raise ValueError("A source needs a rate or rates.")
+    if np.any(np.diff(schedule[:, 0]) <= 0):
+        raise ValueError("The times of the rates of a source must be increasing.")
+    if np.any(schedule[:, 1] < 0):
+        raise ValueError("The rates of a source can not be negative.")
+    return schedule[:, 0], schedule[:, 1]
+
+
+class SourceTerms:
+    """
+    Adds the oil released by all sources in a time step to the oil distribution.
+
+    Args:
+        geometry (geo.MeshGeometry): Geometry of the mesh.
+        sources (list[dict]): The sources, each with a `location`, a `radius` and a `rate` or `rates`.
+        dtype: Floating point type of the oil amounts.
+    """
+
+    def __init__(self, geometry: geo.MeshGeometry, sources: list[dict], dtype=np.float64) -> None:
+        self._schedules = [rate_schedule(source) for source in sources]
+        supports = [
+            source_weights(geometry, source["location"], source["radius"]) for source in sources
+        ]
+
+        # The weights of all sources on the union of the cells they reach, one column per source
+        self._cells = np.unique(np.concatenate([cells for cells, _ in supports] + [np.zeros(0, dtype=np.int64)]))
+        self._weights = np.zeros((len(self._cells), len(sources)), dtype=dtype)
+        for column, (cells, weights) in enumerate(supports):
+            self._weights[np.searchsorted(self._cells, cells), column] = weights
+
+        self._amounts = np.zeros(len(sources), dtype=dtype)
+        self._released = np.zeros(len(self._cells), dtype=dtype)
+        self._current = np.zeros(len(self._cells), dtype=dtype)
+
+    @property
+    def enabled(self) -> bool:
+        return len(self._schedules) > 0
+
+    def apply(self, oil: npt.NDArray[np.float64], current_time: float, dt: float) -> None:
+        """
+        Adds the oil released from `current_time` to `current_time + dt` to the oil distribution in place.
+        """
+        for index, (times, values) in enumerate(self._schedules):
+            position = np.searchsorted(times, current_time, side="right") - 1
+            self._amounts[index] = values[position] * dt if position >= 0 else 0.0
+        np.dot(self._weights, self._amounts, out=self._released)
+        np.take(oil, self._cells, out=self._current, mode="clip")
+        self._current += self._released
+        np.put(oil, self._cells, self._current)
@@ -0,0 +1,156 @@
+"""
+A module for live progress and throughput metrics of a running simulation.
+
+`Telemetry` is told about every completed step and rendered frame, and at most once every `interval`
+seconds writes the metrics below to a file in the Prometheus text exposition format, which a scheduler can
+poll, or the node exporter textfile collector can serve. Every metric carries an `experiment` label.
+
+    - `oil_steps_completed`, `oil_steps_planned`: Steps completed and to be completed in the run.
+    - `oil_simulation_time`: Simulation time after the last completed step.
+    - `oil_cell_updates_per_second`: Cells times steps per second, since the previous write.
+    - `oil_eta_seconds`: Estimated time until the run completes, at that throughput.
+    - `oil_mass`: Area weighted total oil mass.
+    - `oil_fish_area_oil`: Oil in the fish area.
+    - `oil_frames_rendered_total`, `oil_render_seconds_total`: Frames rendered and the time spent on them.
+    - `oil_last_update_timestamp_seconds`: Unix time of the write, such that stalled runs can be detected.
+    - `oil_run_finished`: 1 once the run has completed, else 0.
+
+The file is written to a temporary file first and renamed into place, so a reader never sees a partial
+file. Between writes, a step costs a single clock read.
+
+Typical usage example:
+
+    telemetry = Telemetry("results/input_results/metrics.prom", "input", intervals, len(oil))
+    for step in range(intervals):
+        engine.step(oil)
+        telemetry.step(step + 1, current_time, mass, oil_in_area)
+    telemetry.finish(intervals, current_time, mass, oil_in_area)
+"""
+
+import os
+import time
+
+_METRICS = (
+    ("oil_steps_completed", "gauge", "Steps completed."),
+    ("oil_steps_planned", "gauge", "Steps of the whole run."),
+    ("oil_simulation_time", "gauge", "Simulation time after the last completed step."),
+    ("oil_cell_updates_per_second", "gauge", "Cell updates per second since the previous write."),
+    ("oil_eta_seconds", "gauge", "Estimated seconds until the run completes."),
+    ("oil_mass", "gauge", "Area weighted total oil mass."),
+    ("oil_fish_area_oil", "gauge", "Oil in the fish area."),
+    ("oil_frames_rendered_total", "counter", "Frames rendered."),
+    ("oil_render_seconds_total", "counter", "Seconds spent rendering frames."),
+    ("oil_last_update_timestamp_seconds", "gauge", "Unix time of the last write of the metrics."),
+    ("oil_run_finished", "gauge", "1 once the run has completed, else 0."),
+)
+
+
+class Telemetry:
+    """
+    Publishes the progress and throughput of a run to a metrics file, rate limited.
+
+    Args:
+        filename (str): Path of the metrics file.
+        experiment (str): Name of the experiment, the value of the `experiment` label.
+        planned_steps (int): Number of steps of the whole run.
+        num_cells (int): Number of cells updated every step.
+        first_step (int): Number of steps completed before the run started, e.g. when resuming.
+        interval (float): Least number of seconds between writes.
+        clock (callable): Monotonic clock in seconds.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        experiment: str,
+        planned_steps: int,
+        num_cells: int,
+        first_step: int = 0,
+        interval: float = 5.0,
+        clock=time.monotonic,
+    ) -> None:
+        if interval <= 0:
+            raise ValueError("The interval between metrics writes must be positive.")
+        self._filename = filename
+        self._experiment = experiment.replace("\\", "\\\\").replace('"', '\\"')
+        self._planned_steps = planned_steps
+        self._num_cells = num_cells
+        self._interval = interval
+        self._clock = clock
+        self._values = dict.fromkeys((name for name, _, _ in _METRICS), 0.0)
+        self._values["oil_steps_planned"] = planned_steps
+        self._values["oil_steps_completed"] = first_step
+        self._last_write = clock()
+        self._last_step = first_step
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        self._write()
+
+    @property
+    def filename(self) -> str:
+        return self._filename
+
+    @property
+    def values(self) -> dict[str, float]:
+        """
+        The metrics as last written.
+        """
+        return dict(self._values)
+
+    def step(self, step: int, current_time: float, mass: float, oil_in_area: float) -> None:
+        """
+        Records a completed step, writing the metrics if the interval has passed since the last write.
+
+        Args:
+            step (int): Number of completed steps.
+            current_time (float): Simulation time after the step.
+            mass (float): Area weighted total oil mass after the step.
+            oil_in_area (float): Oil in the fish area after the step.
+        """
+        now = self._clock()
+        if now - self._last_write < self._interval:
+            return
+        self._update(now, step, current_time, mass, oil_in_area)
+        self._write()
+
+    def rendered(self, seconds: float) -> None:
+        """
+        Records a rendered frame and the seconds it took.
+        """
+        self._values["oil_frames_rendered_total"] += 1
+        self._values["oil_render_seconds_total"] += seconds
+
+    def finish(self, step: int, current_time: float, mass: float, oil_in_area: float) -> None:
+        """
+        Writes the metrics of the completed run.
+        """
+        self._update(self._clock(), step, current_time, mass, oil_in_area)
+        self._values["oil_eta_seconds"] = 0.0
+        self._values["oil_run_finished"] = 1
+        self._write()
+
+    def _update(self, now: float, step: int, current_time: float, mass: float, oil_in_area: float) -> None:
+        elapsed = now - self._last_write
+        steps_per_second = (step - self._last_step) / elapsed if elapsed > 0 else 0.0
+        values = self._values
+        values["oil_steps_completed"] = step
+        values["oil_simulation_time"] = current_time
+        values["oil_mass"] = mass
+        values["oil_fish_area_oil"] = oil_in_area
+        if steps_per_second > 0:
+            values["oil_cell_updates_per_second"] = steps_per_second * self._num_cells
+            values["oil_eta_seconds"] = (self._planned_steps - step) / steps_per_second
+        self._last_write = now
+        self._last_step = step
+
+    def _write(self) -> None:
+        self._values["oil_last_update_timestamp_seconds"] = time.time()
+        label = f'{{experiment="{self._experiment}"}}'
+        lines = []
+        for name, kind, description in _METRICS:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name}{label} {float(self._values[name]):.17g}")
+        temporary = f"{self._filename}.tmp"
+        with open(temporary, "w") as file:
+            file.write("\n".join(lines) + "\n")
+        os.replace(temporary, self._filename)
@@ -0,0 +1,146 @@
+"""
+A module for the weathering of oil: evaporation, decay and beaching at the coastline.
+
+Weathering removes oil from every cell at a rate proportional to its oil amount, so over a time step
+the oil of a cell is multiplied by a constant factor exp(-k * dt), with k the sum of
+
+    - the evaporation rate,
+    - the decay rate (e.g. biodegradation and dissolution),
+    - the beaching rate of the cell: the beaching velocity times the length of its coastline edges divided
+      by its area. The coastline are the edges shared with `Line` cells, which carry no oil flow.
+
+The factors are computed once, so weathering is an operator-split stage applied after transport. Engines
+built on a sparse step operator fold the factors into the operator (see `fuse`), such that transport and
+weathering remain a single sparse matrix-vector product per step; the other engines multiply by the
+factors after every step with `apply`.
+
+The oil mass stranded on the coastline is accumulated for every coastal cell. Weathering is configured in
+the TOML file with a `[weathering]` table of rates, which all default to zero:
+
+    [weathering]
+    evaporation = 0.1   # per unit time
+    decay = 0.01        # per unit time
+    beaching = 0.05     # length per unit time
+
+Typical usage example:
+
+    weathering = Weathering(mesh.geometry, dt, **config["weathering"])
+    engine = make_engine("vectorized", mesh, dt, weathering=weathering)
+    for step in range(intervals):
+        engine.step(oil)
+    print(weathering.beached.sum())
+"""
+
+import numpy as np
+import numpy.typing as npt
+import scipy.sparse as sparse
+import src.Simulation.geometry as geo
+
+
+class Weathering:
+    """
+    The weathering factors of every cell for a time step, and the oil mass beached so far.
+
+    Args:
+        geometry (geo.MeshGeometry): Geometry of the mesh.
+        dt (float): Time step of the simulation.
+        evaporation (float): Evaporation rate, per unit time.
+        decay (float): Decay rate, per unit time.
+        beaching (float): Beaching velocity at the coastline, length per unit time.
+
+    Raises:
+        ValueError: If a rate is negative.
+    """
+
+    def __init__(
+        self,
+        geometry: geo.MeshGeometry,
+        dt: float,
+        evaporation: float = 0.0,
+        decay: float = 0.0,
+        beaching: float = 0.0,
+    ) -> None:
+        if min(evaporation, decay, beaching) < 0:
+            raise ValueError("Weathering rates can not be negative.")
+
+        # Length of the coastline edges of every cell
+        first = geometry.face_cells[:, 0]
+        coastline = ~geometry.active[geometry.face_cells[:, 1]]
+        coast_length = np.bincount(
+            first[coastline], np.linalg.norm(geometry.face_normals[coastline], axis=1), geometry.num_cells
+        )
+        self._coastal_cells = np.flatnonzero(coast_length > 0)
+
+        active = geometry.active
+        beaching_rate = np.zeros(geometry.num_cells)
+        beaching_rate[active] = beaching * coast_length[active] / geometry.areas[active]
+        rate = np.where(active, evaporation + decay, 0.0) + beaching_rate
+        self._factor = np.exp(-rate * dt)
+
+        # The part of the removed oil mass that is stranded on the coastline, for every coastal cell
+        cells = self._coastal_cells
+        removed = np.divide(
+            beaching_rate[cells], rate[cells], out=np.zeros(len(cells)), where=rate[cells] > 0
+        ) * (1 - self._factor[cells])
+        self._stranded = geometry.areas[cells] * removed
+        self._beached = np.zeros(len(cells))
+        self._enabled = bool(np.any(rate > 0))
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @property
+    def factor(self) -> npt.NDArray[np.float64]:
+        """
+        The fraction of its oil every cell keeps over a time step.
+        """
+        return self._factor
+
+    @property
+    def coastal_cells(self) -> npt.NDArray[np.int64]:
+        """
+        The cells with coastline edges.
+        """
+        return self._coastal_cells
+
+    @property
+    def beached(self) -> npt.NDArray[np.float64]:
+        """
+        The oil mass beached so far by every coastal cell.
+        """
+        return self._beached
+
+    def fuse(self, step_operator: sparse.csr_matrix) -> tuple[sparse.csr_matrix, sparse.csr_matrix]:
+        """
+        Folds the weathering factors into the explicit step oil += S @ oil.
+
+        Args:
+            step_operator (sparse.csr_matrix): The operator S of the transport step.
+
+        Returns:
+            tuple[sparse.csr_matrix, sparse.csr_matrix]: The operator of the step followed by weathering,
+            diag(factor) @ (I + S) - I, and the operator giving the oil mass every coastal cell beaches
+            in the step, from the oil distribution before the step, or None without beaching.
+        """
+        identity = sparse.identity(step_operator.shape[0], format="csr")
+        transported = identity + step_operator
+        fused = (sparse.diags(self._factor) @ transported - identity).tocsr()
+        fused.eliminate_zeros()
+        stranding = None
+        if np.any(self._stranded > 0):
+            stranding = (sparse.diags(self._stranded) @ transported[self._coastal_cells]).tocsr()
+        return fused, stranding
+
+    def record(self, stranding: sparse.csr_matrix, oil: npt.NDArray[np.float64]) -> None:
+        """
+        Adds the oil mass beached in a fused step, from the oil distribution before the step.
+        """
+        self._beached += stranding @ oil
+
+    def apply(self, oil: npt.NDArray[np.float64]) -> None:
+        """
+        Weathers the oil distribution after a transport step in place.
+        """
+        self._beached += self._stranded * oil[self._coastal_cells]
+        np.multiply(oil, self._factor, out=oil)
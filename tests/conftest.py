@@ -0,0 +1,16 @@
+import src.Simulation.mesh as msh
+import pytest
+
+
+@pytest.fixture(scope="session")
+def make_factory():
+    """
+    Returns the function creating a new cell factory, for tests and fixtures reading several meshes. A factory
+    numbers the cells it creates, so every mesh needs a new one.
+    """
+    return msh.default_factory
+
+
+@pytest.fixture
+def factory():
+    return msh.default_factory()
@@ -0,0 +1,68 @@
+import src.Simulation.mesh as msh
+import src.Simulation.solver as solve
+import numpy as np
+import os
+import pytest
+
+MESH = os.path.abspath("meshes/bay.msh")
+X_AREA = np.array([0.0, 0.45])
+Y_AREA = np.array([0.0, 0.2])
+
+
+@pytest.mark.parametrize("start_point", [[0.35, 0.45], [0.3, 0.3]])
+def test_sensitivity_predicts_forward_run(tmp_path, monkeypatch, start_point, make_factory):
+    monkeypatch.chdir(tmp_path)
+    sensitivity = solve.find_sensitivity(MESH, 0, 0.5, 250, make_factory(), X_AREA, Y_AREA, toml_file="adjoint.toml")
+
+    mesh = msh.Mesh(MESH, make_factory())
+    mesh.initial_oil_distribution(np.array(start_point))
+    predicted = sensitivity @ mesh.oil_amounts()
+    oil_area_time, _ = solve.find_and_plot(
+        MESH, 0, 0.5, 250, None, np.array(start_point), make_factory(), X_AREA, Y_AREA, headless=True
+    )
+    assert np.isclose(oil_area_time[0.5], predicted, rtol=1e-10), "The sensitivity should predict the forward run"
+
+
+@pytest.mark.parametrize("engine", ["vectorized", "implicit"])
+def test_sensitivity_with_weathering(tmp_path, monkeypatch, engine, make_factory):
+    monkeypatch.chdir(tmp_path)
+    weathering = {"evaporation": 0.5, "beaching": 0.2}
+    start_point = np.array([0.35, 0.45])
+    sensitivity = solve.find_sensitivity(
+        MESH,
+        0,
+        0.5,
+        250,
+        make_factory(),
+        X_AREA,
+        Y_AREA,
+        toml_file="adjoint.toml",
+        engine=engine,
+        weathering=weathering,
+    )
+
+    mesh = msh.Mesh(MESH, make_factory())
+    mesh.initial_oil_distribution(start_point)
+    predicted = sensitivity @ mesh.oil_amounts()
+    arguments = (MESH, 0, 0.5, 250, None, start_point)
+    weathered, _ = solve.find_and_plot(
+        *arguments, make_factory(), X_AREA, Y_AREA, headless=True, engine=engine, weathering=weathering
+    )
+    plain, _ = solve.find_and_plot(*arguments, make_factory(), X_AREA, Y_AREA, headless=True, engine=engine)
+    assert np.isclose(weathered[0.5], predicted, rtol=1e-10), "The sensitivity should predict the weathered run"
+    assert weathered[0.5] < 0.9 * plain[0.5]
+
+
+def test_sensitivity_file(tmp_path, monkeypatch, factory):
+    monkeypatch.chdir(tmp_path)
+    mesh = msh.Mesh(MESH, factory, "rcm")
+    sensitivity = solve.find_sensitivity(MESH, 0, 0.1, 50, None, X_AREA, Y_AREA, toml_file="adjoint.toml", mesh=mesh)
+    written = np.loadtxt("results/adjoint_results/adjoint_sensitivity.txt", delimiter=";")
+    assert np.array_equal(written[:, 0], np.arange(len(mesh.cells)))
+    assert np.allclose(written[:, 1], mesh.to_original(sensitivity)), "The file should use the indices of the mesh file"
+
+
+def test_reference_engine_has_no_adjoint(tmp_path, monkeypatch, factory):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(Exception):
+        solve.find_sensitivity(MESH, 0, 0.1, 5, factory, X_AREA, Y_AREA, engine="reference")
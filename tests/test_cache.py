@@ -0,0 +1,147 @@
+import src.Simulation.cache as cch
+import numpy as np
+import os
+import subprocess
+import sys
+import time
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def config():
+    return {
+        "settings": {"nSteps": 100, "t_start": 0, "t_end": 2.0},
+        "geometry": {
+            "filepath": "meshes/simple.msh",
+            "fish_area": [[0.0, 0.45], [0.0, 0.2]],
+            "initial_oil_area": [0.35, 0.45],
+        },
+        "IO": {"logName": "logfile", "writeFrequency": 5},
+    }
+
+
+def test_key_normalization(config, tmp_path):
+    cache = cch.ResultCache(str(tmp_path))
+    key = cache.key(config)
+    config["settings"]["t_start"] = 0.0
+    config["IO"]["logName"] = "other"
+    config["IO"]["checkpointSteps"] = 10
+    assert cache.key(config) == key, "Equal values and output only settings should not change the key"
+    config["settings"]["nSteps"] = 200
+    assert cache.key(config) != key
+
+
+def test_key_depends_on_file_contents(config, tmp_path):
+    cache = cch.ResultCache(str(tmp_path / "cache"))
+    copy = tmp_path / "copy.msh"
+    copy.write_bytes(open("meshes/simple.msh", "rb").read())
+    key = cache.key(config)
+    config["geometry"]["filepath"] = str(copy)
+    assert cache.key(config) == key, "The mesh should enter the key by its contents"
+
+    restart = tmp_path / "restart.txt"
+    restart.write_text("1.0\n0;0.5\n")
+    restart_key = cache.key(config, str(restart))
+    assert restart_key != key
+    restart.write_text("1.0\n0;0.25\n")
+    assert cache.key(config, str(restart)) != restart_key
+
+
+def test_put_and_get(tmp_path):
+    cache = cch.ResultCache(str(tmp_path))
+    assert cache.get("missing") is None
+    oil_area_time = {0.02: 1.5, 0.04: 1.25}
+    cache.put("key", oil_area_time, np.arange(4.0), {"max_cfl": 0.5}, "step,time\n1,0.02\n")
+    cached_oil_area_time, final_oil, summary, diagnostics = cache.get("key")
+    assert cached_oil_area_time == oil_area_time
+    assert np.array_equal(final_oil, np.arange(4.0))
+    assert summary == {"max_cfl": 0.5}
+    assert diagnostics == "step,time\n1,0.02\n"
+
+
+def test_least_recently_used_evicted(tmp_path):
+    cache = cch.ResultCache(str(tmp_path))
+    for key in ("a", "b", "c"):
+        cache.put(key, {0.1: 1.0}, np.zeros(1000), {})
+    size = os.path.getsize(tmp_path / "a.npz")
+    past = time.time() - 100
+    for age, key in enumerate(("a", "b", "c")):
+        os.utime(tmp_path / f"{key}.npz", (past + age, past + age))
+    cache.get("a")
+
+    cache = cch.ResultCache(str(tmp_path), max_bytes=3 * size)
+    cache.put("d", {0.1: 1.0}, np.zeros(1000), {})
+    assert sorted(os.listdir(tmp_path)) == ["a.npz", "c.npz", "d.npz"], "The least recently used result should be removed"
+
+
+def test_solver_version_is_stable():
+    assert cch.solver_version() == cch.solver_version()
+
+
+def test_cacheable(config):
+    assert not cch.cacheable(config, headless=False), "Frames are rendered every writeFrequency steps"
+    assert cch.cacheable(config, headless=True), "A headless run writes no frames"
+    for section, key, value in (
+        ("IO", "xdmf", True),
+        ("IO", "metricsFile", "metrics.prom"),
+        ("IO", "checkpointSteps", 10),
+        ("settings", "exposureThreshold", 0.1),
+        ("weathering", "evaporation", 0.5),
+    ):
+        changed = {name: dict(values) for name, values in config.items()}
+        changed.setdefault(section, {})[key] = value
+        assert not cch.cacheable(changed, headless=True), f"{key} writes outputs the cache does not hold"
+
+
+def run_main(folder, name, io, *flags):
+    mesh = os.path.join(ROOT, "meshes", "simple.msh")
+    (folder / f"{name}.toml").write_text(
+        f"""[settings]
+nSteps = 10
+t_start = 0
+t_end = 0.1
+
+[geometry]
+filepath = "{mesh}"
+fish_area = [[0.0, 0.45], [0.0, 0.2]]
+initial_oil_area = [0.35, 0.45]
+
+[IO]
+logName = "{name}"
+{io}
+"""
+    )
+    subprocess.run(
+        [sys.executable, os.path.join(ROOT, "main.py"), "-c", f"{name}.toml", *flags],
+        cwd=folder,
+        check=True,
+        capture_output=True,
+    )
+    return folder / "results" / f"{name}_results"
+
+
+def test_headless_hit_restores_outputs(tmp_path):
+    first = run_main(tmp_path, "a", "", "--headless")
+    second = run_main(tmp_path, "b", "", "--headless")
+    assert "Result found in the cache" in (tmp_path / "logs" / "b.log").read_text()
+    assert (second / "diagnostics.csv").read_text() == (first / "diagnostics.csv").read_text()
+    assert (second / "input" / "b_restartFile.txt").exists()
+
+
+def test_headless_run_with_write_frequency_is_cached(tmp_path):
+    run_main(tmp_path, "a", "writeFrequency = 5", "--headless")
+    assert os.listdir(tmp_path / "results" / "cache"), "The result should be stored in the cache"
+    results = run_main(tmp_path, "b", "writeFrequency = 5", "--headless")
+    assert "Result found in the cache" in (tmp_path / "logs" / "b.log").read_text()
+    assert (results / "diagnostics.csv").exists()
+
+
+def test_rendered_run_is_not_served_from_cache(tmp_path):
+    run_main(tmp_path, "a", "", "--headless")
+    results = run_main(tmp_path, "b", "xdmf = true", "--raster")
+    assert "Result found in the cache" not in (tmp_path / "logs" / "b.log").read_text()
+    assert (results / "diagnostics.csv").exists()
+    assert (results / "b.h5").exists() and (results / "b.xdmf").exists()
+    assert os.listdir(results / "images"), "The final frame should be rendered"
@@ -0,0 +1,124 @@
+import src.Simulation.checkpoint as chk
+import src.Simulation.solver as solve
+import numpy as np
+import os
+import pytest
+
+DT = 0.01
+INTERVALS = 100
+
+
+@pytest.fixture
+def oil():
+    return np.linspace(0, 1, 10)
+
+
+def test_write_and_read_checkpoint(tmp_path, oil):
+    chk.write_checkpoint(tmp_path, 20, 0.2, oil, DT, INTERVALS)
+    step, current_time, loaded = chk.latest_checkpoint(tmp_path, len(oil), DT, INTERVALS)
+    assert step == 20 and current_time == 0.2, "The step and time of the checkpoint are incorrect"
+    assert np.array_equal(loaded, oil), "The oil amounts of the checkpoint are incorrect"
+
+
+def test_no_temporary_files_left(tmp_path, oil):
+    chk.write_checkpoint(tmp_path, 1, 0.1, oil, DT, INTERVALS)
+    assert [path.name for path in tmp_path.iterdir()] == ["checkpoint_00000001.npy"]
+
+
+def test_latest_checkpoint_is_newest(tmp_path, oil):
+    chk.write_checkpoint(tmp_path, 5, 0.05, oil, DT, INTERVALS)
+    chk.write_checkpoint(tmp_path, 10, 0.1, 2 * oil, DT, INTERVALS)
+    step, _, loaded = chk.latest_checkpoint(tmp_path, len(oil), DT, INTERVALS)
+    assert step == 10 and np.array_equal(loaded, 2 * oil)
+
+
+def test_invalid_checkpoints_are_skipped(tmp_path, oil):
+    chk.write_checkpoint(tmp_path, 5, 0.05, oil, DT, INTERVALS)
+    (tmp_path / "checkpoint_00000010.npy").write_bytes(b"corrupt")
+    chk.write_checkpoint(tmp_path, 15, 0.15, np.full(len(oil), np.nan), DT, INTERVALS)
+    assert chk.latest_checkpoint(tmp_path, len(oil), DT, INTERVALS)[0] == 5
+    assert chk.latest_checkpoint(tmp_path, len(oil) + 1, DT, INTERVALS) is None, "A checkpoint for a different mesh was accepted"
+
+
+def test_checkpoints_of_other_runs_are_skipped(tmp_path, oil):
+    chk.write_checkpoint(tmp_path, 5, 0.05, oil, DT, INTERVALS)
+    chk.write_checkpoint(tmp_path, 10, 0.05, oil, DT / 2, 2 * INTERVALS)
+    chk.write_checkpoint(tmp_path, 15, 0.15, oil, DT, INTERVALS + 50)
+    assert chk.latest_checkpoint(tmp_path, len(oil), DT, INTERVALS)[0] == 5
+    assert chk.latest_checkpoint(tmp_path, len(oil), DT / 2, 2 * INTERVALS)[0] == 10
+    assert chk.latest_checkpoint(tmp_path, len(oil), DT / 4, 4 * INTERVALS) is None, (
+        "A checkpoint of a run with a different time step was accepted"
+    )
+
+
+def test_checkpoints_of_other_configs_are_skipped(tmp_path, oil):
+    run = chk.run_id("meshes/simple.msh", start_point=[0.35, 0.45])
+    other = chk.run_id("meshes/simple.msh", start_point=[0.5, 0.5])
+    assert run != other and run == chk.run_id("meshes/simple.msh", start_point=[0.35, 0.45])
+    assert run != chk.run_id("meshes/bay.msh", start_point=[0.35, 0.45]), "The mesh file should change the run"
+    chk.write_checkpoint(tmp_path, 5, 0.05, oil, DT, INTERVALS, run)
+    chk.write_checkpoint(tmp_path, 10, 0.1, oil, DT, INTERVALS, other)
+    assert chk.latest_checkpoint(tmp_path, len(oil), DT, INTERVALS, run)[0] == 5
+    assert chk.latest_checkpoint(tmp_path, len(oil), DT, INTERVALS, other)[0] == 10
+
+
+def test_rotation_keeps_other_runs(tmp_path, oil):
+    for step in (80, 90, 100):
+        chk.write_checkpoint(tmp_path, step, step * 0.01, oil, DT, INTERVALS, 1)
+    checkpointer = chk.Checkpointer(tmp_path, DT, INTERVALS, 2, every_steps=10, keep=1)
+    checkpointer.write(10, 0.1, oil)
+    assert chk.latest_checkpoint(tmp_path, len(oil), DT, INTERVALS, 2)[0] == 10, "The new checkpoint was removed"
+    assert len(list(tmp_path.iterdir())) == 4
+    checkpointer.clear()
+    assert not checkpointer.has_checkpoints
+
+
+def test_stale_checkpoint_folder(tmp_path, monkeypatch, make_factory):
+    path = os.path.abspath("meshes/simple.msh")
+    monkeypatch.chdir(tmp_path)
+    x_area, y_area = np.array([0.0, 0.45]), np.array([0.0, 0.2])
+    folder = os.path.join("results", "default_experiment_results", "checkpoints")
+
+    def run(start_point, **options):
+        return solve.find_and_plot(
+            path, 0, 0.1, 10, None, np.array(start_point), make_factory(), x_area, y_area, headless=True, **options
+        )
+
+    # An earlier run of a different scenario leaves its checkpoints behind
+    run([0.5, 0.5], checkpoint_steps=2)
+    assert sorted(os.listdir(folder))[-1] == "checkpoint_00000010.npy"
+
+    def interrupt(step, current_time, oil_in_area):
+        if step == 5:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        run([0.35, 0.45], checkpoint_steps=2, progress=interrupt)
+    assert sorted(os.listdir(folder)) == ["checkpoint_00000002.npy", "checkpoint_00000004.npy"]
+
+    with pytest.raises(Exception, match="matches this run"):
+        run([0.5, 0.5], resume=True)
+    resumed = []
+    run([0.35, 0.45], resume=True, progress=lambda step, *_: resumed.append(step))
+    assert resumed[0] == 5, "The run should resume from its own checkpoint at step 4"
+
+
+def test_missing_folder(tmp_path):
+    assert chk.latest_checkpoint(tmp_path / "missing", 10, DT, INTERVALS) is None
+
+
+def test_rotation(tmp_path, oil):
+    checkpointer = chk.Checkpointer(tmp_path, DT, INTERVALS, every_steps=2, keep=2)
+    for step in range(1, 11):
+        if checkpointer.due(step):
+            checkpointer.write(step, step * 0.1, oil)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "checkpoint_00000008.npy",
+        "checkpoint_00000010.npy",
+    ]
+
+
+def test_due_by_wall_time(tmp_path):
+    checkpointer = chk.Checkpointer(tmp_path, DT, INTERVALS, every_seconds=1e-9)
+    assert checkpointer.due(1), "A checkpoint should be due once the wall time has passed"
+    assert not chk.Checkpointer(tmp_path, DT, INTERVALS).enabled
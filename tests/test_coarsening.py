@@ -0,0 +1,103 @@
+import src.Simulation.mesh as msh
+import src.Simulation.solver as solve
+from src.Simulation.coarsening import CoarseMesh, aggregate
+from src.Simulation.diagnostics import cfl_numbers
+from src.Simulation.engines import transport_operator
+import numpy as np
+import os
+import pytest
+import scipy.sparse as sparse
+from scipy.sparse.csgraph import connected_components
+
+
+@pytest.fixture(scope="module")
+def mesh(make_factory):
+    mesh = msh.Mesh("meshes/bay.msh", make_factory())
+    mesh.initial_oil_distribution(np.array([0.35, 0.45]))
+    return mesh
+
+
+@pytest.mark.parametrize("factor", [4, 16, 64])
+def test_aggregates_are_connected(mesh, factor):
+    geometry = mesh.geometry
+    labels = aggregate(geometry, factor)
+    active = geometry.active
+    assert np.array_equal(np.unique(labels), np.arange(labels.max() + 1))
+    assert len(np.unique(labels[active])) < np.count_nonzero(active) / (factor / 4)
+    assert np.all(np.bincount(labels)[labels[~active]] == 1), "Cells without oil flow should stay alone"
+    first, second = geometry.face_cells.T
+    inside = active[first] & active[second] & (labels[first] == labels[second])
+    graph = sparse.coo_matrix(
+        (np.ones(np.count_nonzero(inside)), (first[inside], second[inside])), shape=(len(labels),) * 2
+    )
+    num_components, _ = connected_components(graph, directed=False)
+    assert num_components == labels.max() + 1, "Every aggregate should be connected"
+
+
+def test_conserves_mass(mesh):
+    geometry = mesh.geometry
+    coarse = CoarseMesh(geometry, 16)
+    oil = mesh.oil_amounts()
+    weights = np.where(geometry.active, geometry.areas, 1.0)
+    coarse_oil = coarse.restrict(oil)
+    assert np.dot(weights, coarse.prolong(coarse_oil)) == pytest.approx(np.dot(weights, oil), rel=1e-12)
+    fine_change = transport_operator(geometry) @ coarse.prolong(coarse_oil)
+    coarse_change = coarse.prolong(coarse.operator @ coarse_oil)
+    assert np.dot(weights, coarse_change) == pytest.approx(np.dot(weights, fine_change), rel=1e-10), (
+        "The coarse operator should change the mass as the fine operator does"
+    )
+
+
+def test_constant_is_kept(mesh):
+    coarse = CoarseMesh(mesh.geometry, 16)
+    assert np.allclose(coarse.restrict(np.ones(len(mesh.cells))), 1.0)
+    assert np.array_equal(coarse.prolong(np.arange(coarse.num_cells)), coarse.aggregates)
+
+
+def test_larger_stable_step(mesh):
+    fine_steps = int(np.ceil(cfl_numbers(mesh.geometry, 1.0).max()))
+    coarse = CoarseMesh(mesh.geometry, 16)
+    assert coarse.steps(1.0) < fine_steps / 3
+    assert coarse.stable_dt() * -coarse.operator.diagonal().min() == pytest.approx(1.0)
+
+
+def test_preview_estimate(tmp_path, monkeypatch, make_factory):
+    path = os.path.abspath("meshes/bay.msh")
+    monkeypatch.chdir(tmp_path)
+    arguments = (path, 0, 0.5, 250, None, np.array([0.35, 0.45]), None, np.array([0.0, 0.45]), np.array([0.0, 0.2]))
+    full, _ = solve.find_and_plot(*arguments, mesh=msh.Mesh(path, make_factory()), headless=True)
+    preview = solve.find_preview(*arguments, mesh=msh.Mesh(path, make_factory()), headless=True)
+    assert len(preview) < len(full) / 3
+    assert list(preview)[-1] == pytest.approx(0.5)
+    assert list(preview.values())[-1] == pytest.approx(list(full.values())[-1], rel=0.5)
+
+
+def test_preview_steps_at_most_intervals(tmp_path, monkeypatch, factory):
+    path = os.path.abspath("meshes/bay.msh")
+    monkeypatch.chdir(tmp_path)
+    arguments = (path, 0, 0.05, 5, None, np.array([0.35, 0.45]), None, np.array([0.0, 0.45]), np.array([0.0, 0.2]))
+    preview = solve.find_preview(*arguments, mesh=msh.Mesh(path, factory), headless=True, factor=4)
+    assert list(preview) == pytest.approx([0.01, 0.02, 0.03, 0.04, 0.05])
+    restart_file = os.path.join("results", "default_experiment_results", "input", "restartFile.txt")
+    assert not os.path.exists(restart_file), "A preview should not write a restart file"
+
+
+def test_preview_from_restart_file(tmp_path, monkeypatch, make_factory):
+    path = os.path.abspath("meshes/bay.msh")
+    monkeypatch.chdir(tmp_path)
+    arguments = (None, np.array([0.35, 0.45]), None, np.array([0.0, 0.45]), np.array([0.0, 0.2]))
+    full, _ = solve.find_and_plot(path, 0, 0.5, 250, *arguments, mesh=msh.Mesh(path, make_factory()), headless=True)
+    solve.find_and_plot(path, 0, 0.25, 125, *arguments, mesh=msh.Mesh(path, make_factory()), headless=True)
+    restart_file = os.path.join("results", "default_experiment_results", "input", "restartFile.txt")
+    preview = solve.find_preview(
+        path, 0, 0.5, 250, *arguments, mesh=msh.Mesh(path, make_factory()), headless=True, restartFile=restart_file
+    )
+    assert min(preview) > 0.25, "The preview should start at the time of the restart file"
+    assert list(preview.values())[-1] == pytest.approx(list(full.values())[-1], rel=0.3), (
+        "The preview should start from the oil distribution of the restart file"
+    )
+
+
+def test_invalid_factor(mesh):
+    with pytest.raises(ValueError):
+        aggregate(mesh.geometry, 0.5)
@@ -0,0 +1,98 @@
+from config import validateConfig
+import os
+import pytest
+
+MESH = os.path.abspath("meshes/simple.msh")
+
+
+@pytest.fixture
+def config():
+    return {
+        "settings": {"nSteps": 10, "t_start": 0.0, "t_end": 0.1},
+        "geometry": {"filepath": MESH, "fish_area": [[0.0, 0.45], [0.0, 0.2]], "initial_oil_area": [0.35, 0.45]},
+        "IO": {"logName": "logfile", "writeFrequency": 5},
+    }
+
+
+@pytest.mark.parametrize("rates", [{"rate": -1.0}, {"rates": [[0.0, 1.0], [0.05, -0.5]]}])
+def test_negative_source_rate(config, rates):
+    config["sources"] = [{"location": [0.5, 0.5], "radius": 0.1, "rate": 1.0}]
+    assert validateConfig(config) is config
+    config["sources"] = [{"location": [0.5, 0.5], "radius": 0.1, **rates}]
+    with pytest.raises(ValueError, match="negative"):
+        validateConfig(config)
+
+
+def test_nesting(config):
+    config["nesting"] = {"levels": 1}
+    assert validateConfig(config) is config
+
+
+@pytest.mark.parametrize(
+    "section, key, value",
+    [
+        ("settings", "engine", "implicit"),
+        ("settings", "precision", "float32"),
+        ("settings", "outputTimes", [0.05]),
+        ("settings", "exposureThreshold", 0.1),
+        ("IO", "xdmf", True),
+        ("IO", "checkpointSteps", 5),
+        ("IO", "checkpointSeconds", 60),
+        ("IO", "metricsFile", "metrics.prom"),
+    ],
+)
+def test_nesting_rejects_ignored_options(config, section, key, value):
+    config["nesting"] = {"levels": 1}
+    config[section][key] = value
+    with pytest.raises(ValueError, match="nesting"):
+        validateConfig(config)
+
+
+@pytest.mark.parametrize(
+    "section, key, value",
+    [
+        ("settings", "engine", "multirate"),
+        ("settings", "precision", "float32"),
+        ("settings", "outputTimes", [0.05]),
+        ("settings", "exposureThreshold", 0.1),
+        ("IO", "xdmf", True),
+        ("IO", "checkpointSteps", 5),
+        ("IO", "metricsFile", "metrics.prom"),
+        ("sources", None, [{"location": [0.5, 0.5], "radius": 0.1, "rate": 1.0}]),
+        ("weathering", "evaporation", 0.5),
+    ],
+)
+def test_out_of_core_rejects_ignored_options(config, section, key, value):
+    config["settings"]["outOfCore"] = True
+    if key is None:
+        config[section] = value
+    else:
+        config.setdefault(section, {})[key] = value
+    with pytest.raises(ValueError, match="outOfCore"):
+        validateConfig(config, headless=True)
+
+
+def test_out_of_core_frames(config, tmp_path):
+    config["settings"]["outOfCore"] = True
+    assert validateConfig(config, headless=True) is config
+    with pytest.raises(ValueError, match="writeFrequency"):
+        validateConfig(config)
+    del config["IO"]["writeFrequency"]
+    assert validateConfig(config) is config
+    with pytest.raises(ValueError, match="--resume"):
+        validateConfig(config, resume=True)
+    config["IO"]["restartFile"] = str(tmp_path / "restart.txt")
+    (tmp_path / "restart.txt").write_text("0.05\n")
+    with pytest.raises(ValueError, match="restartFile"):
+        validateConfig(config)
+
+
+def test_nesting_rejects_restart_and_resume(config, tmp_path):
+    config["nesting"] = {"levels": 1}
+    with pytest.raises(ValueError, match="--resume"):
+        validateConfig(config, resume=True)
+    config["IO"]["restartFile"] = str(tmp_path / "restart.txt")
+    validateConfig(config)
+    (tmp_path / "restart.txt").write_text("0.05\n")
+    with pytest.raises(ValueError, match="restartFile"):
+        validateConfig(config)
@@ -0,0 +1,76 @@
+import src.Simulation.mesh as msh
+import src.Simulation.diagnostics as dgn
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def mesh(factory):
+    mesh = msh.Mesh("meshes/simple.msh", factory)
+    mesh.precompute()
+    return mesh
+
+
+@pytest.fixture
+def diagnostics():
+    return dgn.Diagnostics(np.array([0.5, 0.25, 0.0]), np.array([0.1, 0.3, 0.0]), 5, abort=True, tolerance=1e-3)
+
+
+def test_record_and_summary(diagnostics):
+    diagnostics.start(np.array([1.0, 2.0, 5.0]))
+    diagnostics.record(1, 0.1, np.array([1.0, 1.0, 5.0]))
+    summary = diagnostics.summary()
+    assert summary["initial_mass"] == 1.0 and summary["final_mass"] == 0.75, "Mass is not area weighted"
+    assert summary["mass_change"] == -0.25
+    assert summary["min_oil"] == 1.0 and summary["max_oil"] == 1.0, "Cells without an area should be ignored"
+    assert summary["max_cfl"] == 0.3
+
+
+@pytest.mark.parametrize("oil",
+                         [np.array([np.nan, 1.0, 0.0]),
+                          np.array([np.inf, 1.0, 0.0]),
+                          np.array([-0.01, 1.0, 0.0])])
+def test_abort_on_instability(diagnostics, oil):
+    with pytest.raises(dgn.InstabilityError):
+        diagnostics.record(1, 0.1, oil)
+
+
+def test_small_negative_values_accepted(diagnostics):
+    diagnostics.record(1, 0.1, np.array([-1e-4, 1.0, 0.0]))
+    assert diagnostics.summary()["steps"] == 1
+
+
+def test_write(diagnostics, tmp_path):
+    diagnostics.start(np.array([1.0, 1.0, 1.0]))
+    diagnostics.record(1, 0.1, np.array([1.0, 1.0, 1.0]))
+    diagnostics.record(2, 0.2, np.array([0.5, 1.0, 1.0]))
+    diagnostics.write(tmp_path / "diagnostics.csv")
+    data = np.loadtxt(tmp_path / "diagnostics.csv", delimiter=",", skiprows=1)
+    assert data.shape == (2, 6)
+    assert np.allclose(data[:, 2], [0.75, 0.5])
+
+
+def test_extremes_of_active_cells(mesh):
+    geometry = mesh.geometry
+    diagnostics = dgn.Diagnostics(geometry.areas, dgn.cfl_numbers(geometry, 0.01), 1, active=geometry.active)
+    oil = np.linspace(0.5, 1.0, geometry.num_cells)
+    oil[~geometry.active] = 0.0
+    diagnostics.record(1, 0.01, oil)
+    summary = diagnostics.summary()
+    assert summary["min_oil"] == oil[geometry.active].min(), "The lines should not hide the smallest oil amount"
+    assert summary["max_oil"] == 1.0
+
+
+def test_cfl_scales_with_dt(mesh):
+    cfl = dgn.cfl_numbers(mesh.geometry, 0.01)
+    assert np.all(cfl >= 0)
+    assert np.all(cfl[:69] == 0), "Lines should not have a CFL number"
+    assert np.allclose(dgn.cfl_numbers(mesh.geometry, 0.02), 2 * cfl)
+
+
+def test_cfl_matches_cells(mesh):
+    cfl = dgn.cfl_numbers(mesh.geometry, 0.01)
+    cell = mesh.cells[300]
+    outflow = sum(max(np.dot(normal, 0.5 * (cell.velocity + ngh.velocity)), 0)
+                  for normal, ngh in zip(cell.scaled_normal, cell.neighbors))
+    assert np.isclose(cfl[300], 0.01 / cell.area * outflow)
@@ -0,0 +1,131 @@
+import src.Simulation.mesh as msh
+import src.Simulation.engines as eng
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def make_mesh(make_factory):
+    def make_mesh(path):
+        mesh = msh.Mesh(path, make_factory())
+        mesh.initial_oil_distribution(np.array([0.35, 0.45]))
+        return mesh
+
+    return make_mesh
+
+
+@pytest.mark.parametrize("path", ["meshes/simple.msh", "meshes/bay.msh"])
+def test_vectorized_matches_reference(path, make_mesh):
+    reference_mesh = make_mesh(path)
+    vectorized_mesh = make_mesh(path)
+    reference = reference_mesh.oil_amounts()
+    vectorized = vectorized_mesh.oil_amounts()
+    reference_engine = eng.make_engine("reference", reference_mesh, 0.01)
+    vectorized_engine = eng.make_engine("vectorized", vectorized_mesh, 0.01)
+    for _ in range(3):
+        reference_engine.step(reference)
+        vectorized_engine.step(vectorized)
+    assert np.allclose(reference, vectorized, rtol=1e-12, atol=1e-14), "The vectorized engine differs from the reference"
+
+
+def test_inactive_cells_unchanged(make_mesh):
+    mesh = make_mesh("meshes/simple.msh")
+    oil = mesh.oil_amounts()
+    before = oil.copy()
+    eng.make_engine("vectorized", mesh, 0.01).step(oil)
+    assert np.array_equal(oil[:69], before[:69]), "Lines should keep their oil amount"
+    assert not np.array_equal(oil[69:], before[69:])
+
+
+def test_unknown_engine(make_mesh):
+    with pytest.raises(Exception):
+        eng.make_engine("unknown", make_mesh("meshes/simple.msh"), 0.01)
+
+
+@pytest.mark.parametrize("path, dt, steps", [("meshes/simple.msh", 0.02, 500), ("meshes/bay.msh", 0.002, 1000)])
+def test_float32_within_bound(path, dt, steps, make_mesh):
+    mesh = make_mesh(path)
+    areas = mesh.geometry.areas
+    double = mesh.oil_amounts()
+    single = double.astype(np.float32)
+    double_engine = eng.make_engine("vectorized", mesh, dt)
+    single_engine = eng.make_engine("vectorized", mesh, dt, np.float32)
+    for _ in range(steps):
+        double_engine.step(double)
+        single_engine.step(single)
+    assert single.dtype == np.float32, "The float32 engine should keep the oil amounts in float32"
+    assert np.max(np.abs(single - double)) <= 1e-6 * np.max(np.abs(double)), "float32 oil amounts exceed the error bound"
+    mass = np.dot(areas, double)
+    assert abs(np.dot(areas, single.astype(np.float64)) - mass) <= 1e-6 * mass, "float32 mass exceeds the error bound"
+
+
+def test_reference_engine_rejects_float32(make_mesh):
+    with pytest.raises(Exception):
+        eng.make_engine("reference", make_mesh("meshes/simple.msh"), 0.01, np.float32)
+
+
+def test_transport_operator_conserves_mass(make_mesh):
+    mesh = make_mesh("meshes/simple.msh")
+    geometry = mesh.geometry
+    operator = eng.transport_operator(geometry)
+    first, second = geometry.face_cells.T
+    boundary = np.concatenate((first[~geometry.active[second]], second[~geometry.active[first]]))
+    interior = geometry.active.astype(np.float64)
+    interior[boundary] = 0
+    change = geometry.areas * (operator @ interior)
+    assert abs(change.sum()) < 1e-12, "Oil should only leave through the boundary"
+
+
+@pytest.mark.parametrize("engine_name", ["vectorized", "implicit"])
+@pytest.mark.parametrize("path", ["meshes/simple.msh", "meshes/bay.msh"])
+def test_adjoint_matches_forward(path, engine_name, make_mesh):
+    mesh = make_mesh(path)
+    fish = np.array([cell.index for cell in mesh.cells_within_area([0.0, 0.45], [0.0, 0.2])])
+    engine = eng.make_engine(engine_name, mesh, 0.002)
+    sensitivity = np.zeros(len(mesh.cells))
+    sensitivity[fish] = 1
+    for _ in range(200):
+        engine.adjoint_step(sensitivity)
+
+    generator = np.random.default_rng(0)
+    for _ in range(3):
+        oil = generator.random(len(mesh.cells))
+        start = oil.copy()
+        for _ in range(200):
+            engine.step(oil)
+        assert np.isclose(oil[fish].sum(), sensitivity @ start, rtol=1e-10), "Adjoint and forward runs disagree"
+
+
+def test_implicit_solves_backward_euler(make_mesh):
+    mesh = make_mesh("meshes/bay.msh")
+    operator = eng.transport_operator(mesh.geometry)
+    oil = mesh.oil_amounts()
+    before = oil.copy()
+    eng.make_engine("implicit", mesh, 0.1).step(oil)
+    assert np.allclose(oil - 0.1 * (operator @ oil), before, atol=1e-12), "The step should solve (I - dt L) x = oil"
+
+
+def test_implicit_stable_beyond_cfl_limit(make_mesh):
+    # The time step of examples/large_timestep.toml, a CFL number of about 20 on bay.msh
+    mesh = make_mesh("meshes/bay.msh")
+    areas = mesh.geometry.areas
+    oil = mesh.oil_amounts()
+    engine = eng.make_engine("implicit", mesh, 0.1)
+    mass = np.dot(areas, oil)
+    for _ in range(10):
+        engine.step(oil)
+        assert np.all(np.isfinite(oil)) and oil.min() > -1e-12, "The implicit scheme should stay stable"
+        assert np.dot(areas, oil) <= mass + 1e-12, "Mass should not grow"
+        mass = np.dot(areas, oil)
+
+
+def test_implicit_converges_to_explicit(make_mesh):
+    mesh = make_mesh("meshes/bay.msh")
+    explicit = mesh.oil_amounts()
+    implicit = explicit.copy()
+    explicit_engine = eng.make_engine("vectorized", mesh, 1e-4)
+    implicit_engine = eng.make_engine("implicit", mesh, 1e-4)
+    for _ in range(50):
+        explicit_engine.step(explicit)
+        implicit_engine.step(implicit)
+    assert np.max(np.abs(explicit - implicit)) < 1e-3 * np.max(explicit), "Both schemes should agree for small steps"
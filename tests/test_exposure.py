@@ -0,0 +1,110 @@
+import src.Simulation.mesh as msh
+import src.Simulation.solver as solve
+from src.Simulation.engines import make_engine
+from src.Simulation.exposure import ExposureMap
+import numpy as np
+import os
+import pytest
+import tracemalloc
+
+
+def test_reductions():
+    history = np.array(
+        [
+            [0.0, 0.5, 0.2],
+            [0.1, 0.3, 0.2],
+            [0.4, 0.1, 0.2],
+            [0.2, 0.0, 0.2],
+        ]
+    )
+    exposure = ExposureMap(3, threshold=0.25)
+    exposure.start(history[0], 0.0)
+    for step, oil in enumerate(history[1:], start=1):
+        exposure.update(oil, 0.5 * step, 0.5)
+    assert np.array_equal(exposure.arrival, [1.0, 0.0, np.inf])
+    assert np.array_equal(exposure.peak, [0.4, 0.5, 0.2])
+    assert np.allclose(exposure.dose, 0.5 * history[1:].sum(axis=0))
+
+
+def test_arrival_is_first_crossing():
+    exposure = ExposureMap(1, threshold=0.1)
+    exposure.start(np.array([0.0]), 0.0)
+    for step, value in enumerate([0.2, 0.0, 0.3], start=1):
+        exposure.update(np.array([value]), float(step), 1.0)
+    assert exposure.arrival[0] == 1.0, "Later crossings should not change the arrival time"
+
+
+def test_matches_stored_frames(factory):
+    mesh = msh.Mesh("meshes/bay.msh", factory)
+    mesh.initial_oil_distribution(np.array([0.35, 0.45]))
+    oil = mesh.oil_amounts()
+    dt = 0.002
+    engine = make_engine("vectorized", mesh, dt)
+    exposure = ExposureMap(len(oil), threshold=0.05)
+    exposure.start(oil, 0.0)
+    frames = [oil.copy()]
+    for step in range(1, 101):
+        engine.step(oil)
+        exposure.update(oil, step * dt, dt)
+        frames.append(oil.copy())
+    frames = np.array(frames)
+    times = dt * np.arange(len(frames))
+    exceeded = frames > 0.05
+    arrival = np.where(exceeded.any(axis=0), times[np.argmax(exceeded, axis=0)], np.inf)
+    assert np.array_equal(exposure.arrival, arrival)
+    assert np.array_equal(exposure.peak, frames.max(axis=0))
+    assert np.allclose(exposure.dose, dt * frames[1:].sum(axis=0))
+
+
+def test_update_does_not_allocate():
+    exposure = ExposureMap(100_000, threshold=0.5)
+    oil = np.random.default_rng(0).random(100_000)
+    exposure.start(oil, 0.0)
+    tracemalloc.start()
+    for step in range(10):
+        exposure.update(oil, 0.1 * step, 0.1)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < 4096, "Updating the exposure should not allocate arrays"
+
+
+def test_solver_writes_exposure(tmp_path, monkeypatch, make_factory):
+    path = os.path.abspath("meshes/bay.msh")
+    monkeypatch.chdir(tmp_path)
+    mesh = msh.Mesh(path, make_factory(), "rcm")
+    solve.find_and_plot(
+        path,
+        0,
+        0.2,
+        100,
+        None,
+        np.array([0.35, 0.45]),
+        None,
+        np.array([0.0, 0.45]),
+        np.array([0.0, 0.2]),
+        mesh=mesh,
+        headless=True,
+        exposure_threshold=0.05,
+    )
+    with np.load(os.path.join("results", "default_experiment_results", "default_experiment_exposure.npz")) as data:
+        peak, arrival, threshold = data["peak"], data["arrival"], float(data["threshold"])
+    initial = msh.Mesh(path, make_factory())
+    initial.initial_oil_distribution(np.array([0.35, 0.45]))
+    assert np.all(peak >= initial.oil_amounts() - 1e-12), "The peak should be in the order of the mesh file"
+    assert np.all(arrival[initial.oil_amounts() > 0.05] == 0.0)
+    assert np.isinf(arrival).any() and np.isfinite(arrival).any()
+    assert threshold == 0.05
+
+
+def test_render_maps(tmp_path, factory):
+    pytest.importorskip("cv2")
+    from src.Simulation.raster import RasterRenderer
+
+    mesh = msh.Mesh("meshes/bay.msh", factory)
+    mesh.initial_oil_distribution(np.array([0.35, 0.45]))
+    exposure = ExposureMap(len(mesh.cells), threshold=0.05)
+    exposure.start(mesh.oil_amounts(), 0.0)
+    renderer = RasterRenderer(mesh, set(), width=200, height=150)
+    filenames = exposure.render(renderer, 0.0, 1.0, str(tmp_path), "bay")
+    assert [os.path.basename(filename) for filename in filenames] == ["bay_arrival.png", "bay_peak.png", "bay_dose.png"]
+    assert all(os.path.getsize(filename) > 0 for filename in filenames)
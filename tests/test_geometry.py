@@ -0,0 +1,68 @@
+import src.Simulation.mesh as msh
+import src.Simulation.geometry as geo
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def mesh_class(factory):
+    return msh.Mesh("meshes/simple.msh", factory)
+
+
+@pytest.fixture
+def square():
+    # Two triangles forming the unit square, with a line along the bottom edge
+    points = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]])
+    blocks = [(0, np.array([[0, 1]])), (1, np.array([[0, 1, 2], [0, 2, 3]]))]
+    return geo.build_geometry(points, blocks, [False, True])
+
+
+@pytest.mark.parametrize("cell_index", [300, 487])
+def test_matches_calculate(mesh_class, cell_index):
+    geometry = mesh_class.geometry
+    cell = mesh_class.cells[cell_index]
+    mesh_class.calculate(cell)
+    assert np.allclose(geometry.midpoints[cell_index], cell.midpoint), "The midpoint is incorrect"
+    assert np.isclose(geometry.areas[cell_index], cell.area), "The area is incorrect"
+    assert np.allclose(geometry.velocities[cell_index], cell.velocity), "The velocity is incorrect"
+
+
+def test_precompute_matches_calculate(mesh_class):
+    mesh_class.precompute()
+    for cell in mesh_class.cells[69:]:
+        neighbors = [ngh.index for ngh in cell.neighbors]
+        expected = [ngh.index for ngh in mesh_class._find_neighbors(cell)]
+        assert neighbors == expected, "The neighbors are incorrect"
+        assert np.allclose(cell.scaled_normal, mesh_class._unit_and_scaled_normal_vector(cell)), "The scaled normals are incorrect"
+
+
+def test_inactive_cells_keep_defaults(mesh_class):
+    geometry = mesh_class.geometry
+    assert not geometry.active[:69].any() and geometry.active[69:].all()
+    assert np.all(geometry.areas[:69] == 0) and np.all(geometry.velocities[:69] == 0)
+
+
+def test_faces(square):
+    faces = {tuple(face) for face in square.face_cells.tolist()}
+    assert faces == {(1, 0), (1, 2)}, "Faces should be the shared diagonal and the line"
+    assert np.allclose(square.areas, [0.0, 0.5, 0.5])
+
+
+def test_face_normals_point_outwards(square):
+    first = square.face_cells[:, 0]
+    outward = np.einsum("fi,fi->f", square.face_midpoints - square.midpoints[first], square.face_normals)
+    assert np.all(outward > 0), "Face normals should point out of their first cell"
+
+
+def test_boundary_edges(square):
+    assert sorted(square.boundary_cells.tolist()) == [1, 2, 2], "Boundary edges without a line are missing"
+    assert np.allclose(np.linalg.norm(square.boundary_normals, axis=1), 1.0), "Scaled normals should have the edge length"
+
+
+def test_closed_cell_normals_sum_to_zero(mesh_class):
+    geometry = mesh_class.geometry
+    total = np.zeros((geometry.num_cells, 2))
+    np.add.at(total, geometry.face_cells[:, 0], geometry.face_normals)
+    np.add.at(total, geometry.face_cells[:, 1], -geometry.face_normals)
+    np.add.at(total, geometry.boundary_cells, geometry.boundary_normals)
+    assert np.allclose(total[geometry.active], 0.0), "The edges of a cell should close"
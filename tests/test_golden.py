@@ -0,0 +1,178 @@
+"""
+Regression tests of every engine against golden outputs of the reference solver.
+
+Every case runs a few steps of `find_and_plot` and compares the oil in the fish area after every step and
+the final oil distribution, with the cell indices of the mesh file, to the files in `tests/golden`. The
+explicit engines are compared to the output of the `reference` engine; the implicit engine solves a
+different scheme and is compared to its own stored output.
+
+After an intended change of the results, the golden files are written again with:
+
+    python -m tests.test_golden
+"""
+
+import src.Simulation.mesh as msh
+import src.Simulation.solver as solve
+from src.Simulation.diagnostics import cfl_numbers
+import glob
+import numpy as np
+import os
+import pytest
+import toml
+
+GOLDEN_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FISH_AREA = [[0.0, 0.45], [0.0, 0.2]]
+
+# The number of steps of every example is reduced to at most this, keeping its time step
+EXAMPLE_STEPS = 10
+
+
+def cases() -> dict[str, dict]:
+    """
+    Returns the regression cases by name: both meshes, and every config in `examples` with fewer steps.
+    """
+    found = {
+        "simple": dict(mesh="meshes/simple.msh", start_point=[0.35, 0.45], fish_area=FISH_AREA, dt=0.01, steps=50),
+        "bay": dict(mesh="meshes/bay.msh", start_point=[0.35, 0.45], fish_area=FISH_AREA, dt=0.002, steps=10),
+    }
+    for filename in sorted(glob.glob(os.path.join(ROOT, "examples", "*.toml"))):
+        config = toml.load(filename)
+        settings = config["settings"]
+        start_time = settings.get("t_start") or 0
+        found[os.path.splitext(os.path.basename(filename))[0]] = dict(
+            mesh=config["geometry"]["filepath"],
+            start_point=config["geometry"]["initial_oil_area"],
+            fish_area=config["geometry"]["fish_area"],
+            dt=round((settings["t_end"] - start_time) / settings["nSteps"], 6),
+            steps=min(settings["nSteps"], EXAMPLE_STEPS),
+        )
+    return found
+
+
+CASES = cases()
+
+# Engine, precision and cell ordering of every checked variant, and the largest difference accepted,
+# relative to the largest golden value
+VARIANTS = {
+    "reference": ("reference", "float64", None, 1e-12),
+    "vectorized": ("vectorized", "float64", None, 1e-10),
+    "vectorized-rcm": ("vectorized", "float64", "rcm", 1e-10),
+    "vectorized-hilbert": ("vectorized", "float64", "hilbert", 1e-10),
+    "vectorized-float32": ("vectorized", "float32", None, 1e-5),
+    "out-of-core": ("out-of-core", "float64", "rcm", 1e-10),
+    "implicit": ("implicit", "float64", None, 1e-10),
+    "multirate": ("multirate", "float64", None, 1e-10),
+}
+
+
+def run(case: dict, engine: str, precision: str = "float64", reorder: str = None):
+    """
+    Runs a case headless in the current folder.
+
+    Returns:
+        tuple: The oil in the fish area after every step, and the final oil distribution with the cell
+        indices of the mesh file.
+    """
+    mesh_path = os.path.join(ROOT, case["mesh"])
+    x_area, y_area = np.array(case["fish_area"], dtype=np.float64)
+    end_time = case["dt"] * case["steps"]
+    if engine == "out-of-core":
+        oil_area_time = solve.find_out_of_core(
+            mesh_path, 0, end_time, case["steps"], case["start_point"], x_area, y_area, reorder=reorder
+        )
+        folder = os.path.join("results", "stores", os.path.splitext(os.path.basename(mesh_path))[0])
+        oil = np.load(os.path.join("results", "default_experiment_results", "state", "oil.npy"))
+        final_oil = np.empty_like(oil)
+        final_oil[np.load(os.path.join(folder, "permutation.npy"))] = oil
+        return np.array(list(oil_area_time.values())), final_oil
+
+    mesh = msh.Mesh(mesh_path, msh.default_factory(), reorder)
+    oil_area_time, _ = solve.find_and_plot(
+        mesh_path,
+        0,
+        end_time,
+        case["steps"],
+        None,
+        np.array(case["start_point"]),
+        None,
+        x_area,
+        y_area,
+        mesh=mesh,
+        headless=True,
+        engine=engine,
+        reorder=reorder,
+        precision=precision,
+    )
+    return np.array(list(oil_area_time.values())), mesh.to_original(mesh.oil_amounts())
+
+
+def max_cfl(case: dict) -> float:
+    mesh = msh.Mesh(os.path.join(ROOT, case["mesh"]), msh.default_factory())
+    return float(cfl_numbers(mesh.geometry, case["dt"]).max())
+
+
+def golden(name: str) -> dict:
+    filename = os.path.join(GOLDEN_FOLDER, f"{name}.npz")
+    if not os.path.exists(filename):
+        pytest.fail(f"No golden output for {name}, write it with python -m tests.test_golden")
+    with np.load(filename) as data:
+        return {key: data[key] for key in data.files}
+
+
+@pytest.mark.parametrize("variant", list(VARIANTS))
+@pytest.mark.parametrize("name", list(CASES))
+def test_matches_golden(name, variant, tmp_path, monkeypatch):
+    case = CASES[name]
+    expected = golden(name)
+    assert expected["dt"] == case["dt"] and expected["steps"] == case["steps"], (
+        f"The golden output of {name} is stale, write it again with python -m tests.test_golden"
+    )
+    engine, precision, reorder, tolerance = VARIANTS[variant]
+    if precision == "float32" and expected["max_cfl"] > 1:
+        pytest.skip("float32 round off errors are amplified above a CFL number of 1")
+    if engine == "multirate" and expected["max_cfl"] > 1:
+        pytest.skip("The multirate engine takes smaller steps than the reference above a CFL number of 1")
+
+    monkeypatch.chdir(tmp_path)
+    oil_in_area, final_oil = run(case, engine, precision, reorder)
+    prefix = "implicit_" if engine == "implicit" else ""
+    for key, actual in ((f"{prefix}oil_in_area", oil_in_area), (f"{prefix}final_oil", final_oil)):
+        reference = expected[key]
+        assert actual.shape == reference.shape, f"{variant} on {name}: {key} has the wrong shape"
+        scale = max(np.max(np.abs(reference)), 1e-300)
+        error = np.max(np.abs(actual - reference)) / scale
+        assert error <= tolerance, f"{variant} on {name}: {key} differs by {error:.3e} (tolerance {tolerance:.0e})"
+
+
+def write_golden() -> None:
+    """
+    Writes the golden output of every case, running the reference and the implicit engine.
+    """
+    import tempfile
+
+    os.makedirs(GOLDEN_FOLDER, exist_ok=True)
+    for name, case in CASES.items():
+        with tempfile.TemporaryDirectory() as folder:
+            working_folder = os.getcwd()
+            os.chdir(folder)
+            try:
+                oil_in_area, final_oil = run(case, "reference")
+                implicit_oil_in_area, implicit_final_oil = run(case, "implicit")
+            finally:
+                os.chdir(working_folder)
+        np.savez_compressed(
+            os.path.join(GOLDEN_FOLDER, f"{name}.npz"),
+            dt=case["dt"],
+            steps=case["steps"],
+            max_cfl=max_cfl(case),
+            oil_in_area=oil_in_area,
+            final_oil=final_oil,
+            implicit_oil_in_area=implicit_oil_in_area,
+            implicit_final_oil=implicit_final_oil,
+        )
+        print(f"Wrote the golden output of {name}")
+
+
+if __name__ == "__main__":
+    write_golden()
@@ -133,8 +133,8 @@ def test_neighbors(mesh_class, ngh, cell_index):
 
 # Tests for callable functions in mesh
 @pytest.mark.parametrize("intial_oil, cell_index",
-                         [(0.006737946999085461, 300),
-                          (0.006737946999085461, 487)
+                         [(1.884823440197986e-06, 300),
+                          (1.005716422172533e-09, 487)
                           ])
 def test_intial_oil(mesh_class, intial_oil,cell_index):
     mesh_class.initial_oil_distribution(np.array([0.1, 0.2]))
@@ -150,4 +150,41 @@ def test_calculate_change(mesh_class, oil_change, cell_index):
     mesh_class.initial_oil_distribution(np.array([0, 0]))
     current_cell = mesh_class.cells[cell_index]
     mesh_class.calculate_change(current_cell, 0.1)
-    assert np.all(np.less(oil_change - current_cell.oil_change, 0.00001))
\ No newline at end of file
+    assert np.all(np.less(oil_change - current_cell.oil_change, 0.00001))
+
+# Tests for lazy geometry
+def test_geometry_not_computed_on_load(mesh_class):
+    assert mesh_class._edges is None, "The mesh computed geometry before it was accessed"
+    assert all(cell._area is None for cell in mesh_class.cells), "The mesh computed areas before they were accessed"
+
+
+@pytest.mark.parametrize("cell_index", [300, 487])
+def test_lazy_matches_calculate(mesh_class, cell_index):
+    lazy_mesh = mesh_class
+    eager_factory = msh.CellFactory()
+    eager_factory.register(2, cls.Line)
+    eager_factory.register(3, cls.Triangle)
+    eager_mesh = msh.Mesh("meshes/simple.msh", eager_factory)
+    lazy_cell = lazy_mesh.cells[cell_index]
+    eager_cell = eager_mesh.cells[cell_index]
+    eager_mesh.calculate(eager_cell)
+    assert np.allclose(lazy_cell.midpoint, eager_cell.midpoint)
+    assert np.isclose(lazy_cell.area, eager_cell.area)
+    assert np.allclose(lazy_cell.velocity, eager_cell.velocity)
+    assert np.allclose(lazy_cell.scaled_normal, eager_cell.scaled_normal)
+    assert [ngh.index for ngh in lazy_cell.neighbors] == [ngh.index for ngh in eager_cell.neighbors]
+
+
+def test_lazy_attribute_is_memoized(mesh_class):
+    cell = mesh_class.cells[300]
+    assert cell.midpoint is cell.midpoint, "The midpoint is recomputed on every access"
+
+
+def test_lines_keep_default_geometry(mesh_class):
+    line = mesh_class.cells[0]
+    assert np.all(line.velocity == 0), "Lines should not be given a velocity"
+
+
+def test_precompute(mesh_class):
+    mesh_class.precompute()
+    assert all(cell._scaled_normal is not None for cell in mesh_class.cells[69:]), "Precompute did not compute every triangle"
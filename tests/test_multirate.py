@@ -0,0 +1,92 @@
+import src.Simulation.mesh as msh
+from src.Simulation.diagnostics import cfl_numbers
+from src.Simulation.engines import MultirateEngine, make_engine, step_levels
+from src.Simulation.weathering import Weathering
+import numpy as np
+import pytest
+
+START_POINT = np.array([0.35, 0.45])
+FISH_AREA = (np.array([0.0, 0.45]), np.array([0.0, 0.2]))
+
+
+@pytest.fixture(scope="module")
+def mesh(make_factory):
+    mesh = msh.Mesh("meshes/bay.msh", make_factory())
+    mesh.initial_oil_distribution(START_POINT)
+    return mesh
+
+
+@pytest.mark.parametrize("dt", [0.002, 0.01, 0.05])
+def test_levels_are_stable(mesh, dt):
+    geometry = mesh.geometry
+    levels = step_levels(geometry, dt)
+    cfl = cfl_numbers(geometry, dt)
+    assert np.all(cfl <= 2.0**levels * (1 + 1e-12)), "Every cell should be stable at its level"
+    assert np.all(cfl[levels > 0] > 2.0 ** (levels[levels > 0] - 1)), "No cell should be on a finer level than needed"
+    assert np.all(levels[~geometry.active] == 0)
+
+
+@pytest.mark.parametrize("evaporation", [0.0, 1.0])
+def test_matches_vectorized_below_cfl_limit(mesh, evaporation):
+    dt = 0.002
+    assert cfl_numbers(mesh.geometry, dt).max() <= 1
+    weathering = Weathering(mesh.geometry, dt, evaporation=evaporation) if evaporation else None
+    expected = mesh.oil_amounts()
+    oil = expected.copy()
+    vectorized = make_engine("vectorized", mesh, dt, weathering=weathering)
+    multirate = make_engine("multirate", mesh, dt, weathering=weathering)
+    for _ in range(100):
+        vectorized.step(expected)
+        multirate.step(oil)
+    assert np.allclose(oil, expected, rtol=1e-12, atol=1e-14)
+
+
+def test_conserves_mass(mesh):
+    geometry = mesh.geometry
+    engine = MultirateEngine(mesh, 0.05)
+    assert engine.levels.max() >= 3
+
+    # A unit of oil in the cell furthest from the coastline does not reach it in one step
+    coast = Weathering(geometry, 0.05).coastal_cells
+    cells = np.flatnonzero(geometry.active)
+    distances = np.linalg.norm(geometry.midpoints[cells, None] - geometry.midpoints[None, coast], axis=2).min(axis=1)
+    oil = np.zeros(geometry.num_cells)
+    oil[cells[np.argmax(distances)]] = 1.0
+    mass = np.dot(geometry.areas, oil)
+    engine.step(oil)
+    assert np.count_nonzero(oil) > 1
+    assert np.dot(geometry.areas, oil) == pytest.approx(mass, rel=1e-12)
+
+
+def test_large_time_step(mesh):
+    fish_cells = np.array([cell.index for cell in mesh.cells_within_area(*FISH_AREA)])
+    reference = mesh.oil_amounts()
+    engine = make_engine("vectorized", mesh, 0.002)
+    for _ in range(250):
+        engine.step(reference)
+    oil = mesh.oil_amounts()
+    engine = make_engine("multirate", mesh, 0.05)
+    for _ in range(10):
+        engine.step(oil)
+    assert np.all(oil >= 0), "The oil amounts should stay non-negative"
+    assert oil[fish_cells].sum() == pytest.approx(reference[fish_cells].sum(), rel=0.05)
+
+
+def test_fewer_updates(mesh):
+    dt = 0.01
+    engine = MultirateEngine(mesh, dt)
+    global_updates = np.count_nonzero(mesh.geometry.active) * np.ceil(cfl_numbers(mesh.geometry, dt).max())
+    assert engine.updates * 1.5 < global_updates
+
+
+def test_adjoint_step(mesh):
+    dt = 0.05
+    engine = MultirateEngine(mesh, dt, weathering=Weathering(mesh.geometry, dt, evaporation=1.0, beaching=0.1))
+    generator = np.random.default_rng(0)
+    oil = generator.random(mesh.geometry.num_cells)
+    sensitivity = generator.random(mesh.geometry.num_cells)
+    stepped = oil.copy()
+    engine.step(stepped)
+    adjoint = sensitivity.copy()
+    engine.adjoint_step(adjoint)
+    assert np.dot(stepped, sensitivity) == pytest.approx(np.dot(oil, adjoint), rel=1e-12)
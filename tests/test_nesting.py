@@ -0,0 +1,129 @@
+import src.Simulation.mesh as msh
+import src.Simulation.solver as solve
+from src.Simulation.engines import make_engine
+from src.Simulation.nesting import NestedEngine, NestedMesh
+import numpy as np
+import os
+import pytest
+
+DT = 0.002
+FISH_AREA = (np.array([0.0, 0.45]), np.array([0.0, 0.2]))
+START_POINT = np.array([0.35, 0.45])
+
+
+@pytest.fixture(scope="module")
+def mesh(make_factory):
+    mesh = msh.Mesh("meshes/bay.msh", make_factory())
+    mesh.initial_oil_distribution(START_POINT)
+    return mesh
+
+
+def coastline_loss(geometry, oil):
+    """
+    The oil mass leaving through the coastline per unit time, for zero oil on the lines.
+    """
+    first, second = geometry.face_cells.T
+    coast = ~geometry.active[second]
+    velocity = 0.5 * (geometry.velocities[first] + geometry.velocities[second])
+    normal_velocity = np.einsum("fi,fi->f", geometry.face_normals, velocity)
+    return np.sum(np.maximum(normal_velocity[coast], 0) * oil[first[coast]])
+
+
+def test_without_refinement_matches_mesh(mesh):
+    nested = NestedMesh(mesh, *FISH_AREA, levels=0)
+    outer_oil, fine_oil = nested.initial_oil(START_POINT)
+    engine = NestedEngine(nested, DT)
+    oil = mesh.oil_amounts()
+    reference = make_engine("vectorized", mesh, DT)
+    for _ in range(100):
+        engine.step(outer_oil, fine_oil)
+        reference.step(oil)
+    assert np.allclose(nested.combine(outer_oil, fine_oil), oil, rtol=1e-12, atol=1e-15)
+
+
+@pytest.mark.parametrize("levels", [1, 2])
+def test_fine_mesh(mesh, levels):
+    nested = NestedMesh(mesh, *FISH_AREA, levels=levels)
+    fine = nested.fine
+    outer = mesh.geometry
+    triangles = nested.nested & outer.active
+    assert np.count_nonzero(fine.active) == 4**levels * np.count_nonzero(triangles)
+    assert np.allclose(np.bincount(nested.parents, fine.areas, outer.num_cells)[triangles], outer.areas[triangles])
+    interface = np.count_nonzero(nested.nested[outer.face_cells[:, 0]] != nested.nested[outer.face_cells[:, 1]])
+    assert nested.interface_edges == 2**levels * interface, "Every interface face should be split in fine edges"
+
+
+def test_coupling_conserves_mass(mesh):
+    nested = NestedMesh(mesh, *FISH_AREA, levels=2)
+    outer, fine = mesh.geometry, nested.fine
+    generator = np.random.default_rng(0)
+    outer_oil = np.where(outer.active & ~nested.nested, generator.random(outer.num_cells), 0.0)
+    fine_oil = np.where(fine.active, generator.random(fine.num_cells), 0.0)
+    outer_operator, outer_from_fine, fine_from_outer, fine_operator = nested.operators()
+    rate = np.dot(outer.areas, outer_operator @ outer_oil + outer_from_fine @ fine_oil) + np.dot(
+        fine.areas, fine_from_outer @ outer_oil + fine_operator @ fine_oil
+    )
+    outer_coast = np.where(nested.nested, 0.0, outer_oil)
+    loss = coastline_loss(outer, outer_coast) + coastline_loss(fine, fine_oil)
+    assert rate == pytest.approx(-loss, rel=1e-10), "Only the coastline should remove oil"
+
+
+@pytest.mark.parametrize("subcycles", [1, 4])
+def test_subcycled_step_conserves_mass(mesh, subcycles):
+    nested = NestedMesh(mesh, *FISH_AREA, levels=2)
+    outer, fine = mesh.geometry, nested.fine
+    generator = np.random.default_rng(1)
+    outer_oil = np.where(outer.active & ~nested.nested, generator.random(outer.num_cells), 0.0)
+    fine_oil = np.where(fine.active, generator.random(fine.num_cells), 0.0)
+    mass = np.dot(outer.areas, outer_oil) + np.dot(fine.areas, fine_oil)
+
+    # The coastline removes oil from the coarse cells over the whole step, and from the fine cells over
+    # every fine step
+    fine_dt = DT / subcycles
+    _, _, fine_from_outer, fine_operator = nested.operators()
+    loss = DT * coastline_loss(outer, outer_oil)
+    fine_replica = fine_oil.copy()
+    for _ in range(subcycles):
+        loss += fine_dt * coastline_loss(fine, fine_replica)
+        fine_replica += fine_dt * (fine_operator @ fine_replica + fine_from_outer @ outer_oil)
+
+    NestedEngine(nested, DT, subcycles).step(outer_oil, fine_oil)
+    assert np.allclose(fine_oil, fine_replica, rtol=1e-12, atol=1e-15)
+    new_mass = np.dot(outer.areas, outer_oil) + np.dot(fine.areas, fine_oil)
+    assert new_mass == pytest.approx(mass - loss, rel=1e-12), "The step should only lose oil at the coastline"
+
+
+def test_fish_oil_close_to_mesh(mesh):
+    fish_cells = np.array([cell.index for cell in mesh.cells_within_area(*FISH_AREA)])
+    nested = NestedMesh(mesh, *FISH_AREA, levels=2)
+    outer_oil, fine_oil = nested.initial_oil(START_POINT)
+    outer_weights, fine_weights = nested.cell_weights(fish_cells)
+    combined = nested.combine(outer_oil, fine_oil)
+    assert np.dot(outer_weights, outer_oil) + np.dot(fine_weights, fine_oil) == pytest.approx(
+        combined[fish_cells].sum(), rel=1e-12
+    )
+    # The average of the oil sampled at the fine midpoints differs from the oil at the coarse midpoint
+    assert combined[fish_cells].sum() == pytest.approx(mesh.oil_amounts()[fish_cells].sum(), rel=0.05)
+
+
+def test_invalid_nesting(mesh):
+    with pytest.raises(ValueError):
+        NestedMesh(mesh, np.array([5.0, 6.0]), np.array([5.0, 6.0]))
+    with pytest.raises(ValueError):
+        NestedMesh(mesh, *FISH_AREA, levels=-1)
+    with pytest.raises(ValueError):
+        NestedEngine(NestedMesh(mesh, *FISH_AREA, levels=0), DT, 0)
+
+
+def test_solver_nested(tmp_path, monkeypatch, make_factory):
+    path = os.path.abspath("meshes/bay.msh")
+    monkeypatch.chdir(tmp_path)
+    arguments = (path, 0, 0.1, 50, None, START_POINT, None, *FISH_AREA)
+    plain, _ = solve.find_and_plot(*arguments, mesh=msh.Mesh(path, make_factory()), headless=True)
+    flat = solve.find_nested(*arguments, mesh=msh.Mesh(path, make_factory()), headless=True, levels=0)
+    assert np.allclose(list(flat.values()), list(plain.values()), rtol=1e-12)
+    nested = solve.find_nested(*arguments, mesh=msh.Mesh(path, make_factory()), headless=True, levels=2)
+    assert list(nested) == list(plain)
+    assert list(nested.values())[-1] == pytest.approx(list(plain.values())[-1], rel=0.05)
+    with np.load(os.path.join("results", "default_experiment_results", "default_experiment_fine.npz")) as data:
+        assert data["triangles"].shape[1] == 3 and len(data["oil"]) == len(data["triangles"])
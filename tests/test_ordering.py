@@ -0,0 +1,70 @@
+import src.Simulation.mesh as msh
+import src.Simulation.geometry as geo
+import src.Simulation.ordering as ordering
+import src.Simulation.engines as eng
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def make_mesh(make_factory):
+    def make_mesh(reorder=None):
+        return msh.Mesh("meshes/bay.msh", make_factory(), reorder)
+
+    return make_mesh
+
+
+@pytest.fixture(scope="module")
+def original(make_mesh):
+    return make_mesh()
+
+
+def bandwidth(mesh):
+    faces = mesh.geometry.face_cells
+    return np.abs(faces[:, 0] - faces[:, 1]).mean()
+
+
+@pytest.mark.parametrize("name", ordering.ORDERINGS)
+def test_order_is_permutation(name, original):
+    triangles = original._blocks[-1][1]
+    order = ordering.cell_order(name, original.geometry.points, triangles)
+    assert np.array_equal(np.sort(order), np.arange(len(triangles))), "The ordering is not a permutation"
+
+
+@pytest.mark.parametrize("name", ordering.ORDERINGS)
+def test_reordered_mesh_matches_original(name, original, make_mesh):
+    reordered = make_mesh(name)
+    assert np.allclose(reordered.to_original(reordered.geometry.midpoints), original.geometry.midpoints)
+    assert np.array_equal(reordered.from_original(np.arange(len(original.cells))), reordered.permutation)
+    assert np.all(reordered.permutation[:186] == np.arange(186)), "Vertices and lines should keep their order"
+
+
+@pytest.mark.parametrize("name", ordering.ORDERINGS)
+def test_reordered_simulation_matches_original(name, original, make_mesh):
+    reordered = make_mesh(name)
+    start = np.exp(-np.sum((original.geometry.midpoints - [0.35, 0.45]) ** 2, axis=1) / 0.01)
+    oil = start.copy()
+    reordered_oil = reordered.from_original(start)
+    original_engine = eng.make_engine("vectorized", original, 0.001)
+    reordered_engine = eng.make_engine("vectorized", reordered, 0.001)
+    for _ in range(5):
+        original_engine.step(oil)
+        reordered_engine.step(reordered_oil)
+    assert np.allclose(reordered.to_original(reordered_oil), oil, rtol=1e-12, atol=1e-15)
+
+
+@pytest.mark.parametrize("name", ordering.ORDERINGS)
+def test_reordering_improves_locality(name, original, make_mesh):
+    assert bandwidth(make_mesh(name)) < bandwidth(original), "Neighbors should be closer in memory"
+
+
+def test_unknown_ordering(original):
+    with pytest.raises(Exception):
+        ordering.cell_order("unknown", original.geometry.points, original._blocks[-1][1])
+
+
+def test_refine_splits_cells():
+    points = np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]])
+    new_points, (lines, triangles) = geo.refine(points, [np.array([[0, 1]]), np.array([[0, 1, 2]])])
+    assert len(new_points) == 6 and len(lines) == 2 and len(triangles) == 4
+    assert np.isclose(geo.cell_areas(new_points, triangles).sum(), 0.5), "Refinement should keep the area"
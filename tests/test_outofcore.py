@@ -0,0 +1,76 @@
+import src.Simulation.mesh as msh
+import src.Simulation.outofcore as ooc
+from src.Simulation.engines import make_engine
+import numpy as np
+import os
+import pytest
+import tracemalloc
+
+START = np.array([0.35, 0.45])
+X_AREA = np.array([0.0, 0.45])
+Y_AREA = np.array([0.0, 0.2])
+
+
+@pytest.fixture(scope="module")
+def mesh(make_factory):
+    return msh.Mesh("meshes/bay.msh", make_factory(), "rcm")
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    return ooc.open_store("meshes/bay.msh", str(tmp_path_factory.mktemp("store")))
+
+
+def test_conversion(mesh, store):
+    assert store.num_cells == len(mesh.cells)
+    assert store.num_faces + store.num_boundary_faces == mesh.geometry.num_faces
+    permutation = store.window("permutation", 0, store.num_cells)
+    assert np.array_equal(permutation, mesh.permutation), "The store should use the cell order of the mesh"
+    faces = store.window("face_cells", 0, store.num_faces)
+    assert np.all(np.diff(faces[:, 0]) >= 0), "Faces should be sorted by their first cell"
+
+
+def test_conversion_is_reused(store):
+    modified = os.path.getmtime(os.path.join(store.folder, "face_cells.npy"))
+    ooc.open_store("meshes/bay.msh", store.folder)
+    assert os.path.getmtime(os.path.join(store.folder, "face_cells.npy")) == modified
+
+
+def test_cells_within_area(mesh, store):
+    expected = sorted(cell.index for cell in mesh.cells_within_area(X_AREA, Y_AREA))
+    assert np.array_equal(store.cells_within_area(X_AREA, Y_AREA, chunk_size=1000), expected)
+
+
+@pytest.mark.parametrize("memory_budget", [1 << 30, 64 << 10, 8 << 10])
+def test_matches_vectorized(mesh, store, tmp_path, memory_budget):
+    dt = 0.002
+    mesh.initial_oil_distribution(START)
+    oil = mesh.oil_amounts()
+    engine = make_engine("vectorized", mesh, dt)
+    out_of_core = ooc.OutOfCoreEngine(store, dt, str(tmp_path), memory_budget)
+    out_of_core.initialize(START)
+    assert np.allclose(out_of_core.oil(), oil, rtol=0, atol=1e-15)
+
+    fish_cells = store.cells_within_area(X_AREA, Y_AREA)
+    for _ in range(50):
+        engine.step(oil)
+        out_of_core.step()
+    assert np.allclose(out_of_core.oil(), oil, rtol=0, atol=1e-12), f"Mismatch with a budget of {memory_budget}"
+    assert out_of_core.total(fish_cells) == pytest.approx(oil[fish_cells].sum(), rel=1e-12)
+
+
+def test_memory_budget(store, tmp_path):
+    memory_budget = 256 << 10
+    engine = ooc.OutOfCoreEngine(store, 0.002, str(tmp_path), memory_budget)
+    engine.initialize(START)
+    tracemalloc.start()
+    for _ in range(5):
+        engine.step()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < memory_budget, f"A step allocated {peak} bytes with a budget of {memory_budget}"
+
+
+def test_budget_too_small(store, tmp_path):
+    with pytest.raises(Exception):
+        ooc.OutOfCoreEngine(store, 0.002, str(tmp_path), 64)
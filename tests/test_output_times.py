@@ -0,0 +1,63 @@
+import src.Simulation.mesh as msh
+import src.Simulation.engines as eng
+import src.Simulation.solver as solve
+import numpy as np
+import os
+import pytest
+import scipy.linalg
+
+X_AREA = np.array([0.0, 0.45])
+Y_AREA = np.array([0.0, 0.2])
+START = np.array([0.35, 0.45])
+
+
+def test_matches_dense_exponential(tmp_path, monkeypatch, make_factory):
+    path = os.path.abspath("meshes/simple.msh")
+    monkeypatch.chdir(tmp_path)
+    mesh = msh.Mesh(path, make_factory())
+    oil_area_time = solve.find_at_times(path, 0, [0.5, 0.2], START, None, X_AREA, Y_AREA, mesh=mesh)
+    assert list(oil_area_time) == [0.2, 0.5], "Output times should be evaluated in order"
+
+    operator = eng.transport_operator(mesh.geometry).toarray()
+    reference = msh.Mesh(path, make_factory())
+    reference.initial_oil_distribution(START)
+    fish = [cell.index for cell in reference.cells_within_area(X_AREA, Y_AREA)]
+    for output_time, oil_in_area in oil_area_time.items():
+        exact = scipy.linalg.expm(output_time * operator) @ reference.oil_amounts()
+        assert np.isclose(oil_in_area, exact[fish].sum(), rtol=1e-8)
+    assert np.allclose(mesh.oil_amounts(), scipy.linalg.expm(0.5 * operator) @ reference.oil_amounts())
+
+
+def test_time_steps_converge(tmp_path, monkeypatch, make_factory):
+    path = os.path.abspath("meshes/bay.msh")
+    monkeypatch.chdir(tmp_path)
+    oil_area_time = solve.find_at_times(path, 0, [0.0, 0.25], START, make_factory(), X_AREA, Y_AREA)
+    stepped, _ = solve.find_and_plot(path, 0, 0.25, 2500, None, START, make_factory(), X_AREA, Y_AREA, headless=True)
+    assert np.isclose(oil_area_time[0.25], stepped[0.25], rtol=1e-2), "Small time steps should approach the exact solution"
+
+    mesh = msh.Mesh(path, make_factory())
+    mesh.initial_oil_distribution(START)
+    initial = mesh.oil_amounts()[[cell.index for cell in mesh.cells_within_area(X_AREA, Y_AREA)]].sum()
+    assert oil_area_time[0.0] == initial, "The start time should give the initial distribution"
+
+
+def test_output_time_before_start(tmp_path, monkeypatch, factory):
+    path = os.path.abspath("meshes/simple.msh")
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(ValueError):
+        solve.find_at_times(path, 1.0, [0.5], START, factory, X_AREA, Y_AREA)
+
+
+def test_starts_from_restart_file(tmp_path, monkeypatch, make_factory):
+    path = os.path.abspath("meshes/simple.msh")
+    monkeypatch.chdir(tmp_path)
+    mesh = msh.Mesh(path, make_factory())
+    solve.find_at_times(path, 0, [0.2], START, None, X_AREA, Y_AREA, mesh=mesh)
+    # The distribution at 0.2, stored as the distribution at 1.0
+    restart = solve.write_restart_file(None, 1.0, mesh.to_original(mesh.oil_amounts()))
+
+    direct = solve.find_at_times(path, 0, [0.5], START, make_factory(), X_AREA, Y_AREA)
+    restarted = solve.find_at_times(path, 0, [1.3], START, make_factory(), X_AREA, Y_AREA, restartFile=restart)
+    assert np.isclose(restarted[1.3], direct[0.5], rtol=1e-8), "The restart file should be the initial state"
+    with pytest.raises(ValueError):
+        solve.find_at_times(path, 0, [0.5], START, make_factory(), X_AREA, Y_AREA, restartFile=restart)
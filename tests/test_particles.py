@@ -0,0 +1,137 @@
+import src.Simulation.mesh as msh
+import src.Simulation.solver as solve
+from src.Simulation.engines import make_engine
+from src.Simulation.particles import ParticleEngine, PointLocator
+from src.Simulation.weathering import Weathering
+import numpy as np
+import os
+import pytest
+from scipy.linalg import expm
+
+START_POINT = np.array([0.35, 0.45])
+FISH_AREA = (np.array([0.0, 0.45]), np.array([0.0, 0.2]))
+
+
+@pytest.fixture(scope="module")
+def mesh(make_factory):
+    mesh = msh.Mesh("meshes/bay.msh", make_factory())
+    mesh.initial_oil_distribution(START_POINT)
+    return mesh
+
+
+@pytest.fixture(scope="module")
+def locator(mesh):
+    return PointLocator(mesh)
+
+
+def total_mass(mesh, oil):
+    active = mesh.geometry.active
+    return np.dot(mesh.geometry.areas[active], oil[active])
+
+
+def test_locate_midpoints(mesh, locator):
+    cells = np.flatnonzero(mesh.geometry.active)
+    assert np.array_equal(locator.locate(mesh.geometry.midpoints[cells]), cells)
+    assert np.array_equal(locator.locate(np.array([[2.0, 2.0], [-1.0, 0.5]])), [-1, -1]), (
+        "Positions outside the mesh should not be found"
+    )
+
+
+def test_walk_matches_grid(mesh, locator):
+    generator = np.random.default_rng(0)
+    cells = generator.choice(np.flatnonzero(mesh.geometry.active), 5000)
+    positions = locator.sample(cells, generator)
+    assert np.array_equal(locator.locate(positions), cells), "Sampled positions should lie in their cells"
+    moved = positions + 0.02 * generator.standard_normal(positions.shape)
+    assert np.array_equal(locator.locate(moved, cells), locator.locate(moved))
+    assert np.array_equal(locator.locate(moved, generator.permutation(cells)), locator.locate(moved))
+
+
+def test_sample_uniform(mesh, locator):
+    cell = np.flatnonzero(mesh.geometry.active)[0]
+    positions = locator.sample(np.full(20000, cell), np.random.default_rng(1))
+    size = np.sqrt(mesh.geometry.areas[cell])
+    assert np.allclose(positions.mean(axis=0), mesh.geometry.midpoints[cell], atol=0.02 * size)
+
+
+def test_advection_accuracy(mesh):
+    engine = ParticleEngine(mesh, 0.01, num_particles=1)
+    position = np.array([[0.35, 0.45]])
+    moved = position
+    for _ in range(50):
+        moved = engine._advect(moved)
+    # The velocity field is linear, v = A x, so the exact path is exp(A t) x
+    exact = expm(np.array([[-0.2, 1.0], [-1.0, 0.0]]) * 0.5) @ position[0]
+    assert np.allclose(moved[0], exact, atol=1e-9)
+
+
+def test_conserves_mass(mesh):
+    oil = mesh.oil_amounts()
+    mass = total_mass(mesh, oil)
+    engine = ParticleEngine(mesh, 0.01, num_particles=20000)
+    for _ in range(30):
+        engine.step(oil)
+    assert total_mass(mesh, oil) + engine.removed == pytest.approx(mass, rel=1e-12)
+    assert engine.masses.sum() == pytest.approx(total_mass(mesh, oil), rel=1e-12)
+    assert np.all(oil[~mesh.geometry.active] == mesh.oil_amounts()[~mesh.geometry.active]), (
+        "Cells without oil flow should keep their oil"
+    )
+
+
+def test_close_to_vectorized(mesh):
+    fish_cells = np.array([cell.index for cell in mesh.cells_within_area(*FISH_AREA)])
+    reference = mesh.oil_amounts()
+    engine = make_engine("vectorized", mesh, 0.002)
+    for _ in range(250):
+        engine.step(reference)
+    oil = mesh.oil_amounts()
+    engine = make_engine("particles", mesh, 0.01, num_particles=20000)
+    for _ in range(50):
+        engine.step(oil)
+    assert oil[fish_cells].sum() == pytest.approx(reference[fish_cells].sum(), rel=0.1)
+
+
+def test_added_and_taken_oil(mesh):
+    oil = mesh.oil_amounts()
+    engine = ParticleEngine(mesh, 0.01, num_particles=5000)
+    engine.step(oil)
+    mass = engine.masses.sum()
+    cell = np.argmax(oil)
+    oil[cell] += 2.0
+    other = np.flatnonzero(mesh.geometry.active & (oil > 0))[0]
+    taken = 0.5 * oil[other] * mesh.geometry.areas[other]
+    oil[other] *= 0.5
+    engine.step(oil)
+    assert engine.masses.sum() + engine.removed == pytest.approx(
+        mass + 2.0 * mesh.geometry.areas[cell] - taken, rel=1e-12
+    ), "Oil added to or taken from the oil amounts between steps should change the particles"
+
+
+def test_weathering(mesh):
+    dt = 0.01
+    weathering = Weathering(mesh.geometry, dt, evaporation=1.0)
+    oil = mesh.oil_amounts()
+    engine = make_engine("particles", mesh, dt, weathering=weathering, num_particles=5000)
+    engine.step(oil)
+    mass, removed = engine.masses.sum(), engine.removed
+    engine.step(oil)
+    assert engine.masses.sum() == pytest.approx((mass - (engine.removed - removed)) * np.exp(-dt), rel=1e-12)
+    assert total_mass(mesh, oil) == pytest.approx(engine.masses.sum(), rel=1e-12)
+
+
+def test_invalid_particles(mesh):
+    with pytest.raises(ValueError):
+        ParticleEngine(mesh, 0.01, num_particles=0)
+
+
+def test_solver_particles(tmp_path, monkeypatch, make_factory):
+    path = os.path.abspath("meshes/bay.msh")
+    monkeypatch.chdir(tmp_path)
+    arguments = (path, 0, 0.5, 250, None, START_POINT, None, *FISH_AREA)
+    plain, _ = solve.find_and_plot(*arguments, mesh=msh.Mesh(path, make_factory()), headless=True)
+    particles, diagnostics = solve.find_and_plot(
+        *arguments, mesh=msh.Mesh(path, make_factory()), headless=True, engine="particles", particles=5000
+    )
+    assert list(particles) == list(plain)
+    assert list(particles.values())[-1] == pytest.approx(list(plain.values())[-1], rel=0.2)
+    assert diagnostics.summary()["final_mass"] > 0
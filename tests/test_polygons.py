@@ -0,0 +1,174 @@
+import src.Simulation.cells as cls
+import src.Simulation.mesh as msh
+import src.Simulation.results as res
+from src.Simulation.engines import make_engine
+from src.Simulation.nesting import NestedMesh
+from src.Simulation.raster import RasterRenderer, rasterize
+import xml.etree.ElementTree as ElementTree
+import h5py
+import meshio
+import numpy as np
+import pytest
+
+N = 8
+DT = 0.005
+START_POINT = np.array([0.4, 0.6])
+
+
+def grid(split_from: int = N, pentagon: bool = False):
+    """
+    A structured N x N grid on the unit square with the coastline as lines. Squares in the columns from
+    `split_from` on are split into two triangles; with `pentagon`, the last square before them is merged
+    with the triangle next to it.
+    """
+    x, y = np.meshgrid(np.linspace(0, 1, N + 1), np.linspace(0, 1, N + 1), indexing="ij")
+    points = np.stack((x.ravel(), y.ravel(), np.zeros(x.size)), axis=1)
+
+    def point(i, j):
+        return i * (N + 1) + j
+
+    quads, triangles, polygons = [], [], []
+    for i in range(N):
+        for j in range(N):
+            a, b, c, d = point(i, j), point(i + 1, j), point(i + 1, j + 1), point(i, j + 1)
+            if i < split_from:
+                quads.append([a, b, c, d])
+            else:
+                triangles.extend([[a, b, c], [a, c, d]])
+    if pentagon:
+        i, j = split_from - 1, N // 2
+        a, b, c, d = point(i, j), point(i + 1, j), point(i + 1, j + 1), point(i, j + 1)
+        quads.remove([a, b, c, d])
+        triangles.remove([b, point(i + 2, j + 1), c])
+        polygons.append([a, b, point(i + 2, j + 1), c, d])
+    border = [point(i, 0) for i in range(N)] + [point(N, j) for j in range(N)]
+    border += [point(i, N) for i in range(N, 0, -1)] + [point(0, j) for j in range(N, 0, -1)]
+    lines = np.stack((border, np.roll(border, -1)), axis=1)
+
+    blocks = [("line", lines)]
+    for name, data in (("quad", quads), ("triangle", triangles), ("polygon", polygons)):
+        if data:
+            blocks.append((name, np.array(data)))
+    return meshio.Mesh(points, blocks)
+
+
+def load(tmp_path, name, mesh, factory):
+    path = str(tmp_path / name)
+    meshio.write(path, mesh)
+    loaded = msh.Mesh(path, factory)
+    loaded.initial_oil_distribution(START_POINT)
+    return loaded
+
+
+@pytest.fixture
+def quads(tmp_path, make_factory):
+    return load(tmp_path, "quads.vtu", grid(), make_factory())
+
+
+@pytest.fixture
+def mixed(tmp_path, make_factory):
+    return load(tmp_path, "mixed.vtu", grid(N // 2, pentagon=True), make_factory())
+
+
+def test_cell_types(mixed):
+    types = {type(cell) for cell in mixed.cells}
+    assert types == {cls.Line, cls.Triangle, cls.Quadrilateral, cls.Polygon}
+    assert sorted(data.shape[1] for _, data in mixed.blocks) == [2, 3, 4, 5]
+
+
+def test_geometry_matches_cells(mixed):
+    geometry = mixed.geometry
+    for cell in mixed.cells:
+        if geometry.active[cell.index]:
+            assert cell.area == pytest.approx(geometry.areas[cell.index], rel=1e-12)
+            assert np.allclose(cell.midpoint, geometry.midpoints[cell.index])
+            assert len(cell.neighbors) == cell.num_points, "Every edge is shared with a cell or the coastline"
+            assert np.allclose(np.sum(cell.scaled_normal, axis=0), 0, atol=1e-12), "The polygon should be closed"
+    assert geometry.areas[geometry.active].sum() == pytest.approx(1.0)
+    pentagon = next(cell for cell in mixed.cells if isinstance(cell, cls.Polygon))
+    assert pentagon.area == pytest.approx(1.5 / N**2)
+    assert len(pentagon.neighbors) == 5
+
+
+def test_engines_agree(mixed):
+    oil = mixed.oil_amounts()
+    reference = make_engine("reference", mixed, DT)
+    vectorized = make_engine("vectorized", mixed, DT)
+    expected = oil.copy()
+    for _ in range(40):
+        reference.step(expected)
+        vectorized.step(oil)
+    assert np.allclose(oil, expected, rtol=1e-10, atol=1e-14)
+
+
+def test_quads_halve_cell_count(tmp_path, quads, make_factory):
+    triangles = load(tmp_path, "triangles.vtu", grid(0), make_factory())
+    assert np.count_nonzero(quads.geometry.active) * 2 == np.count_nonzero(triangles.geometry.active)
+    masses = []
+    for mesh in (quads, triangles):
+        oil = mesh.oil_amounts()
+        engine = make_engine("vectorized", mesh, DT)
+        for _ in range(40):
+            engine.step(oil)
+        masses.append(np.dot(mesh.geometry.areas, oil))
+    assert masses[0] == pytest.approx(masses[1], rel=0.1)
+
+
+def test_rasterize_mixed(mixed):
+    connectivity, indices = res.polygon_cells(mixed)
+    assert connectivity.shape[1] == 5
+    midpoints = mixed.geometry.midpoints[indices]
+    found = rasterize(mixed.point_array, connectivity, midpoints[:, 0], midpoints[:, 1])
+    assert np.array_equal(found, np.arange(len(indices))), "Every midpoint should lie in its own polygon"
+
+    renderer = RasterRenderer(mixed, set(), width=200, height=150)
+    covered = np.unique(renderer._cell_image)
+    assert set(covered[covered >= 0]) <= set(indices)
+
+
+def read_topology(basename):
+    topology = ElementTree.parse(f"{basename}.xdmf").getroot().find(".//Topology")
+    with h5py.File(f"{basename}.h5") as file:
+        return topology.attrib, file["mesh/cells"][:]
+
+
+def test_export_single_type(tmp_path, quads):
+    connectivity, indices = res.polygon_cells(quads)
+    basename = str(tmp_path / "quads")
+    with res.ResultsWriter(basename, quads.point_array, connectivity, indices) as writer:
+        writer.write(0, 0.0, quads.oil_amounts())
+    attributes, cells = read_topology(basename)
+    assert attributes["TopologyType"] == "Quadrilateral"
+    assert np.array_equal(cells, connectivity)
+
+
+def test_export_mixed(tmp_path, mixed):
+    connectivity, indices = res.polygon_cells(mixed)
+    basename = str(tmp_path / "mixed")
+    with res.ResultsWriter(basename, mixed.point_array, connectivity, indices) as writer:
+        writer.write(0, 0.0, mixed.oil_amounts())
+    attributes, cells = read_topology(basename)
+    assert attributes["TopologyType"] == "Mixed"
+    assert int(attributes["NumberOfElements"]) == len(indices)
+
+    # Decodes the cells: a type id, the number of points for polygons, and the point indices
+    sizes = {4: 3, 5: 4}
+    decoded, position = [], 0
+    while position < len(cells):
+        if cells[position] == 3:
+            size, position = cells[position + 1], position + 2
+        else:
+            size, position = sizes[cells[position]], position + 1
+        decoded.append(list(cells[position : position + size]))
+        position += size
+    assert decoded == [[point for point in row if point >= 0] for row in connectivity.tolist()]
+
+
+def test_nesting_refines_only_triangles(mixed):
+    nested = NestedMesh(mixed, np.array([0.0, 1.0]), np.array([0.0, 1.0]), levels=1)
+    widths = np.zeros(len(mixed.cells), dtype=np.int64)
+    for first, data in mixed.blocks:
+        widths[first : first + len(data)] = data.shape[1]
+    assert np.all(widths[nested.nested & mixed.geometry.active] == 3)
+    outer_oil, fine_oil = nested.initial_oil(START_POINT)
+    assert np.all(outer_oil[widths == 4] == mixed.oil_amounts()[widths == 4])
@@ -0,0 +1,62 @@
+import src.Simulation.cells as cls
+import src.Simulation.mesh as msh
+import src.Simulation.raster as rst
+import cv2 as cv
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def mesh(make_factory):
+    return msh.Mesh("meshes/bay.msh", make_factory(), "hilbert")
+
+
+@pytest.fixture(scope="module")
+def fish(mesh):
+    return set(mesh.cells_within_area([0.0, 0.45], [0.0, 0.2]))
+
+
+@pytest.fixture(scope="module")
+def renderer(mesh, fish):
+    return rst.RasterRenderer(mesh, fish, 356, 256)
+
+
+def test_rasterize_finds_midpoints(mesh):
+    geometry = mesh.geometry
+    triangles = np.flatnonzero(geometry.active)
+    connectivity = np.array([[point.index for point in mesh.cells[index].points] for index in triangles])
+    midpoints = geometry.midpoints[triangles]
+    found = rst.rasterize(mesh.point_array, connectivity, midpoints[:, 0], midpoints[:, 1])
+    assert np.array_equal(found, np.arange(len(triangles))), "Every midpoint should lie in its own cell"
+    assert rst.rasterize(mesh.point_array, connectivity, np.array([2.0]), np.array([2.0]))[0] == -1
+
+
+def test_cell_image(renderer, mesh):
+    cell_image = renderer.cell_image
+    assert cell_image.shape == (256, 356)
+    covered = cell_image[cell_image >= 0]
+    assert len(covered) > 0
+    assert all(isinstance(mesh.cells[index], cls.Triangle) for index in np.unique(covered))
+
+
+def test_render_colors(renderer, mesh, fish):
+    oil = np.zeros(len(mesh.cells))
+    frame = renderer.render(oil)
+    assert frame.shape == (256, 356, 3) and frame.dtype == np.uint8
+    fish_mask = np.isin(renderer.cell_image, [cell.index for cell in fish])
+    oil_mask = (renderer.cell_image >= 0) & ~fish_mask
+    lut = rst._colormap()
+    assert np.all(frame[oil_mask] == lut[0]), "Cells without oil should have the lowest color"
+    assert np.all(frame[fish_mask] == rst._FISH_COLOR), "The fish area should have a fixed color"
+
+    frame = renderer.render(np.full(len(mesh.cells), 2.0))
+    assert np.all(frame[oil_mask] == lut[-1]), "Oil amounts above 1 should be clipped"
+    frame = renderer.render(np.full(len(mesh.cells), np.nan))
+    assert np.all(frame[oil_mask] == lut[0])
+
+
+def test_save(renderer, mesh, tmp_path):
+    oil = np.linspace(0, 1, len(mesh.cells))
+    filename = renderer.save(oil, 0.5, str(tmp_path))
+    assert filename.endswith("mesh_plot0.50.png")
+    assert np.array_equal(cv.imread(filename), renderer.render(oil))
@@ -0,0 +1,66 @@
+import src.Simulation.cells as cls
+import src.Simulation.mesh as msh
+import src.Simulation.results as res
+import xml.etree.ElementTree as ElementTree
+import h5py
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def make_mesh(make_factory):
+    def make_mesh(reorder=None):
+        return msh.Mesh("meshes/simple.msh", make_factory(), reorder)
+
+    return make_mesh
+
+
+@pytest.mark.parametrize("reorder", [None, "hilbert"])
+def test_polygon_cells_in_file_order(reorder, make_mesh):
+    original = make_mesh()
+    mesh = make_mesh(reorder)
+    connectivity, indices = res.polygon_cells(mesh)
+    expected, expected_indices = res.polygon_cells(original)
+    assert np.array_equal(connectivity, expected), "Cells should be exported in the order of the mesh file"
+    assert np.array_equal(mesh.permutation[indices], expected_indices)
+    assert all(isinstance(mesh.cells[index], cls.Triangle) for index in indices)
+
+
+def test_write_frames(tmp_path, make_mesh):
+    mesh = make_mesh()
+    connectivity, indices = res.polygon_cells(mesh)
+    basename = str(tmp_path / "run")
+    oil = np.arange(len(mesh.cells), dtype=np.float64)
+    with res.ResultsWriter(basename, mesh.point_array, connectivity, indices) as writer:
+        for step in range(3):
+            writer.write(step * 5, step * 0.1, oil + step)
+
+    with h5py.File(f"{basename}.h5") as file:
+        assert file["oil"].shape == (3, len(indices))
+        assert file["oil"].compression == "gzip", "The oil dataset should be compressed"
+        assert file["oil"].chunks == (1, len(indices))
+        assert np.array_equal(file["step"][:], [0, 5, 10])
+        assert np.allclose(file["time"][:], [0.0, 0.1, 0.2])
+        assert np.array_equal(file["oil"][2], oil[indices] + 2)
+        assert np.array_equal(file["mesh/cells"][:], connectivity)
+
+    grids = ElementTree.parse(f"{basename}.xdmf").getroot().findall("./Domain/Grid/Grid")
+    assert [float(grid.find("Time").get("Value")) for grid in grids] == [0.0, 0.1, 0.2]
+    slab = grids[1].find("Attribute/DataItem/DataItem").text.split()
+    assert slab[:2] == ["1", "0"], "The second grid should reference the second row of the oil dataset"
+
+
+def test_continue_drops_later_frames(tmp_path, make_mesh):
+    mesh = make_mesh()
+    connectivity, indices = res.polygon_cells(mesh)
+    basename = str(tmp_path / "run")
+    oil = np.ones(len(mesh.cells), dtype=np.float32)
+    with res.ResultsWriter(basename, mesh.point_array, connectivity, indices, np.float32) as writer:
+        for step in range(4):
+            writer.write(step, step * 0.1, oil)
+    with res.ResultsWriter(basename, mesh.point_array, connectivity, indices, np.float32, 2) as writer:
+        assert writer.num_frames == 2, "Frames after the resumed step should be dropped"
+        writer.write(2, 0.2, oil)
+    with h5py.File(f"{basename}.h5") as file:
+        assert np.array_equal(file["step"][:], [0, 1, 2])
+        assert file["oil"].dtype == np.float32
@@ -0,0 +1,128 @@
+import service
+import os
+import threading
+import pytest
+
+MESH = os.path.abspath("meshes/simple.msh")
+
+
+@pytest.fixture(scope="module")
+def simulation_service(tmp_path_factory):
+    # Workers write their results relative to the working directory they start in
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("service"))
+    simulation_service = service.SimulationService(workers=1)
+    yield simulation_service
+    simulation_service.shutdown()
+    os.chdir(cwd)
+
+
+def test_job_stream_replays_history():
+    job = service.Job("abc", "test")
+    job.publish({"event": "progress", "step": 1})
+    job.publish({"event": "done", "oil_area_time": []})
+    assert [event["event"] for event in job.stream()] == ["progress", "done"]
+    assert job.finished, "The job should be finished after a done event"
+
+
+def test_job_stream_waits_for_events():
+    job = service.Job("abc", "test")
+    received = []
+    reader = threading.Thread(target=lambda: received.extend(job.stream()))
+    reader.start()
+    job.publish({"event": "progress", "step": 1})
+    job.publish({"event": "error", "message": "failed"})
+    reader.join(timeout=5)
+    assert not reader.is_alive(), "The stream did not end after the job finished"
+    assert [event["event"] for event in received] == ["progress", "error"]
+
+
+def test_events_are_capped():
+    job = service.Job("abc", "test", max_events=3)
+    for step in range(5):
+        job.publish({"event": "progress", "step": step})
+    assert [event["step"] for event in job.events] == [2, 3, 4], "Only the newest events should be kept"
+    job.publish({"event": "done", "oil_area_time": []})
+    assert [event["event"] for event in job.stream()] == ["progress", "progress", "done"]
+
+
+def test_late_stream_skips_dropped_events():
+    job = service.Job("abc", "test", max_events=2)
+    stream = job.stream()
+    job.publish({"event": "progress", "step": 0})
+    assert next(stream)["step"] == 0
+    for step in range(1, 5):
+        job.publish({"event": "progress", "step": step})
+    assert [next(stream)["step"] for _ in range(2)] == [3, 4]
+    job.publish({"event": "error", "message": "failed"})
+    assert [event["event"] for event in stream] == ["error"]
+
+
+def test_job_expires():
+    job = service.Job("abc", "test")
+    assert not job.expired(ttl=0)
+    job.publish({"event": "done", "oil_area_time": []})
+    assert job.expired(ttl=0), "A finished job should expire after the time to live"
+    assert not job.expired(ttl=3600), "A finished job should be kept until it is streamed"
+    list(job.stream())
+    assert job.expired(ttl=3600), "A streamed job should expire"
+
+
+@pytest.mark.parametrize("payload",
+                         ["not = [valid toml",
+                          "[settings]\nnSteps = 10\n"])
+def test_invalid_config_rejected(simulation_service, payload):
+    with pytest.raises(Exception):
+        simulation_service.submit(payload)
+    assert simulation_service.jobs == {}, "An invalid job was queued"
+
+
+@pytest.mark.parametrize(
+    "setting, section", [("outputTimes = [0.1]", ""), ("outOfCore = true", ""), ("", "[nesting]\nlevels = 1")]
+)
+def test_unsupported_config_rejected(simulation_service, setting, section):
+    payload = f"""
+[settings]
+nSteps = 4
+t_start = 0.0
+t_end = 0.2
+{setting}
+
+[geometry]
+filepath = "{MESH}"
+fish_area = [[0.0, 0.45], [0.0, 0.2]]
+initial_oil_area = [0.35, 0.45]
+
+[IO]
+logName = "logfile"
+
+{section}
+"""
+    with pytest.raises(ValueError, match="main.py"):
+        simulation_service.submit(payload)
+    assert simulation_service.jobs == {}, "An unsupported job was queued"
+
+
+def test_job_runs_on_cached_mesh(simulation_service):
+    payload = f"""
+[settings]
+nSteps = 4
+t_start = 0.0
+t_end = 0.2
+
+[geometry]
+filepath = "{MESH}"
+fish_area = [[0.0, 0.45], [0.0, 0.2]]
+initial_oil_area = [0.35, 0.45]
+
+[IO]
+logName = "logfile"
+"""
+    first = simulation_service.submit(payload, "service_test")
+    second = simulation_service.submit(payload, "service_test")
+    first_events = list(first.stream(timeout=120))
+    second_events = list(second.stream(timeout=120))
+    assert [event["event"] for event in first_events] == ["progress"] * 4 + ["done"]
+    assert first_events[-1] == second_events[-1], "A job on the cached mesh gave a different result"
+    assert len(first_events[-1]["oil_area_time"]) == 4
+    assert first.id not in simulation_service.jobs, "A streamed job should be removed"
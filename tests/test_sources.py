@@ -0,0 +1,82 @@
+import src.Simulation.mesh as msh
+import src.Simulation.solver as solve
+import src.Simulation.sources as src
+import numpy as np
+import os
+import pytest
+import tracemalloc
+
+LEAK = {"location": [0.35, 0.45], "radius": 0.05, "rates": [[0.1, 2.0], [0.3, 0.5], [0.5, 0.0]]}
+
+
+@pytest.fixture(scope="module")
+def geometry(make_factory):
+    return msh.Mesh("meshes/bay.msh", make_factory()).geometry
+
+
+def test_weights(geometry):
+    cells, weights = src.source_weights(geometry, np.array([0.35, 0.45]), 0.05)
+    assert np.all(geometry.active[cells]), "Only cells carrying oil flow should receive oil"
+    distance = np.linalg.norm(geometry.midpoints[cells] - [0.35, 0.45], axis=1)
+    assert np.all(distance < 0.2) and len(cells) < geometry.num_cells / 4
+    assert np.allclose(weights, np.exp(-(distance**2) / 0.05**2))
+
+
+@pytest.mark.parametrize("current_time, rate", [(0.0, 0.0), (0.1, 2.0), (0.2, 2.0), (0.3, 0.5), (0.7, 0.0)])
+def test_schedule(geometry, current_time, rate):
+    source_terms = src.SourceTerms(geometry, [LEAK])
+    cells, weights = src.source_weights(geometry, LEAK["location"], LEAK["radius"])
+    oil = np.zeros(geometry.num_cells)
+    source_terms.apply(oil, current_time, 0.01)
+    assert np.allclose(oil[cells], rate * 0.01 * weights), f"Expected a rate of {rate} at time {current_time}"
+    assert np.count_nonzero(oil) <= len(cells)
+
+
+def test_sources_add_up(geometry):
+    other = {"location": [0.4, 0.5], "radius": 0.1, "rate": 1.0}
+    together = np.ones(geometry.num_cells)
+    src.SourceTerms(geometry, [LEAK, other]).apply(together, 0.2, 0.01)
+    separate = np.ones(geometry.num_cells)
+    src.SourceTerms(geometry, [LEAK]).apply(separate, 0.2, 0.01)
+    src.SourceTerms(geometry, [other]).apply(separate, 0.2, 0.01)
+    assert np.allclose(together, separate)
+
+
+def test_apply_does_not_allocate(geometry):
+    source_terms = src.SourceTerms(geometry, [LEAK, {"location": [0.4, 0.5], "radius": 0.1, "rate": 1.0}])
+    oil = np.zeros(geometry.num_cells)
+    source_terms.apply(oil, 0.2, 0.01)
+    tracemalloc.start()
+    for _ in range(10):
+        source_terms.apply(oil, 0.2, 0.01)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # The buffers of the 1718 cells near the second source take 13 kB each
+    assert peak < 4096, "Applying the sources should not allocate arrays"
+
+
+def test_invalid_schedule(geometry):
+    with pytest.raises(ValueError):
+        src.SourceTerms(geometry, [{"location": [0.3, 0.3], "radius": 0.1, "rates": [[0.5, 1.0], [0.2, 0.0]]}])
+    with pytest.raises(ValueError):
+        src.SourceTerms(geometry, [{"location": [0.3, 0.3], "radius": 0.1}])
+    with pytest.raises(ValueError):
+        src.SourceTerms(geometry, [{"location": [0.3, 0.3], "radius": 0.1, "rate": -1.0}])
+    with pytest.raises(ValueError):
+        src.SourceTerms(geometry, [{"location": [0.3, 0.3], "radius": 0.1, "rates": [[0.0, 1.0], [0.5, -0.5]]}])
+
+
+def test_solver_with_sources(tmp_path, monkeypatch, make_factory):
+    path = os.path.abspath("meshes/bay.msh")
+    monkeypatch.chdir(tmp_path)
+    arguments = (path, 0, 0.5, 250, None, np.array([0.35, 0.45]), None, np.array([0.0, 0.45]), np.array([0.0, 0.2]))
+    _, without = solve.find_and_plot(*arguments, mesh=msh.Mesh(path, make_factory()), headless=True)
+    _, silent = solve.find_and_plot(
+        *arguments,
+        mesh=msh.Mesh(path, make_factory()),
+        headless=True,
+        sources=[{"location": [0.35, 0.45], "radius": 0.05, "rate": 0.0}],
+    )
+    _, leaking = solve.find_and_plot(*arguments, mesh=msh.Mesh(path, make_factory()), headless=True, sources=[LEAK])
+    assert silent.summary()["final_mass"] == without.summary()["final_mass"]
+    assert leaking.summary()["final_mass"] > without.summary()["final_mass"], "The leak should add oil"
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["matplotlib", "cv2", "cairo"]
+
+
+def loaded_modules(code):
+    result = subprocess.run(
+        [sys.executable, "-c", f"{code}\nimport sys\nprint(' '.join(sys.modules))"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT,
+    )
+    return set(result.stdout.split())
+
+
+def test_solver_import_is_light():
+    modules = loaded_modules("import src.Simulation.solver")
+    for module in HEAVY_MODULES:
+        assert module not in modules, f"Importing the solver imports {module}"
+
+
+def test_help_does_not_import_solver():
+    # Runs main.py as __main__ with --help, and prints the loaded modules when argparse exits
+    code = f"""
+import runpy, sys
+sys.argv = ["main.py", "--help"]
+sys.path.insert(0, {ROOT!r})
+try:
+    runpy.run_path("main.py", run_name="__main__")
+finally:
+    print("MODULES", " ".join(sys.modules))
+"""
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+    assert result.returncode == 0
+    assert "--headless" in result.stdout
+    modules = set(result.stdout.split("MODULES", 1)[1].split())
+    for module in ["src.Simulation.solver", "src.Simulation.mesh", "numpy", "scipy", *HEAVY_MODULES]:
+        assert module not in modules, f"--help imports {module}"
+
+
+@pytest.mark.parametrize("module", HEAVY_MODULES)
+def test_headless_run_is_light(module, tmp_path):
+    code = f"""
+import os, sys
+sys.path.insert(0, {ROOT!r})
+import numpy as np
+import src.Simulation.solver as solve
+import src.Simulation.mesh as msh
+import src.Simulation.cells as cls
+factory = msh.CellFactory()
+factory.register(2, cls.Line)
+factory.register(3, cls.Triangle)
+mesh = msh.Mesh(os.path.abspath("meshes/simple.msh"), factory)
+os.chdir({str(tmp_path)!r})
+solve.find_and_plot("", 0, 0.1, 2, 1, np.array([0.35, 0.45]), factory,
+                    np.array([0.0, 0.45]), np.array([0.0, 0.2]), mesh=mesh, headless=True)
+"""
+    assert module not in loaded_modules(code), f"A headless run imports {module}"
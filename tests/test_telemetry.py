@@ -0,0 +1,104 @@
+import src.Simulation.mesh as msh
+import src.Simulation.solver as solve
+from src.Simulation.telemetry import Telemetry
+import numpy as np
+import os
+import pytest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def read_metrics(filename: str) -> dict[str, float]:
+    """
+    Parses a Prometheus text file with one sample per metric into {name: value}.
+    """
+    metrics = {}
+    with open(filename) as file:
+        for line in file:
+            if line.startswith("#"):
+                continue
+            sample, value = line.rsplit(" ", 1)
+            metrics[sample.split("{")[0]] = float(value)
+    return metrics
+
+
+def test_rate_limited(tmp_path):
+    clock = FakeClock()
+    filename = str(tmp_path / "metrics.prom")
+    telemetry = Telemetry(filename, "bay", 100, 1000, interval=5.0, clock=clock)
+    assert read_metrics(filename)["oil_steps_completed"] == 0
+    for step in range(1, 10):
+        clock.now = 0.5 * step
+        telemetry.step(step, 0.01 * step, 1.0, 0.5)
+    assert read_metrics(filename)["oil_steps_completed"] == 0, "Metrics should not be written within the interval"
+    clock.now = 5.0
+    telemetry.step(10, 0.1, 0.9, 0.4)
+    metrics = read_metrics(filename)
+    assert metrics["oil_steps_completed"] == 10
+    assert metrics["oil_cell_updates_per_second"] == pytest.approx(10 / 5.0 * 1000)
+    assert metrics["oil_eta_seconds"] == pytest.approx(90 / 2.0)
+    assert metrics["oil_mass"] == 0.9 and metrics["oil_fish_area_oil"] == 0.4
+    assert metrics["oil_run_finished"] == 0
+
+
+def test_finish_and_rendering(tmp_path):
+    clock = FakeClock()
+    filename = str(tmp_path / "metrics.prom")
+    telemetry = Telemetry(filename, "bay", 20, 10, first_step=10, clock=clock)
+    telemetry.rendered(0.25)
+    telemetry.rendered(0.5)
+    clock.now = 1.0
+    telemetry.finish(20, 0.2, 1.0, 0.3)
+    metrics = read_metrics(filename)
+    assert metrics["oil_run_finished"] == 1 and metrics["oil_eta_seconds"] == 0
+    assert metrics["oil_cell_updates_per_second"] == pytest.approx(100), "Resumed steps should not count"
+    assert metrics["oil_frames_rendered_total"] == 2
+    assert metrics["oil_render_seconds_total"] == pytest.approx(0.75)
+    assert not os.path.exists(f"{filename}.tmp")
+
+
+def test_text_format(tmp_path):
+    filename = str(tmp_path / "metrics.prom")
+    Telemetry(filename, 'say "hi"', 1, 1)
+    with open(filename) as file:
+        lines = file.read().splitlines()
+    samples = [line for line in lines if not line.startswith("#")]
+    assert len(lines) == 3 * len(samples)
+    assert all(line.startswith("oil_") and '{experiment="say \\"hi\\""}' in line for line in samples)
+    assert all(line.split()[-1] in ("gauge", "counter") for line in lines if line.startswith("# TYPE"))
+
+
+def test_invalid_interval(tmp_path):
+    with pytest.raises(ValueError):
+        Telemetry(str(tmp_path / "metrics.prom"), "bay", 1, 1, interval=0)
+
+
+def test_solver_publishes_metrics(tmp_path, monkeypatch, factory):
+    path = os.path.abspath("meshes/bay.msh")
+    monkeypatch.chdir(tmp_path)
+    oil_area_time, diagnostics = solve.find_and_plot(
+        path,
+        0,
+        0.1,
+        50,
+        None,
+        np.array([0.35, 0.45]),
+        None,
+        np.array([0.0, 0.45]),
+        np.array([0.0, 0.2]),
+        mesh=msh.Mesh(path, factory),
+        headless=True,
+        metrics_file=os.path.join("metrics", "bay.prom"),
+    )
+    metrics = read_metrics(os.path.join("metrics", "bay.prom"))
+    assert metrics["oil_steps_completed"] == metrics["oil_steps_planned"] == 50
+    assert metrics["oil_run_finished"] == 1
+    assert metrics["oil_mass"] == pytest.approx(diagnostics.summary()["final_mass"])
+    assert metrics["oil_fish_area_oil"] == pytest.approx(list(oil_area_time.values())[-1])
+    assert metrics["oil_cell_updates_per_second"] > 0
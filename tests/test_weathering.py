@@ -0,0 +1,117 @@
+import src.Simulation.mesh as msh
+import src.Simulation.solver as solve
+from src.Simulation.engines import make_engine
+from src.Simulation.weathering import Weathering
+import numpy as np
+import os
+import pytest
+
+DT = 0.002
+
+
+def make_mesh(factory):
+    mesh = msh.Mesh("meshes/bay.msh", factory)
+    mesh.initial_oil_distribution(np.array([0.35, 0.45]))
+    return mesh
+
+
+@pytest.fixture(scope="module")
+def mesh(make_factory):
+    return make_mesh(make_factory())
+
+
+def test_coastal_cells(mesh):
+    weathering = Weathering(mesh.geometry, DT, beaching=0.1)
+    geometry = mesh.geometry
+    next_to_line = np.unique(geometry.face_cells[~geometry.active[geometry.face_cells[:, 1]], 0])
+    assert np.array_equal(weathering.coastal_cells, next_to_line), "Coastal cells should share an edge with a line"
+    inland = np.setdiff1d(np.flatnonzero(geometry.active), weathering.coastal_cells)
+    assert np.all(weathering.factor[inland] == 1), "Beaching should only act at the coastline"
+    assert np.all(weathering.factor[weathering.coastal_cells] < 1)
+
+
+def test_decay_scales_oil(mesh):
+    plain = mesh.oil_amounts()
+    decayed = plain.copy()
+    plain_engine = make_engine("vectorized", mesh, DT)
+    decayed_engine = make_engine("vectorized", mesh, DT, weathering=Weathering(mesh.geometry, DT, evaporation=0.5, decay=0.2))
+    for _ in range(50):
+        plain_engine.step(plain)
+        decayed_engine.step(decayed)
+    active = mesh.geometry.active
+    assert np.allclose(decayed[active], np.exp(-0.7 * 50 * DT) * plain[active], rtol=1e-10, atol=1e-15)
+
+
+def test_fused_matches_split(make_factory):
+    rates = dict(evaporation=0.3, decay=0.1, beaching=0.2)
+    split_mesh = make_mesh(make_factory())
+    fused_mesh = make_mesh(make_factory())
+    split_weathering = Weathering(split_mesh.geometry, DT, **rates)
+    fused_weathering = Weathering(fused_mesh.geometry, DT, **rates)
+    split = split_mesh.oil_amounts()
+    fused = fused_mesh.oil_amounts()
+    split_engine = make_engine("reference", split_mesh, DT, weathering=split_weathering)
+    fused_engine = make_engine("vectorized", fused_mesh, DT, weathering=fused_weathering)
+    for _ in range(5):
+        split_engine.step(split)
+        fused_engine.step(fused)
+    assert np.allclose(split, fused, rtol=1e-12, atol=1e-15), "Fusing weathering should not change the oil"
+    assert np.allclose(split_weathering.beached, fused_weathering.beached, rtol=1e-12, atol=1e-15)
+
+
+def test_implicit_weathering(mesh):
+    weathering = Weathering(mesh.geometry, 0.05, evaporation=0.3, beaching=0.2)
+    plain = mesh.oil_amounts()
+    weathered = plain.copy()
+    make_engine("implicit", mesh, 0.05).step(plain)
+    make_engine("implicit", mesh, 0.05, weathering=weathering).step(weathered)
+    assert np.allclose(weathered, weathering.factor * plain, rtol=1e-12, atol=1e-15)
+
+
+def test_beached_mass_balance(mesh):
+    areas = mesh.geometry.areas
+    plain = mesh.oil_amounts()
+    beached = plain.copy()
+    weathering = Weathering(mesh.geometry, DT, beaching=0.5)
+    make_engine("vectorized", mesh, DT).step(plain)
+    make_engine("vectorized", mesh, DT, weathering=weathering).step(beached)
+    removed = np.dot(areas, plain) - np.dot(areas, beached)
+    assert removed > 0
+    assert weathering.beached.sum() == pytest.approx(removed, rel=1e-10), "Removed oil should be beached"
+
+
+@pytest.mark.parametrize("engine_name", ["vectorized", "implicit"])
+def test_adjoint_with_weathering(mesh, engine_name):
+    weathering = Weathering(mesh.geometry, DT, evaporation=0.3, beaching=0.2)
+    engine = make_engine(engine_name, mesh, DT, weathering=weathering)
+    generator = np.random.default_rng(1)
+    oil = generator.random(len(mesh.cells))
+    sensitivity = generator.random(len(mesh.cells))
+    forward = oil.copy()
+    engine.step(forward)
+    backward = sensitivity.copy()
+    engine.adjoint_step(backward)
+    assert np.dot(forward, sensitivity) == pytest.approx(np.dot(oil, backward), rel=1e-12)
+
+
+def test_negative_rate(mesh):
+    with pytest.raises(ValueError):
+        Weathering(mesh.geometry, DT, decay=-1.0)
+
+
+def test_solver_writes_beached(tmp_path, monkeypatch, make_factory):
+    path = os.path.abspath("meshes/bay.msh")
+    monkeypatch.chdir(tmp_path)
+    arguments = (path, 0, 0.1, 50, None, np.array([0.35, 0.45]), None, np.array([0.0, 0.45]), np.array([0.0, 0.2]))
+    _, plain = solve.find_and_plot(*arguments, mesh=msh.Mesh(path, make_factory(), "rcm"), headless=True)
+    _, weathered = solve.find_and_plot(
+        *arguments,
+        mesh=msh.Mesh(path, make_factory(), "rcm"),
+        headless=True,
+        weathering={"decay": 1.0, "beaching": 0.1},
+    )
+    assert weathered.summary()["final_mass"] < plain.summary()["final_mass"]
+    with open(os.path.join("results", "default_experiment_results", "default_experiment_beached.txt")) as file:
+        lines = [line.split(";") for line in file.read().splitlines()]
+    assert lines and all(0 <= int(index) < 3720 for index, _ in lines)
+    assert sum(float(mass) for _, mass in lines) > 0